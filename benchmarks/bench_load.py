@@ -0,0 +1,390 @@
+"""
+Teste de carga ponta a ponta: sobe um uvicorn de verdade contra um SQLite
+temporário ou um Postgres local e dispara cenários ponderados a partir de
+muitos clientes async concorrentes, medindo vazão e latência (p50/p95/p99)
+por endpoint.
+
+Uso: python -m benchmarks.bench_load [--url URL] [--clients N]
+     [--duration S] [--mix login=1,list=6,churn=2,signup=1]
+
+Cenários:
+- login: `POST /auth/token` (Argon2 no pool de hashing)
+- list: `GET /todos/` com filtros, busca e cursor sorteados
+- churn: `POST /todos/` seguido de `PATCH /todos/{id}`
+- signup: `POST /users/`
+
+Sem `--url` usa um SQLite temporário; para números representativos aponte
+para um Postgres descartável (as tabelas são criadas e removidas). O
+servidor sobe com `RATE_LIMIT_ENABLED=false`. O JSON inclui o commit atual
+para comparar execuções entre commits.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import uuid
+from collections import defaultdict
+from time import perf_counter
+
+import httpx
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from fast_zero.models import Todo, TodoState, User, table_registry
+from fast_zero.security import get_password_hash
+
+PASSWORD = 'bench'
+DEFAULT_MIX = 'login=1,list=6,churn=2,signup=1'
+SEARCH_TERMS = ['todo', 'bench', 'item 1', 'carga']
+
+
+def seed(session: Session, users: int, todos: int):
+    # um único hash Argon2 para todos os usuários: o seed não mede nada
+    password = get_password_hash(PASSWORD)
+    session.execute(
+        insert(User),
+        [
+            {
+                'username': f'load{n}',
+                'email': f'load{n}@test.com',
+                'password': password,
+            }
+            for n in range(users)
+        ],
+    )
+    user_ids = session.scalars(select(User.id).order_by(User.id)).all()
+    session.execute(
+        insert(Todo),
+        [
+            {
+                'title': f'todo item {n}',
+                'description': 'bench de carga',
+                'state': random.choice(list(TodoState)),
+                'user_id': user_id,
+            }
+            for user_id in user_ids
+            for n in range(todos)
+        ],
+    )
+    session.commit()
+    return [f'load{n}@test.com' for n in range(users)]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(url: str, port: int, workers: int, mode: str, **env):
+    # sem os limites de requisições: com eles a carga mediria os 429
+    env = {
+        **os.environ,
+        'DATABASE_URL': url,
+        'DATABASE_MODE': mode,
+        'RATE_LIMIT_ENABLED': 'false',
+        **env,
+    }
+    return subprocess.Popen(
+        [
+            sys.executable,
+            '-m',
+            'uvicorn',
+            'fast_zero.factory:create_app',
+            '--factory',
+            '--port',
+            str(port),
+            '--workers',
+            str(workers),
+            '--log-level',
+            'warning',
+            '--no-access-log',
+        ],
+        env=env,
+        # grupo próprio: o supervisor, os workers e os processos do pool de
+        # hashing são encerrados juntos
+        start_new_session=True,
+    )
+
+
+def stop_server(server):
+    os.killpg(server.pid, signal.SIGTERM)
+    try:
+        server.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        os.killpg(server.pid, signal.SIGKILL)
+        server.wait()
+
+
+async def wait_ready(client: httpx.AsyncClient, server, timeout: float):
+    deadline = perf_counter() + timeout
+    while perf_counter() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError('uvicorn exited during startup')
+        try:
+            if (await client.get('/')).status_code == httpx.codes.OK:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError('uvicorn did not start in time')
+
+
+class Recorder:
+    """Latências e status por endpoint; amostras do aquecimento são
+    descartadas."""
+
+    def __init__(self):
+        self.recording = False
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    async def request(self, client, label: str, method: str, url: str, **kw):
+        start = perf_counter()
+        try:
+            response = await client.request(method, url, **kw)
+            status = str(response.status_code)
+        except httpx.HTTPError as exc:
+            response, status = None, type(exc).__name__
+        if self.recording:
+            self.latencies[label].append(perf_counter() - start)
+            self.statuses[label][status] += 1
+        return response
+
+
+async def login(client, recorder: Recorder, email: str):
+    response = await recorder.request(
+        client,
+        'POST /auth/token',
+        'POST',
+        '/auth/token',
+        data={'username': email, 'password': PASSWORD},
+    )
+    if response is not None and response.status_code == httpx.codes.OK:
+        return {'Authorization': f'Bearer {response.json()["access_token"]}'}
+    return None
+
+
+async def list_todos(client, recorder: Recorder, headers: dict):
+    params = {'limit': random.choice([10, 20, 50])}
+    match random.randrange(4):
+        case 0:
+            params['state'] = random.choice(list(TodoState)).value
+        case 1:
+            params['title'] = 'item 1'
+        case 2:
+            params['q'] = random.choice(SEARCH_TERMS)
+    response = await recorder.request(
+        client, 'GET /todos/', 'GET', '/todos/', params=params, headers=headers
+    )
+    # metade das listagens segue para a segunda página
+    if (
+        response is not None
+        and response.status_code == httpx.codes.OK
+        and (cursor := response.json().get('next_cursor'))
+        and random.random() < 0.5  # noqa: PLR2004
+    ):
+        await recorder.request(
+            client,
+            'GET /todos/?after',
+            'GET',
+            '/todos/',
+            params={**params, 'after': cursor},
+            headers=headers,
+        )
+
+
+async def churn(client, recorder: Recorder, headers: dict):
+    response = await recorder.request(
+        client,
+        'POST /todos/',
+        'POST',
+        '/todos/',
+        json={
+            'title': f'carga {uuid.uuid4().hex[:8]}',
+            'description': 'criado pelo bench de carga',
+            'state': 'todo',
+        },
+        headers=headers,
+    )
+    if response is None or response.status_code != httpx.codes.OK:
+        return
+    await recorder.request(
+        client,
+        'PATCH /todos/{id}',
+        'PATCH',
+        f'/todos/{response.json()["id"]}',
+        json={'state': random.choice(['doing', 'done'])},
+        headers=headers,
+    )
+
+
+async def signup(client, recorder: Recorder):
+    name = f'signup-{uuid.uuid4().hex[:12]}'
+    await recorder.request(
+        client,
+        'POST /users/',
+        'POST',
+        '/users/',
+        json={
+            'username': name,
+            'email': f'{name}@test.com',
+            'password': PASSWORD,
+        },
+    )
+
+
+async def virtual_client(
+    client, recorder: Recorder, email: str, mix: dict, deadline: float
+):
+    headers = None
+    scenarios, weights = list(mix), list(mix.values())
+    while perf_counter() < deadline:
+        scenario = random.choices(scenarios, weights)[0]
+        if scenario == 'login' or headers is None:
+            headers = await login(client, recorder, email) or headers
+        elif scenario == 'list':
+            await list_todos(client, recorder, headers)
+        elif scenario == 'churn':
+            await churn(client, recorder, headers)
+        else:
+            await signup(client, recorder)
+
+
+def percentile(values: list, fraction: float) -> float:
+    # nearest-rank sobre os valores já ordenados
+    index = max(0, min(len(values) - 1, round(fraction * len(values)) - 1))
+    return values[index]
+
+
+def summarize(recorder: Recorder, elapsed: float):
+    endpoints = {}
+    for label, latencies in sorted(recorder.latencies.items()):
+        latencies.sort()
+        endpoints[label] = {
+            'requests': len(latencies),
+            'throughput_rps': len(latencies) / elapsed,
+            'p50_ms': percentile(latencies, 0.50) * 1000,
+            'p95_ms': percentile(latencies, 0.95) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'max_ms': latencies[-1] * 1000,
+            'statuses': dict(recorder.statuses[label]),
+        }
+    total = sum(endpoint['requests'] for endpoint in endpoints.values())
+    return {'throughput_rps': total / elapsed, 'endpoints': endpoints}
+
+
+async def drive(args, emails: list, mix: dict):
+    port = free_port()
+    server = start_server(args.url, port, args.workers, args.mode)
+    recorder = Recorder()
+    try:
+        async with httpx.AsyncClient(
+            base_url=f'http://127.0.0.1:{port}',
+            limits=httpx.Limits(max_connections=args.clients),
+            timeout=args.timeout,
+        ) as client:
+            await wait_ready(client, server, args.startup_timeout)
+
+            loop_start = perf_counter()
+            deadline = loop_start + args.warmup + args.duration
+            tasks = [
+                asyncio.create_task(
+                    virtual_client(
+                        client,
+                        recorder,
+                        emails[n % len(emails)],
+                        mix,
+                        deadline,
+                    )
+                )
+                for n in range(args.clients)
+            ]
+            await asyncio.sleep(args.warmup)
+            recorder.recording = True
+            start = perf_counter()
+            await asyncio.gather(*tasks)
+            elapsed = perf_counter() - start
+    finally:
+        stop_server(server)
+
+    return summarize(recorder, elapsed)
+
+
+def parse_mix(value: str) -> dict:
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        if name not in {'login', 'list', 'churn', 'signup'}:
+            raise argparse.ArgumentTypeError(f'unknown scenario: {name}')
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url')
+    parser.add_argument('--mode', choices=['sync', 'async'], default='sync')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--warmup', type=float, default=5)
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--todos', type=int, default=500)
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--startup-timeout', type=float, default=30)
+    parser.add_argument('--output', help='também grava o JSON neste arquivo')
+    args = parser.parse_args()
+
+    args.url = args.url or f'sqlite:///{tempfile.mkdtemp()}/bench.db'
+    engine = create_engine(args.url)
+    table_registry.metadata.create_all(engine)
+    try:
+        with Session(engine) as session:
+            emails = seed(session, args.users, args.todos)
+        engine.dispose()
+        results = asyncio.run(drive(args, emails, args.mix))
+    finally:
+        table_registry.metadata.drop_all(engine)
+
+    report = json.dumps(
+        {
+            'commit': current_commit(),
+            'database': engine.dialect.name,
+            'mode': args.mode,
+            'workers': args.workers,
+            'clients': args.clients,
+            'duration_s': args.duration,
+            'mix': args.mix,
+            **results,
+        },
+        indent=2,
+    )
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            output.write(report)
+    print(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+"""
+Micro-benchmarks dos custos que todo request paga: JWT, Argon2, construção
+do `Settings`, compilação do SQL de `list_todos` e validação/serialização
+de `TodoList`/`UserList`.
+
+Uso: python -m benchmarks.bench_micro [-k FILTRO] [--rounds N]
+     [--save] [--compare] [--baseline ARQUIVO] [--threshold 0.1]
+
+Cada caso roda `--rounds` rodadas de chamadas suficientes para ~0,2s (como
+o `timeit` autorange) e reporta min/mediana/média/desvio por chamada.
+`--save` grava o resultado como baseline; `--compare` compara a mediana
+de cada caso com a baseline e termina com status 1 se algum ficou mais
+lento que `--threshold` (fração). Baselines dependem da máquina e não vão
+para o repositório.
+"""
+
+import argparse
+import json
+import statistics
+import sys
+from pathlib import Path
+from timeit import Timer
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from fast_zero.models import Todo, TodoState
+from fast_zero.pagination import apply_keyset, encode_cursor
+from fast_zero.routers.todo import TODO_COLUMNS, filter_todos
+from fast_zero.schemas import TodoList, UserList
+from fast_zero.search import apply_search
+from fast_zero.security import (
+    create_access_token,
+    decode_access_token,
+    get_password_hash,
+    token_cache,
+    verify_password,
+    verify_token,
+)
+from fast_zero.settings import Settings
+
+DEFAULT_BASELINE = Path('.benchmarks/micro.json')
+SIZES = [10, 100, 1_000]
+
+
+def list_todos_query(dialect, search: bool):
+    # todos os filtros ligados; com busca a paginação é por offset
+    query = filter_todos(
+        select(*TODO_COLUMNS).where(Todo.user_id == 1),
+        'mercado',
+        'comprar',
+        TodoState.todo,
+    )
+    if search:
+        query = apply_search(query, 'leite', dialect.name)
+    else:
+        query = apply_keyset(
+            query, Todo, 'title', encode_cursor('title', 'leite', 42)
+        )
+    return query.offset(20).limit(11).compile(dialect=dialect)
+
+
+def todo_page(size: int):
+    return {
+        'todos': [
+            {
+                'id': n,
+                'title': f'todo {n}',
+                'description': 'descrição ' * 5,
+                'state': 'todo',
+            }
+            for n in range(size)
+        ],
+        'next_cursor': 'WyJpZCIsMTAsMTBd',
+    }
+
+
+def user_page(size: int):
+    return {
+        'users': [
+            {'id': n, 'username': f'user{n}', 'email': f'user{n}@test.com'}
+            for n in range(size)
+        ]
+    }
+
+
+def cases():
+    token = create_access_token({'sub': 'bench@test.com'})
+    password_hash = get_password_hash('bench')
+    decode_access_token(token)  # fica no cache de tokens
+
+    yield (
+        'security.create_access_token',
+        lambda: create_access_token({'sub': 'bench@test.com'}),
+    )
+    yield 'security.verify_token', lambda: verify_token(token)
+    yield (
+        'security.decode_access_token[cached]',
+        lambda: (decode_access_token(token)),
+    )
+    yield 'security.get_password_hash', lambda: get_password_hash('bench')
+    yield (
+        'security.verify_password',
+        lambda: verify_password('bench', password_hash),
+    )
+    yield 'settings.Settings', Settings
+
+    for dialect in (postgresql.dialect(), sqlite.dialect()):
+        yield (
+            f'sql.list_todos[search-{dialect.name}]',
+            lambda d=dialect: (list_todos_query(d, search=True)),
+        )
+    yield (
+        'sql.list_todos[cursor-postgresql]',
+        lambda: list_todos_query(postgresql.dialect(), search=False),
+    )
+
+    for size in SIZES:
+        todos, users = todo_page(size), user_page(size)
+        yield (
+            f'schemas.TodoList[{size}]',
+            lambda page=todos: (
+                TodoList.model_validate(page).model_dump_json(
+                    exclude_none=True
+                )
+            ),
+        )
+        yield (
+            f'schemas.UserList[{size}]',
+            lambda page=users: (
+                UserList.model_validate(page).model_dump_json(
+                    exclude_none=True
+                )
+            ),
+        )
+
+
+def measure(fn, rounds: int, min_time: float = 0.2):
+    timer = Timer(fn)
+    number = 1
+    # como o `autorange`, mas até `min_time`
+    while (elapsed := timer.timeit(number)) < min_time:
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)))
+    per_call = [timer.timeit(number) / number * 1e6 for _ in range(rounds)]
+    return {
+        'calls_per_round': number,
+        'rounds': rounds,
+        'min_us': min(per_call),
+        'median_us': statistics.median(per_call),
+        'mean_us': statistics.fmean(per_call),
+        'stddev_us': statistics.stdev(per_call) if rounds > 1 else 0.0,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float):
+    regressions = {}
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result['median_us'] / baseline[name]['median_us']
+        result['baseline_median_us'] = baseline[name]['median_us']
+        result['change'] = ratio - 1
+        if ratio - 1 > threshold:
+            regressions[name] = ratio - 1
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-k', dest='filter', default='')
+    parser.add_argument('--rounds', type=int, default=7)
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument('--save', action='store_true')
+    parser.add_argument('--compare', action='store_true')
+    parser.add_argument('--threshold', type=float, default=0.1)
+    args = parser.parse_args()
+
+    token_cache.clear()
+    results = {
+        name: measure(fn, args.rounds)
+        for name, fn in cases()
+        if args.filter in name
+    }
+
+    report = {'results': results}
+    if args.compare:
+        baseline = json.loads(args.baseline.read_text())['results']
+        report['threshold'] = args.threshold
+        report['regressions'] = compare(results, baseline, args.threshold)
+    if args.save:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps({'results': results}, indent=2))
+
+    print(json.dumps(report, indent=2))
+    if report.get('regressions'):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Mede a latência de uma página de `GET /todos` em profundidades crescentes,
+comparando OFFSET com o cursor (keyset) de `fast_zero.pagination`.
+
+Uso: python -m benchmarks.bench_pagination [--url URL] [--rows N]
+
+Sem `--url` usa um SQLite temporário; para números representativos aponte
+para um Postgres descartável (as tabelas são criadas e removidas).
+"""
+
+import argparse
+import json
+import tempfile
+from time import perf_counter
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from fast_zero.models import Todo, TodoState, User, table_registry
+from fast_zero.pagination import apply_keyset, encode_cursor
+
+PAGE_SIZE = 10
+DEPTHS = [1, 10, 100, 1_000, 10_000]
+
+
+def seed(session: Session, rows: int):
+    session.execute(
+        insert(User),
+        [{'username': 'bench', 'email': 'bench@test.com', 'password': '-'}],
+    )
+    user_id = session.scalar(select(User.id))
+    session.execute(
+        insert(Todo),
+        [
+            {
+                'title': f'todo {n}',
+                'description': 'bench',
+                'state': TodoState.todo,
+                'user_id': user_id,
+            }
+            for n in range(rows)
+        ],
+    )
+    session.commit()
+    return user_id
+
+
+def measure(session: Session, query, repeat: int):
+    start = perf_counter()
+    for _ in range(repeat):
+        session.scalars(query).all()
+    return (perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url')
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    url = args.url or f'sqlite:///{tempfile.mkdtemp()}/bench.db'
+    engine = create_engine(url)
+    table_registry.metadata.create_all(engine)
+
+    results = []
+    try:
+        with Session(engine) as session:
+            user_id = seed(session, args.rows)
+            base = select(Todo).where(Todo.user_id == user_id)
+            ids = session.scalars(select(Todo.id).order_by(Todo.id)).all()
+
+            for page in DEPTHS:
+                skip = (page - 1) * PAGE_SIZE
+                if skip >= len(ids):
+                    break
+
+                offset_query = (
+                    base.order_by(Todo.id).offset(skip).limit(PAGE_SIZE)
+                )
+                # cursor equivalente ao devolvido pela página anterior
+                after = encode_cursor('id', ids[skip - 1], ids[skip - 1])
+                keyset_query = apply_keyset(
+                    base, Todo, 'id', after if skip else None
+                ).limit(PAGE_SIZE)
+
+                results.append({
+                    'page': page,
+                    'offset_ms': measure(session, offset_query, args.repeat),
+                    'keyset_ms': measure(session, keyset_query, args.repeat),
+                })
+    finally:
+        table_registry.metadata.drop_all(engine)
+
+    print(json.dumps({'rows': args.rows, 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
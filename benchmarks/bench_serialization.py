@@ -0,0 +1,143 @@
+"""
+Compara o custo de montar e serializar uma página de `GET /todos` e
+`GET /users` entre o caminho antigo (entidades ORM -> `model_validate` por
+item -> revalidação pelo `response_model` -> `json.dumps`) e o caminho
+rápido (linhas Core -> dicts -> `FastJSONResponse`).
+
+Uso: python -m benchmarks.bench_serialization [--repeat N]
+
+Inclui a consulta ao banco (SQLite temporário) nos dois caminhos.
+"""
+
+import argparse
+import asyncio
+import json
+import tempfile
+from time import perf_counter
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from fast_zero.models import Todo, TodoState, User, table_registry
+from fast_zero.responses import FastJSONResponse, page_payload
+from fast_zero.routers.todo import TODO_COLUMNS
+from fast_zero.routers.users import USER_COLUMNS
+from fast_zero.schemas import TodoList, TodoPublic, UserList
+
+SIZES = [100, 250, 500, 1_000]
+
+
+def seed(session: Session, rows: int):
+    session.execute(
+        insert(User),
+        [
+            {
+                'username': f'bench{n}',
+                'email': f'bench{n}@test.com',
+                'password': '-',
+            }
+            for n in range(rows)
+        ],
+    )
+    session.execute(
+        insert(Todo),
+        [
+            {
+                'title': f'todo {n}',
+                'description': 'descrição ' * 10,
+                'state': TodoState.todo,
+                'user_id': 1,
+            }
+            for n in range(rows)
+        ],
+    )
+    session.commit()
+
+
+async def legacy_todos(session: Session, size: int):
+    todos = session.scalars(select(Todo).order_by(Todo.id).limit(size))
+    content = TodoList(
+        todos=[TodoPublic.model_validate(todo) for todo in todos]
+    )
+    content = await serialize_response(
+        field=create_response_field('todos', TodoList),
+        response_content=content,
+        exclude_none=True,
+    )
+    return JSONResponse(content).body
+
+
+async def legacy_users(session: Session, size: int):
+    users = session.scalars(select(User).order_by(User.id).limit(size))
+    content = await serialize_response(
+        field=create_response_field('users', UserList),
+        response_content={'users': users.all(), 'next_cursor': None},
+        exclude_none=True,
+    )
+    return JSONResponse(content).body
+
+
+async def fast_todos(session: Session, size: int):
+    rows = session.execute(
+        select(*TODO_COLUMNS).order_by(Todo.id).limit(size)
+    ).all()
+    return FastJSONResponse(page_payload('todos', rows, None)).body
+
+
+async def fast_users(session: Session, size: int):
+    rows = session.execute(
+        select(*USER_COLUMNS).order_by(User.id).limit(size)
+    ).all()
+    return FastJSONResponse(page_payload('users', rows, None)).body
+
+
+async def measure(fn, session: Session, size: int, repeat: int):
+    await fn(session, size)
+    start = perf_counter()
+    for _ in range(repeat):
+        await fn(session, size)
+    return (perf_counter() - start) / repeat * 1000
+
+
+async def run(session: Session, repeat: int):
+    results = []
+    for size in SIZES:
+        for endpoint, legacy, fast in (
+            ('todos', legacy_todos, fast_todos),
+            ('users', legacy_users, fast_users),
+        ):
+            # as duas versões precisam produzir o mesmo JSON
+            assert json.loads(await legacy(session, size)) == json.loads(
+                await fast(session, size)
+            )
+            legacy_ms = await measure(legacy, session, size, repeat)
+            fast_ms = await measure(fast, session, size, repeat)
+            results.append({
+                'endpoint': endpoint,
+                'items': size,
+                'legacy_ms': legacy_ms,
+                'fast_ms': fast_ms,
+                'speedup': legacy_ms / fast_ms,
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    engine = create_engine(f'sqlite:///{tempfile.mkdtemp()}/bench.db')
+    table_registry.metadata.create_all(engine)
+    with Session(engine) as session:
+        seed(session, max(SIZES))
+        results = asyncio.run(run(session, args.repeat))
+
+    print(json.dumps({'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
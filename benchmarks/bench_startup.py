@@ -0,0 +1,194 @@
+"""
+Custo de inicialização: tempo de `import fast_zero.app` num processo novo,
+tempo até o uvicorn responder a primeira requisição e a latência das
+primeiras requisições de cada endpoint quente comparada com a segunda.
+
+Uso: python -m benchmarks.bench_startup [--url URL] [--runs N]
+     [--pool-warmup N]
+
+Cada rodada sobe um uvicorn novo duas vezes: com `DATABASE_POOL_WARMUP`
+igual a `--pool-warmup` ("warm") e igual a 0 ("cold"), para mostrar o que o
+aquecimento do lifespan tira das primeiras requisições e quanto ele
+acrescenta ao tempo até a primeira resposta. Os números são medianas das
+rodadas.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from time import perf_counter, sleep
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from benchmarks.bench_load import (
+    PASSWORD,
+    current_commit,
+    free_port,
+    seed,
+    start_server,
+    stop_server,
+)
+from fast_zero.models import table_registry
+
+IMPORT_SNIPPET = (
+    'from time import perf_counter; started = perf_counter(); '
+    'import fast_zero.app; print(perf_counter() - started)'
+)
+
+
+def import_time(url: str) -> float:
+    output = subprocess.run(
+        [sys.executable, '-c', IMPORT_SNIPPET],
+        env={**os.environ, 'DATABASE_URL': url},
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def wait_first_response(client: httpx.Client, server, timeout: float):
+    deadline = perf_counter() + timeout
+    while perf_counter() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError('uvicorn exited during startup')
+        try:
+            if client.get('/').status_code == httpx.codes.OK:
+                return
+        except httpx.TransportError:
+            pass
+        sleep(0.005)
+    raise RuntimeError('uvicorn did not start in time')
+
+
+def timed(client: httpx.Client, method: str, url: str, **kwargs):
+    started_at = perf_counter()
+    response = client.request(method, url, **kwargs)
+    elapsed = perf_counter() - started_at
+    response.raise_for_status()
+    return response, elapsed * 1000
+
+
+def first_requests(client: httpx.Client, email: str) -> dict:
+    """Primeira e segunda latência (ms) de cada endpoint quente."""
+    latencies = {}
+    for attempt in ('first_ms', 'second_ms'):
+        response, elapsed = timed(
+            client,
+            'POST',
+            '/auth/token',
+            data={'username': email, 'password': PASSWORD},
+        )
+        latencies.setdefault('login', {})[attempt] = elapsed
+        headers = {
+            'Authorization': f'Bearer {response.json()["access_token"]}'
+        }
+        for name, url in (
+            ('list_todos', '/todos/'),
+            ('read_users', '/users/'),
+            ('openapi', '/openapi.json'),
+        ):
+            _, elapsed = timed(client, 'GET', url, headers=headers)
+            latencies.setdefault(name, {})[attempt] = elapsed
+    return latencies
+
+
+def startup_run(args, email: str, pool_warmup: int) -> dict:
+    port = free_port()
+    started_at = perf_counter()
+    server = start_server(
+        args.url,
+        port,
+        1,
+        args.mode,
+        DATABASE_POOL_WARMUP=str(pool_warmup),
+    )
+    try:
+        with httpx.Client(
+            base_url=f'http://127.0.0.1:{port}', timeout=args.timeout
+        ) as client:
+            wait_first_response(client, server, args.startup_timeout)
+            ready_ms = (perf_counter() - started_at) * 1000
+            return {
+                'time_to_first_response_ms': ready_ms,
+                'requests': first_requests(client, email),
+            }
+    finally:
+        stop_server(server)
+
+
+def median_report(runs: list) -> dict:
+    report = {
+        'time_to_first_response_ms': statistics.median(
+            run['time_to_first_response_ms'] for run in runs
+        ),
+        'requests': {},
+    }
+    for name in runs[0]['requests']:
+        report['requests'][name] = {
+            attempt: statistics.median(
+                run['requests'][name][attempt] for run in runs
+            )
+            for attempt in ('first_ms', 'second_ms')
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url')
+    parser.add_argument('--mode', choices=['sync', 'async'], default='sync')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--pool-warmup', type=int, default=1)
+    parser.add_argument('--todos', type=int, default=100)
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--startup-timeout', type=float, default=30)
+    parser.add_argument('--output', help='também grava o JSON neste arquivo')
+    args = parser.parse_args()
+
+    args.url = args.url or f'sqlite:///{tempfile.mkdtemp()}/bench.db'
+    engine = create_engine(args.url)
+    table_registry.metadata.create_all(engine)
+    try:
+        with Session(engine) as session:
+            (email,) = seed(session, 1, args.todos)
+        engine.dispose()
+        imports = [import_time(args.url) * 1000 for _ in range(args.runs)]
+        variants = {'warm': args.pool_warmup, 'cold': 0}
+        runs = {name: [] for name in variants}
+        # alternadas: o cache de disco do SO favorece igualmente as duas
+        for _ in range(args.runs):
+            for name, pool_warmup in variants.items():
+                runs[name].append(startup_run(args, email, pool_warmup))
+    finally:
+        table_registry.metadata.drop_all(engine)
+
+    report = json.dumps(
+        {
+            'commit': current_commit(),
+            'database': engine.dialect.name,
+            'mode': args.mode,
+            'runs': args.runs,
+            'pool_warmup': args.pool_warmup,
+            'import_ms': {
+                'median': statistics.median(imports),
+                'min': min(imports),
+            },
+            **{name: median_report(results) for name, results in runs.items()},
+        },
+        indent=2,
+    )
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            output.write(report)
+    print(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""
+Compara o custo de autenticar um bearer token com e sem o cache de tokens
+verificados (`TOKEN_CACHE_ENABLED`).
+
+Uso: python -m benchmarks.bench_token_cache [--calls N]
+"""
+
+import argparse
+import json
+from timeit import timeit
+
+from fast_zero.security import (
+    create_access_token,
+    decode_access_token,
+    token_cache,
+    verify_token,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--calls', type=int, default=10_000)
+    args = parser.parse_args()
+
+    token = create_access_token({'sub': 'bench@test.com'})
+    token_cache.clear()
+
+    uncached = timeit(lambda: verify_token(token), number=args.calls)
+    cached = timeit(lambda: decode_access_token(token), number=args.calls)
+
+    print(
+        json.dumps(
+            {
+                'calls': args.calls,
+                'uncached_us_per_call': uncached / args.calls * 1e6,
+                'cached_us_per_call': cached / args.calls * 1e6,
+                'speedup': uncached / cached,
+                'cache': token_cache.stats(),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == '__main__':
+    main()
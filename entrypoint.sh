@@ -3,4 +3,4 @@
 poetry run alembic upgrade head
 
 # Inicia a aplicação
-poetry run uvicorn --host 0.0.0.0 --port 8000 fast_zero.app:app
+poetry run python -m fast_zero serve
@@ -0,0 +1,45 @@
+import argparse
+
+from sqlalchemy.orm import Session
+
+from fast_zero.counters import rebuild_counters
+from fast_zero.database import engine, settings
+from fast_zero.server import serve
+
+
+def repair_counters(args):
+    with Session(engine) as session:
+        rebuilt = rebuild_counters(session, args.user_id)
+    print(f'{rebuilt} todo counters rebuilt')
+
+
+def run_server(args):
+    serve(settings, host=args.host, port=args.port, workers=args.workers)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m fast_zero')
+    commands = parser.add_subparsers(required=True)
+
+    repair = commands.add_parser(
+        'repair-counters', help='rebuild todo_counters from the todos table'
+    )
+    repair.add_argument('--user-id', type=int)
+    repair.set_defaults(handler=repair_counters)
+
+    server = commands.add_parser(
+        'serve', help='run the production server (uvicorn)'
+    )
+    server.add_argument('--host')
+    server.add_argument('--port', type=int)
+    server.add_argument(
+        '--workers', type=int, help='default: one per available CPU'
+    )
+    server.set_defaults(handler=run_server)
+
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == '__main__':
+    main()
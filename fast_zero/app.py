@@ -1,17 +1,11 @@
-from http import HTTPStatus
+"""
+O app montado na importação, para `fastapi dev` e os testes. O servidor de
+produção chama `fast_zero.factory:create_app` em cada worker, sem importar
+este módulo, para não montar o app duas vezes.
+"""
 
-from fastapi import FastAPI
+from fast_zero.factory import create_app, settings
 
-from fast_zero.routers import auth, todo, users
-from fast_zero.schemas import Message
+__all__ = ['app', 'create_app', 'settings']
 
-app = FastAPI()
-
-app.include_router(users.router)
-app.include_router(auth.router)
-app.include_router(todo.router)
-
-
-@app.get('/', status_code=HTTPStatus.OK, response_model=Message)
-def read_root():
-    return {'message': 'Olá mundo!'}
+app = create_app()
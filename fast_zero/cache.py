@@ -0,0 +1,103 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from typing import Any, Hashable
+
+
+class TTLCache:
+    """
+    Cache LRU limitado a `maxsize` entradas, cada uma com prazo de validade.
+
+    Todas as operações são curtas e protegidas por um `Lock`, então a mesma
+    instância pode ser usada por threads do threadpool e por tasks do event
+    loop ao mesmo tempo.
+
+    Para não gravar um valor que ficou velho durante a carga, quem carrega
+    lê `generation(key)` antes de consultar a origem e a repassa ao `set`:
+    se um `invalidate` da chave aconteceu no meio, o `set` é ignorado. As
+    gerações ficam em `GENERATION_SLOTS` contadores compartilhados pelas
+    chaves de mesmo hash, então a memória não cresce com as chaves
+    invalidadas (uma colisão só faz perder um `set`).
+    """
+
+    GENERATION_SLOTS = 256
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._generations = [0] * self.GENERATION_SLOTS
+        self._lock = Lock()
+
+    def _slot(self, key: Hashable) -> int:
+        return hash(key) % self.GENERATION_SLOTS
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key: Hashable, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+
+            expires_at, value = item
+            if expires_at <= monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def generation(self, key: Hashable) -> int:
+        with self._lock:
+            return self._generations[self._slot(key)]
+
+    def set(
+        self,
+        key: Hashable,
+        value,
+        ttl: float | None = None,
+        generation: int | None = None,
+    ):
+        if self.maxsize <= 0:
+            return
+
+        expires_at = monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if (
+                generation is not None
+                and generation != self._generations[self._slot(key)]
+            ):
+                return
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+            self._generations[self._slot(key)] += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._generations = [
+                generation + 1 for generation in self._generations
+            ]
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+        }
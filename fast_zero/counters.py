@@ -0,0 +1,36 @@
+from typing import Optional
+
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.orm import Session
+
+from fast_zero.models import Todo, TodoCounter
+
+
+def rebuild_counters(session: Session, user_id: Optional[int] = None) -> int:
+    """
+    Recalcula `todo_counters` a partir de `todos` (de todos os usuários ou
+    só de `user_id`) e devolve quantos contadores foram gravados.
+
+    No Postgres a tabela `todos` fica bloqueada para escrita até o commit,
+    para que nenhum trigger altere os contadores no meio da reconstrução.
+    """
+    if session.get_bind().dialect.name == 'postgresql':
+        session.execute(text('LOCK TABLE todos IN SHARE MODE'))
+
+    counts = select(Todo.user_id, Todo.state, func.count()).group_by(
+        Todo.user_id, Todo.state
+    )
+    stale = delete(TodoCounter)
+    if user_id is not None:
+        counts = counts.where(Todo.user_id == user_id)
+        stale = stale.where(TodoCounter.user_id == user_id)
+
+    session.execute(stale)
+    rebuilt = session.execute(
+        insert(TodoCounter)
+        .from_select(['user_id', 'state', 'count'], counts)
+        .execution_options(preserve_rowcount=True)
+    ).rowcount
+    session.commit()
+
+    return rebuilt
@@ -1,11 +1,467 @@
-from sqlalchemy import create_engine
+import hmac
+import logging
+import math
+from hashlib import sha256
+from itertools import count
+from time import monotonic, perf_counter, time
+from typing import Optional
+
+from fastapi import Depends, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import URL, Engine, create_engine, event, insert, make_url
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool
+from starlette.datastructures import MutableHeaders
 
+from fast_zero.metrics import (
+    TimedAsyncQueuePool,
+    TimedQueuePool,
+    request_queries,
+)
 from fast_zero.settings import Settings
 
-engine = create_engine(Settings().DATABASE_URL)  # type: ignore
+settings = Settings()  # type: ignore
+logger = logging.getLogger(__name__)
+SAFE_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+# cookie com o instante (assinado) da última escrita do cliente
+WRITE_COOKIE = 'last_write'
+
+
+def engine_options(url: str | URL, settings: Settings) -> dict:
+    """
+    Argumentos de `create_engine`/`create_async_engine` a partir do
+    `Settings`: tamanho e timeouts do pool, pre-ping, reciclagem e, no
+    Postgres, `statement_timeout` e o modo PgBouncer.
+
+    Tamanho, overflow e timeout só se aplicam quando o dialeto usa um
+    `QueuePool` (não no SQLite em memória, por exemplo).
+    """
+    url = make_url(url)
+    options = {
+        'pool_pre_ping': settings.DATABASE_POOL_PRE_PING,
+        'pool_recycle': settings.DATABASE_POOL_RECYCLE,
+    }
+    if issubclass(url.get_dialect().get_pool_class(url), QueuePool):
+        options |= {
+            'pool_size': settings.DATABASE_POOL_SIZE,
+            'max_overflow': settings.DATABASE_MAX_OVERFLOW,
+            'pool_timeout': settings.DATABASE_POOL_TIMEOUT,
+        }
+
+    if url.get_backend_name() != 'postgresql':
+        return options
+
+    connect_args = {}
+    if settings.DATABASE_PGBOUNCER:
+        # em modo transaction cada transação pode cair numa conexão diferente
+        # do servidor, onde o prepared statement não existe
+        if url.get_driver_name() == 'psycopg':
+            connect_args['prepare_threshold'] = None
+    elif settings.DATABASE_STATEMENT_TIMEOUT_MS:
+        # parâmetro de inicialização da sessão: sem round trip extra
+        connect_args['options'] = (
+            f'-c statement_timeout={settings.DATABASE_STATEMENT_TIMEOUT_MS}'
+        )
+    options['connect_args'] = connect_args
+    return options
+
+
+def create_engines(settings: Settings, url: Optional[str] = None):
+    url = url or settings.DATABASE_URL
+    options = engine_options(url, settings)
+    # mesmo pool que o dialeto escolheria, medindo a espera por conexões
+    timed = 'pool_size' in options
+    sync_engine = create_engine(
+        url, **({'poolclass': TimedQueuePool} if timed else {}), **options
+    )
+    async_engine = (
+        create_async_engine(
+            url,
+            **({'poolclass': TimedAsyncQueuePool} if timed else {}),
+            **options,
+        )
+        if settings.DATABASE_MODE == 'async'
+        else None
+    )
+
+    timeout = settings.DATABASE_STATEMENT_TIMEOUT_MS
+    if (
+        settings.DATABASE_PGBOUNCER
+        and timeout
+        and sync_engine.dialect.name == 'postgresql'
+    ):
+        # o PgBouncer recusa `options` na conexão e um `SET` de sessão
+        # vazaria para outros clientes: vale só para cada transação, ao
+        # custo de um comando a mais
+        def set_local_statement_timeout(conn):
+            conn.exec_driver_sql(f'SET LOCAL statement_timeout = {timeout}')
+
+        for engine in filter(None, (sync_engine, async_engine)):
+            event.listen(
+                getattr(engine, 'sync_engine', engine),
+                'begin',
+                set_local_statement_timeout,
+            )
+
+    return sync_engine, async_engine
+
+
+def log_pool_settings(engine: Engine, settings: Settings):
+    """
+    Linha de log com a configuração do pool do `engine`: as mesmas opções
+    de `engine_options` passadas a `create_engine`.
+    """
+    options = engine_options(engine.url, settings)
+    sizing = (
+        f'size={options["pool_size"]} '
+        f'max_overflow={options["max_overflow"]} '
+        f'timeout={options["pool_timeout"]}s '
+        if 'pool_size' in options
+        else ''
+    )
+    logger.info(
+        'database pool: %s %srecycle=%ss pre_ping=%s '
+        'statement_timeout=%sms pgbouncer=%s',
+        type(engine.pool).__name__,
+        sizing,
+        options['pool_recycle'],
+        options['pool_pre_ping'],
+        settings.DATABASE_STATEMENT_TIMEOUT_MS,
+        settings.DATABASE_PGBOUNCER,
+    )
+
+
+engine, async_engine = create_engines(settings)
+
+
+def request_engine() -> Engine:
+    """O engine (e o pool) que atende as requisições no `DATABASE_MODE`."""
+    if async_engine is not None:
+        return async_engine.sync_engine
+    return engine
+
+
+def insert_ignoring_conflicts(model, dialect: str):
+    if dialect == 'postgresql':
+        return postgresql.insert(model).on_conflict_do_nothing()
+    if dialect == 'sqlite':
+        return sqlite.insert(model).on_conflict_do_nothing()
+    return insert(model)
+
+
+# Registrados na classe `Engine`: valem para `engine`, para o `sync_engine`
+# por trás do `async_engine` e para os engines criados nos testes
+@event.listens_for(Engine, 'before_cursor_execute')
+def start_query_timer(  # noqa: PLR0913, PLR0917
+    conn, cursor, statement, parameters, context, executemany
+):
+    context.query_started_at = perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def record_query(  # noqa: PLR0913, PLR0917
+    conn, cursor, statement, parameters, context, executemany
+):
+    elapsed = perf_counter() - context.query_started_at
+    stats = request_queries.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+    # sem os parâmetros: podem conter dados pessoais
+    if elapsed * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS:
+        logger.warning('slow query (%.1f ms): %s', elapsed * 1000, statement)
+
+
+class ThreadedSession:
+    """
+    Expõe a mesma interface awaitable da `AsyncSession` sobre uma `Session`
+    síncrona, executando cada operação de I/O no threadpool.
+
+    Assim os endpoints são escritos uma única vez (`async def`) e o modo
+    síncrono continua usando o driver bloqueante.
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def get_bind(self, *args, **kwargs):
+        return self.sync_session.get_bind(*args, **kwargs)
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    def add_all(self, instances):
+        self.sync_session.add_all(instances)
+
+    async def execute(self, *args, **kwargs):
+        return await run_in_threadpool(
+            self.sync_session.execute, *args, **kwargs
+        )
+
+    async def scalar(self, *args, **kwargs):
+        return await run_in_threadpool(
+            self.sync_session.scalar, *args, **kwargs
+        )
+
+    async def scalars(self, *args, **kwargs):
+        return await run_in_threadpool(
+            self.sync_session.scalars, *args, **kwargs
+        )
+
+    async def get(self, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, *args, **kwargs)
+
+    async def delete(self, instance):
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def flush(self):
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def refresh(self, instance, *args, **kwargs):
+        await run_in_threadpool(
+            self.sync_session.refresh, instance, *args, **kwargs
+        )
+
+    async def commit(self):
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
+
+    async def connection(self):
+        return await run_in_threadpool(self.sync_session.connection)
 
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
 
-def get_session():  # pragma: no cover
-    with Session(engine) as session:
+    async def stream(self, statement, *args, **kwargs):
+        result = await run_in_threadpool(
+            self.sync_session.execute,
+            statement.execution_options(stream_results=True),
+            *args,
+            **kwargs,
+        )
+        return ThreadedResult(result)
+
+
+class ThreadedResult:
+    """Equivalente síncrono do `AsyncResult` devolvido por `stream()`."""
+
+    def __init__(self, result):
+        self.sync_result = result
+
+    async def partitions(self, size: int | None = None):
+        partitions = self.sync_result.partitions(size)
+        while partition := await run_in_threadpool(next, partitions, None):
+            yield partition
+
+
+class Replica:
+    """Réplica de leitura: engines próprios e o prazo da última falha."""
+
+    def __init__(self, url: str, settings: Settings):
+        self.url = make_url(url)
+        self.engine, self.async_engine = create_engines(settings, url)
+        self.unhealthy_until = 0.0
+
+    def __repr__(self):
+        return f'Replica({self.url.render_as_string(hide_password=True)!r})'
+
+    def new_session(self):
+        if self.async_engine is not None:
+            return AsyncSession(self.async_engine, expire_on_commit=False)
+        return ThreadedSession(Session(self.engine))
+
+
+class ReplicaRouter:
+    """
+    Distribui as leituras entre as réplicas em round robin.
+
+    Depois de uma escrita o cliente lê do primário por `sticky_seconds`,
+    cobrindo o atraso da replicação. A marca fica com o próprio cliente (o
+    instante da escrita assinado com `secret`, ver `write_marker`), então
+    vale em qualquer worker. Uma réplica que falha ao conectar sai da
+    rotação por `retry_seconds`; sem réplica disponível a leitura vai para
+    o primário.
+    """
+
+    def __init__(
+        self,
+        replicas: list[Replica],
+        sticky_seconds: float,
+        retry_seconds: float,
+        secret: str,
+    ):
+        self.replicas = replicas
+        self.sticky_seconds = sticky_seconds
+        self.retry_seconds = retry_seconds
+        self._secret = secret.encode()
+        self._next = count()
+
+    def _sign(self, value: str) -> str:
+        return hmac.new(self._secret, value.encode(), sha256).hexdigest()
+
+    def write_marker(self) -> str:
+        written_at = f'{time():.3f}'
+        return f'{written_at}.{self._sign(written_at)}'
+
+    def wrote_recently(self, marker: Optional[str]) -> bool:
+        written_at, _, signature = (marker or '').rpartition('.')
+        # bytes: com `str`, um cookie não ASCII levantaria `TypeError`
+        if not hmac.compare_digest(
+            signature.encode(), self._sign(written_at).encode()
+        ):
+            return False
+        return float(written_at) > time() - self.sticky_seconds
+
+    def choose(self, marker: Optional[str] = None) -> Optional[Replica]:
+        if not self.replicas or self.wrote_recently(marker):
+            return None
+        now = monotonic()
+        start = next(self._next)
+        for offset in range(len(self.replicas)):
+            replica = self.replicas[(start + offset) % len(self.replicas)]
+            if replica.unhealthy_until <= now:
+                return replica
+        return None
+
+    def mark_unhealthy(self, replica: Replica):
+        replica.unhealthy_until = monotonic() + self.retry_seconds
+        logger.warning(
+            'read replica %s unavailable, using the primary for %.0fs',
+            replica.url.render_as_string(hide_password=True),
+            self.retry_seconds,
+        )
+
+    async def connect(self, replica: Replica):
+        """Sessão já conectada à réplica, ou `None` se ela falhou."""
+        session = replica.new_session()
+        try:
+            await session.connection()
+        except DBAPIError:
+            await session.close()
+            self.mark_unhealthy(replica)
+            return None
+        return session
+
+
+read_replicas = ReplicaRouter(
+    [Replica(url, settings) for url in settings.DATABASE_REPLICA_URLS],
+    sticky_seconds=settings.DATABASE_REPLICA_STICKY_SECONDS,
+    retry_seconds=settings.DATABASE_REPLICA_RETRY_SECONDS,
+    secret=settings.SECRET_KEY,
+)
+
+
+def reset_pools():
+    """
+    Descarta, sem fechar, conexões herdadas do processo pai (fork depois
+    do engine ter sido usado): cada processo abre as suas.
+    """
+    async_engines = [
+        async_engine,
+        *(replica.async_engine for replica in read_replicas.replicas),
+    ]
+    sync_engines = [
+        engine,
+        *(replica.engine for replica in read_replicas.replicas),
+        # sem `close` não há I/O: basta o engine síncrono por trás do async
+        *(other.sync_engine for other in async_engines if other is not None),
+    ]
+    for sync_engine in sync_engines:
+        sync_engine.dispose(close=False)
+
+
+def new_session():
+    if settings.DATABASE_MODE == 'async':
+        return AsyncSession(async_engine, expire_on_commit=False)
+    return ThreadedSession(Session(engine))
+
+
+async def get_session():  # pragma: no cover
+    async with new_session() as session:
         yield session
+
+
+def get_session_factory():  # pragma: no cover
+    """
+    Para respostas em streaming: a sessão de `get_session` é fechada antes
+    do corpo ser enviado, então o gerador abre a sua própria.
+    """
+    return new_session
+
+
+class ReadYourWritesMiddleware:
+    """
+    Middleware ASGI que, havendo réplicas, devolve em toda requisição de
+    escrita o cookie `WRITE_COOKIE` com `ReplicaRouter.write_marker`: as
+    leituras seguintes do cliente, em qualquer worker, vão ao primário.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope['type'] != 'http'
+            or scope['method'] in SAFE_METHODS
+            or not read_replicas.replicas
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        cookie = (
+            f'{WRITE_COOKIE}={read_replicas.write_marker()}; '
+            f'Max-Age={math.ceil(read_replicas.sticky_seconds)}; '
+            'Path=/; HttpOnly; SameSite=lax'
+        )
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                MutableHeaders(scope=message).append('Set-Cookie', cookie)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+async def get_read_session(
+    request: Request, session: AsyncSession = Depends(get_session)
+):
+    """
+    Sessão para endpoints e dependências só de leitura: numa réplica quando
+    houver, senão a mesma sessão primária de `get_session`.
+
+    Requisições de escrita (que passam por aqui ao autenticar o usuário) e
+    clientes com o cookie de `ReadYourWritesMiddleware` ainda válido usam a
+    sessão primária (read-your-writes).
+    """
+    if request.method not in SAFE_METHODS:
+        yield session
+        return
+
+    replica = read_replicas.choose(request.cookies.get(WRITE_COOKIE))
+    replica_session = replica and await read_replicas.connect(replica)
+    if replica_session is None:
+        yield session
+        return
+
+    async with replica_session:
+        try:
+            yield replica_session
+        except DBAPIError as exc:
+            # a conexão caiu no meio da requisição: as próximas vão ao
+            # primário até a réplica voltar
+            if exc.connection_invalidated:
+                read_replicas.mark_unhealthy(replica)
+            raise
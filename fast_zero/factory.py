@@ -0,0 +1,120 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from http import HTTPStatus
+from typing import Optional
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+
+from fast_zero.database import (
+    ReadYourWritesMiddleware,
+    log_pool_settings,
+    new_session,
+    request_engine,
+    reset_pools,
+)
+from fast_zero.hashing import PoolSaturatedError
+from fast_zero.metrics import (
+    CONTENT_TYPE,
+    MetricsMiddleware,
+    QueryTimingMiddleware,
+    render_metrics,
+)
+from fast_zero.ratelimit import (
+    MemoryStorage,
+    RateLimitMiddleware,
+    RateLimitStorage,
+)
+from fast_zero.responses import FastJSONResponse
+from fast_zero.revocation import prune_periodically
+from fast_zero.routers import auth, todo, users
+from fast_zero.schemas import Message
+from fast_zero.security import hashing_pool
+from fast_zero.settings import Settings
+from fast_zero.warmup import warm_up
+
+settings = Settings()  # type: ignore
+
+
+def create_app(
+    rate_limit_storage: Optional[RateLimitStorage] = None,
+) -> FastAPI:
+    """
+    Monta a aplicação. O aquecimento (pool, SQL compilado e OpenAPI) roda
+    no lifespan, antes do servidor aceitar a primeira requisição.
+
+    A configuração vem do ambiente: engines, segurança e routers leem o
+    `Settings` quando os módulos são importados, então não há como montar
+    aqui um app com outra configuração.
+
+    Os limites de requisição usam `rate_limit_storage`, por padrão uma
+    `MemoryStorage` por processo (acessível em `app.state`).
+
+    Também pode ser usada direto pelo uvicorn:
+    `uvicorn --factory fast_zero.factory:create_app`.
+    """
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # roda em cada worker: o pool começa vazio no processo que atende
+        reset_pools()
+        hashing_pool.start()
+        log_pool_settings(request_engine(), settings)
+        await warm_up(app, settings)
+        pruning = None
+        if settings.REVOCATION_PRUNE_SECONDS > 0:
+            pruning = asyncio.create_task(
+                prune_periodically(
+                    new_session, settings.REVOCATION_PRUNE_SECONDS
+                )
+            )
+        yield
+        if pruning is not None:
+            pruning.cancel()
+            with suppress(asyncio.CancelledError):
+                await pruning
+        hashing_pool.shutdown()
+
+    # respostas sem `response_class` explícito também passam pelo
+    # pydantic-core
+    app = FastAPI(default_response_class=FastJSONResponse, lifespan=lifespan)
+    app.add_middleware(
+        QueryTimingMiddleware, server_timing=settings.SERVER_TIMING_ENABLED
+    )
+    app.add_middleware(ReadYourWritesMiddleware)
+    app.state.rate_limit_storage = rate_limit_storage or MemoryStorage()
+    if settings.RATE_LIMIT_ENABLED:
+        app.add_middleware(
+            RateLimitMiddleware,
+            routes=app.routes,
+            limits=settings.RATE_LIMITS,
+            storage=app.state.rate_limit_storage,
+        )
+    app.add_middleware(MetricsMiddleware, routes=app.routes)
+
+    app.include_router(users.router)
+    app.include_router(auth.router)
+    app.include_router(todo.router)
+
+    @app.get('/', status_code=HTTPStatus.OK, response_model=Message)
+    async def read_root():
+        return {'message': 'Olá mundo!'}
+
+    @app.get('/metrics', include_in_schema=False)
+    async def metrics():
+        return Response(
+            render_metrics(request_engine(), hashing_pool),
+            media_type=CONTENT_TYPE,
+        )
+
+    @app.exception_handler(PoolSaturatedError)
+    async def pool_saturated_handler(
+        request: Request, exc: PoolSaturatedError
+    ):
+        return JSONResponse(
+            status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+            content={'detail': 'Server busy, try again later'},
+            headers={'Retry-After': str(settings.HASHING_RETRY_AFTER_SECONDS)},
+        )
+
+    return app
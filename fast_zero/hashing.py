@@ -0,0 +1,116 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from threading import BoundedSemaphore, Lock
+from time import time
+
+
+class PoolSaturatedError(Exception):
+    """A fila do pool de hashing está cheia."""
+
+
+class TimingStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def stats(self):
+        return {
+            'count': self.count,
+            'total_seconds': self.total,
+            'avg_seconds': self.total / self.count if self.count else 0.0,
+            'max_seconds': self.max,
+        }
+
+
+def mp_context():
+    # nunca `fork`: o servidor já tem threads (threadpool, pools de conexão)
+    # e o processo filho herdaria locks que ninguém vai liberar
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+
+def _timed_call(fn, *args):
+    started_at = time()
+    result = fn(*args)
+    return result, started_at, time()
+
+
+class HashingPool:
+    """
+    Executa funções CPU-bound (Argon2) em um `ProcessPoolExecutor` próprio,
+    sem ocupar o threadpool nem o event loop.
+
+    No máximo `max_workers + max_queue` chamadas ficam pendentes; acima disso
+    `run` falha imediatamente com `PoolSaturatedError`. O executor é criado
+    por `start` (no lifespan), já dentro do processo (worker) que vai
+    utilizá-lo, e encerrado por `shutdown`.
+
+    Os processos saem de um forkserver que já importou os módulos de
+    `preload`, sem pagar o import a cada processo novo.
+    """
+
+    def __init__(
+        self, max_workers: int, max_queue: int, preload: tuple[str, ...] = ()
+    ):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.preload = preload
+        self.queue_wait = TimingStats()
+        self.hash_time = TimingStats()
+        self._slots = BoundedSemaphore(max_workers + max_queue)
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = Lock()
+
+    def start(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                context = mp_context()
+                if context.get_start_method() == 'forkserver':
+                    # só vale antes do forkserver subir (uma vez por processo)
+                    context.set_forkserver_preload(list(self.preload))
+                self._executor = ProcessPoolExecutor(
+                    self.max_workers, mp_context=context
+                )
+            return self._executor
+
+    async def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PoolSaturatedError
+
+        submitted_at = time()
+        try:
+            future = self.start().submit(_timed_call, fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+
+        result, started_at, finished_at = await asyncio.wrap_future(future)
+        self.queue_wait.record(max(started_at - submitted_at, 0.0))
+        self.hash_time.record(finished_at - started_at)
+
+        return result
+
+    def stats(self):
+        return {
+            'max_workers': self.max_workers,
+            'max_queue': self.max_queue,
+            'queue_wait': self.queue_wait.stats(),
+            'hash_time': self.hash_time.stats(),
+        }
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
@@ -0,0 +1,190 @@
+import codecs
+import csv
+import io
+import json
+from typing import AsyncIterator
+
+import psycopg
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.engine.interfaces import AdaptedConnection
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from fast_zero.models import Todo, utcnow
+from fast_zero.schemas import TodoSchema
+
+IMPORT_COLUMNS = ('title', 'description', 'state', 'user_id')
+# `updated_at` vem do mesmo relógio dos INSERTs do ORM, não do banco
+COPY_COLUMNS = (*IMPORT_COLUMNS, 'updated_at')
+COPY_STATEMENT = f'COPY todos ({", ".join(COPY_COLUMNS)}) FROM STDIN'
+
+
+class ImportFormatError(ValueError):
+    """O corpo não pode ser importado (p.ex. cabeçalho CSV incompleto)."""
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_length: int):
+    """
+    Quebra o corpo em linhas `(número, texto)` à medida que os bytes chegam;
+    só a linha incompleta fica em memória. Uma linha com mais de
+    `max_length` caracteres sai como `ImportFormatError`, e o excesso é
+    descartado sem esperar o fim dela.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    too_long = ImportFormatError(f'Line exceeds {max_length} characters')
+    pending = ''
+    overflow = False
+    number = 0
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split('\n')
+        for line in lines:
+            number += 1
+            if overflow or len(line) > max_length:
+                overflow = False
+                yield number, too_long
+            else:
+                yield number, line + '\n'
+        if len(pending) > max_length:
+            pending, overflow = '', True
+    pending += decoder.decode(b'', final=True)
+    if overflow or len(pending) > max_length:
+        yield number + 1, too_long
+    elif pending:
+        yield number + 1, pending
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes], max_length: int):
+    async for number, line in iter_lines(chunks, max_length):
+        if isinstance(line, ImportFormatError):
+            yield number, line
+            continue
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError:
+            yield number, ImportFormatError('Invalid JSON')
+
+
+async def iter_csv(chunks: AsyncIterator[bytes], max_length: int):
+    """
+    Registros CSV podem ocupar várias linhas (campos entre aspas com quebra
+    de linha): o registro só termina quando o número de aspas é par. Um
+    registro com mais de `max_length` caracteres é descartado até o fim e
+    sai como erro.
+    """
+    header = None
+    record, start, quotes, oversized = '', 0, 0, False
+    async for number, line in iter_lines(chunks, max_length):
+        if isinstance(line, ImportFormatError):
+            # as aspas da linha descartada não são conhecidas: o registro
+            # termina aqui
+            yield (start if record or oversized else number), line
+            record, quotes, oversized = '', 0, False
+            continue
+        if not record and not oversized:
+            start = number
+        quotes += line.count('"')
+        if not oversized:
+            record += line
+            if len(record) > max_length:
+                record, oversized = '', True
+        if quotes % 2:
+            continue
+        if oversized:
+            yield (
+                start,
+                ImportFormatError(f'Record exceeds {max_length} characters'),
+            )
+            quotes, oversized = 0, False
+            continue
+
+        values = next(csv.reader(io.StringIO(record)), [])
+        record, quotes = '', 0
+        if not values:
+            continue
+        if header is None:
+            header = values
+            missing = set(TodoSchema.model_fields) - set(header)
+            if missing:
+                raise ImportFormatError(
+                    f'Missing CSV columns: {", ".join(sorted(missing))}'
+                )
+            continue
+        if len(values) != len(header):
+            yield (
+                start,
+                ImportFormatError(
+                    f'Expected {len(header)} fields, got {len(values)}'
+                ),
+            )
+            continue
+        yield start, dict(zip(header, values))
+
+    if record or oversized:
+        yield start, ImportFormatError('Unterminated quoted field')
+
+
+async def iter_todos(
+    chunks: AsyncIterator[bytes], format: str, max_length: int
+):
+    """
+    Produz `(linha, TodoSchema | str)`: o todo validado ou a descrição do
+    erro daquela linha. Linhas (e registros CSV) acima de `max_length`
+    caracteres são erros da linha.
+    """
+    parse = iter_csv if format == 'csv' else iter_ndjson
+    async for number, record in parse(chunks, max_length):
+        if isinstance(record, ImportFormatError):
+            yield number, str(record)
+            continue
+        try:
+            yield number, TodoSchema.model_validate(record)
+        except ValidationError as error:
+            yield (
+                number,
+                '; '.join(
+                    f'{".".join(map(str, e["loc"])) or "row"}: {e["msg"]}'
+                    for e in error.errors()
+                ),
+            )
+
+
+def copy_todos(session: Session, rows: list[tuple]):
+    """
+    Grava um lote de `(title, description, state, user_id)` na transação da
+    sessão: `COPY ... FROM STDIN` no Postgres, INSERT multi-linha nos demais.
+    Violações de constraint saem como `IntegrityError` do SQLAlchemy.
+    """
+    connection = session.connection()
+    if connection.dialect.name != 'postgresql':
+        session.execute(
+            insert(Todo), [dict(zip(IMPORT_COLUMNS, row)) for row in rows]
+        )
+        return
+
+    now = utcnow()
+    rows = [(*row, now) for row in rows]
+    dbapi_connection = connection.connection.dbapi_connection
+    try:
+        if isinstance(dbapi_connection, AdaptedConnection):
+            # AsyncSession.run_sync: o driver async é chamado via greenlet
+            dbapi_connection.run_async(lambda conn: _copy_async(conn, rows))
+            return
+
+        with dbapi_connection.cursor() as cursor:
+            with cursor.copy(COPY_STATEMENT) as copy:
+                for row in rows:
+                    copy.write_row(row)
+    except psycopg.IntegrityError as error:
+        # o COPY fala direto com o driver: mesma exceção do INSERT acima
+        raise IntegrityError(COPY_STATEMENT, None, error) from error
+
+
+async def _copy_async(connection, rows: list[tuple]):
+    async with connection.cursor() as cursor:
+        async with cursor.copy(COPY_STATEMENT) as copy:
+            for row in rows:
+                await copy.write_row(row)
@@ -0,0 +1,450 @@
+import itertools
+import logging
+import weakref
+from bisect import bisect_left
+from contextvars import ContextVar
+from threading import Lock, current_thread, local
+from time import perf_counter
+from typing import Callable, Optional
+
+from sqlalchemy import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.datastructures import MutableHeaders
+
+from fast_zero.hashing import HashingPool
+
+# buckets padrão dos clientes Prometheus, em segundos
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.075,
+    0.1,
+    0.25,
+    0.5,
+    0.75,
+    1.0,
+    2.5,
+    5.0,
+    7.5,
+    10.0,
+)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# template resolvido pelo `MetricsMiddleware`, reaproveitado pelos internos
+ROUTE_SCOPE_KEY = 'fast_zero.route'
+
+logger = logging.getLogger(__name__)
+
+
+class ThreadShards:
+    """
+    Um dicionário por thread. Cada thread só escreve no seu, sem lock; o
+    lock protege apenas o registro de uma thread nova, o descarte de uma
+    thread encerrada e a leitura (rara, no scrape), que soma os dicionários
+    de todas as threads.
+
+    Quando uma thread termina (o AnyIO recicla as do threadpool), o seu
+    dicionário é somado, com `merge`, a um dicionário base compartilhado,
+    para que não se acumulem os de cada thread que já passou pelo processo.
+
+    Os valores lidos durante escritas concorrentes podem estar defasados em
+    algumas observações, nunca corrompidos.
+    """
+
+    def __init__(self, merge: Callable[[dict, dict], None]):
+        self._merge = merge
+        self._local = local()
+        self._base: dict = {}
+        self._shards: dict[int, dict] = {}
+        self._next_key = itertools.count()
+        self._lock = Lock()
+
+    def get(self) -> dict:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._lock:
+                key = next(self._next_key)
+                self._shards[key] = shard
+            finalizer = weakref.finalize(current_thread(), self._retire, key)
+            finalizer.atexit = False
+            return shard
+
+    def _retire(self, key: int):
+        with self._lock:
+            self._merge(self._base, self._shards.pop(key))
+
+    def snapshot(self) -> list[dict]:
+        with self._lock:
+            shards = [self._base, *self._shards.values()]
+            return [shard.copy() for shard in shards]
+
+
+class Metric:
+    type = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._shards = ThreadShards(self.merge)
+
+    @staticmethod
+    def merge(total: dict, shard: dict):
+        for key, value in shard.items():
+            total[key] = total.get(key, 0) + value
+
+    def _values(self) -> dict:
+        values = {}
+        for shard in self._shards.snapshot():
+            self.merge(values, shard)
+        return values
+
+    def samples(self):
+        for key, value in sorted(self._values().items()):
+            yield self.name, dict(zip(self.labels, key)), value
+
+    def render(self) -> str:
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.type}',
+        ]
+        lines.extend(
+            f'{name}{format_labels(labels)} {format_value(value)}'
+            for name, labels, value in self.samples()
+        )
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, *labels, amount: float = 1):
+        shard = self._shards.get()
+        shard[labels] = shard.get(labels, 0) + amount
+
+
+class Gauge(Counter):
+    # por thread guarda só o delta; a soma das threads é o valor atual
+    type = 'gauge'
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels=(),
+        buckets=LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        shard = self._shards.get()
+        # contagem por bucket (não cumulativa), +Inf e a soma no fim
+        counts = shard.get(labels)
+        if counts is None:
+            counts = shard[labels] = [0] * (len(self.buckets) + 2)
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    @staticmethod
+    def merge(total: dict, shard: dict):
+        # listas novas: o base (e a cópia do snapshot) nunca muda no lugar
+        for key, counts in shard.items():
+            previous = total.get(key)
+            total[key] = (
+                list(counts)
+                if previous is None
+                else [a + b for a, b in zip(previous, list(counts))]
+            )
+
+    def samples(self):
+        for key, counts in sorted(self._values().items()):
+            labels = dict(zip(self.labels, key))
+            cumulative = 0
+            for bound, count in zip(
+                (*self.buckets, float('inf')), counts[:-1]
+            ):
+                cumulative += count
+                yield (
+                    f'{self.name}_bucket',
+                    {**labels, 'le': format_value(bound)},
+                    cumulative,
+                )
+            yield f'{self.name}_sum', labels, counts[-1]
+            yield f'{self.name}_count', labels, cumulative
+
+
+def format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def format_labels(labels: dict) -> str:
+    if not labels:
+        return ''
+    escaped = (
+        '{}="{}"'.format(
+            name,
+            str(value)
+            .replace('\\', r'\\')
+            .replace('"', r'\"')
+            .replace('\n', r'\n'),
+        )
+        for name, value in labels.items()
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds',
+    'HTTP request latency by route.',
+    ('method', 'route'),
+)
+REQUESTS = Counter(
+    'http_requests_total',
+    'HTTP responses by route and status code.',
+    ('method', 'route', 'status'),
+)
+IN_FLIGHT = Gauge(
+    'http_requests_in_flight',
+    'HTTP requests currently being served by route.',
+    ('method', 'route'),
+)
+POOL_WAIT = Histogram(
+    'db_pool_checkout_wait_seconds',
+    'Time spent waiting for a pooled database connection.',
+)
+
+
+class TimedPool:
+    """Mede a espera de cada checkout em `POOL_WAIT`; base de um pool."""
+
+    def _do_get(self):
+        started_at = perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_WAIT.observe(perf_counter() - started_at)
+
+
+class TimedQueuePool(TimedPool, QueuePool):
+    """`QueuePool` que mede a espera de cada checkout."""
+
+
+class TimedAsyncQueuePool(TimedPool, AsyncAdaptedQueuePool):
+    """O mesmo para o `AsyncEngine` (`DATABASE_MODE=async`)."""
+
+
+def resolve_route(routes, scope) -> str:
+    """Template da rota (`/todos/{todo_id}`) que atende `scope`."""
+    # só a regex do path e o método: `route.matches` monta um escopo
+    # filho inteiro e custaria ~50µs por requisição
+    path, method, partial = scope['path'], scope['method'], None
+    for route in routes:
+        if not route.path_regex.match(path):
+            continue
+        methods = getattr(route, 'methods', None)
+        if methods is None or method in methods:
+            return route.path
+        partial = partial or route.path
+    return partial or 'unmatched'
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mede latência, status e requisições em andamento.
+
+    A rota é identificada pelo template (`/todos/{todo_id}`), resolvido
+    contra `routes` antes da requisição entrar, para manter a cardinalidade
+    dos labels limitada ao número de rotas.
+    """
+
+    def __init__(self, app, routes):
+        self.app = app
+        self.routes = routes
+
+    def resolve_route(self, scope) -> str:
+        return resolve_route(self.routes, scope)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        method, route = scope['method'], self.resolve_route(scope)
+        scope[ROUTE_SCOPE_KEY] = route
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        IN_FLIGHT.inc(method, route)
+        started_at = perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_DURATION.observe(
+                perf_counter() - started_at, method, route
+            )
+            REQUESTS.inc(method, route, str(status))
+            IN_FLIGHT.dec(method, route)
+
+
+class QueryStats:
+    """Comandos SQL executados durante uma requisição."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.slowest = 0.0
+        self.slowest_statement: Optional[str] = None
+
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.total += seconds
+        if seconds >= self.slowest:
+            self.slowest = seconds
+            self.slowest_statement = statement
+
+    def server_timing(self) -> str:
+        return (
+            f'db;dur={self.total * 1000:.3f};desc="{self.count} queries", '
+            f'db-slowest;dur={self.slowest * 1000:.3f}'
+        )
+
+
+# preenchida pelos hooks de `fast_zero.database` enquanto a requisição roda;
+# o threadpool copia o contexto, então o modo síncrono também registra
+request_queries: ContextVar[Optional[QueryStats]] = ContextVar(
+    'request_queries', default=None
+)
+
+
+class QueryTimingMiddleware:
+    """
+    Middleware ASGI que coleta os comandos SQL de cada requisição e os
+    devolve no header `Server-Timing` (só os executados antes do início da
+    resposta). O resumo, com o comando mais lento, vai para o log em DEBUG.
+    """
+
+    def __init__(self, app, server_timing: bool = True):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start' and self.server_timing:
+                MutableHeaders(scope=message).append(
+                    'Server-Timing', stats.server_timing()
+                )
+            await send(message)
+
+        token = request_queries.set(stats)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_queries.reset(token)
+            if stats.count:
+                logger.debug(
+                    '%s %s: %d queries in %.1f ms, slowest %.1f ms: %s',
+                    scope['method'],
+                    scope['path'],
+                    stats.count,
+                    stats.total * 1000,
+                    stats.slowest * 1000,
+                    stats.slowest_statement,
+                )
+
+
+def render_pool(engine: Engine) -> list[str]:
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return []
+
+    lines = []
+    for name, documentation, value in (
+        ('db_pool_size', 'Configured pool size.', pool.size()),
+        (
+            'db_pool_checked_out',
+            'Connections currently checked out.',
+            pool.checkedout(),
+        ),
+        (
+            'db_pool_checked_in',
+            'Idle connections in the pool.',
+            pool.checkedin(),
+        ),
+        (
+            'db_pool_overflow',
+            'Connections open beyond the pool size.',
+            max(pool.overflow(), 0),
+        ),
+    ):
+        lines += [
+            f'# HELP {name} {documentation}',
+            f'# TYPE {name} gauge',
+            f'{name} {value}',
+        ]
+    return lines
+
+
+def render_hashing(hashing_pool: HashingPool) -> list[str]:
+    stats = hashing_pool.stats()
+    lines = []
+    for key, name, documentation in (
+        (
+            'hash_time',
+            'argon2_hash_seconds',
+            'Time spent hashing or verifying passwords with Argon2.',
+        ),
+        (
+            'queue_wait',
+            'argon2_queue_wait_seconds',
+            'Time Argon2 calls waited for a hashing worker.',
+        ),
+    ):
+        timing = stats[key]
+        lines += [
+            f'# HELP {name} {documentation}',
+            f'# TYPE {name} summary',
+            f'{name}_sum {format_value(timing["total_seconds"])}',
+            f'{name}_count {timing["count"]}',
+            f'# HELP {name}_max Slowest observation.',
+            f'# TYPE {name}_max gauge',
+            f'{name}_max {format_value(timing["max_seconds"])}',
+        ]
+    return lines
+
+
+def render_metrics(engine: Engine, hashing_pool: HashingPool) -> str:
+    """
+    Métricas no formato texto do Prometheus. Cada processo (worker do
+    uvicorn) tem os seus próprios valores.
+    """
+    sections = [
+        metric.render()
+        for metric in (REQUEST_DURATION, REQUESTS, IN_FLIGHT, POOL_WAIT)
+    ]
+    sections.extend(render_pool(engine))
+    sections.extend(render_hashing(hashing_pool))
+    return '\n'.join(sections) + '\n'
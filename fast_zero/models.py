@@ -1,12 +1,51 @@
-from datetime import datetime
+from datetime import UTC, datetime
 from enum import Enum
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String, func
+from sqlalchemy import (
+    DDL,
+    BigInteger,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    event,
+    func,
+)
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import Mapped, mapped_column, registry
+from sqlalchemy.sql.functions import FunctionElement
 
 table_registry = registry()
 
 
+def utcnow() -> datetime:
+    # gerado na aplicação: resolução de microssegundos também no SQLite,
+    # onde `CURRENT_TIMESTAMP` só tem segundos
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+class utc_now(FunctionElement):
+    """
+    Horário UTC sem fuso no banco, o mesmo relógio de `utcnow`: o `now()` do
+    Postgres seguiria o `TimeZone` da sessão.
+    """
+
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(utc_now)
+def _compile_utc_now(element, compiler, **kw):
+    # no SQLite `CURRENT_TIMESTAMP` já é UTC
+    return 'CURRENT_TIMESTAMP'
+
+
+@compiles(utc_now, 'postgresql')
+def _compile_utc_now_postgresql(element, compiler, **kw):
+    return "timezone('utc', now())"
+
+
 class TodoState(str, Enum):
     draft = 'draft'
     todo = 'todo'
@@ -32,15 +71,264 @@ class User:
         init=False,
         server_default=func.now(),
         server_onupdate=func.now(),  # type: ignore
+        onupdate=utcnow,
     )
 
 
 @table_registry.mapped_as_dataclass
 class Todo:
     __tablename__ = 'todos'
+    __table_args__ = (
+        # índices trigram: `ilike('%x%')` deixa de ser um seq scan no Postgres
+        Index(
+            'ix_todos_title_trgm',
+            'title',
+            postgresql_using='gin',
+            postgresql_ops={'title': 'gin_trgm_ops'},
+        ).ddl_if(dialect='postgresql'),
+        Index(
+            'ix_todos_description_trgm',
+            'description',
+            postgresql_using='gin',
+            postgresql_ops={'description': 'gin_trgm_ops'},
+        ).ddl_if(dialect='postgresql'),
+        # todas as consultas filtram por `user_id`, em geral com `state`,
+        # e ordenam/paginam por `id`
+        Index('ix_todos_user_id_state_id', 'user_id', 'state', 'id'),
+        Index('ix_todos_user_id_id', 'user_id', 'id'),
+        # keyset de `sort=title`: `(title, id) > (:title, :id)` sem sort
+        Index('ix_todos_user_id_title_id', 'user_id', 'title', 'id'),
+    )
 
     id: Mapped[int] = mapped_column(init=False, primary_key=True)
     title: Mapped[str] = mapped_column(String)
     description: Mapped[str] = mapped_column(String)
     user_id: Mapped[int] = mapped_column(ForeignKey('users.id'))
     state: Mapped[TodoState] = mapped_column(default=TodoState.draft)
+    # muda em todo INSERT/UPDATE, inclusive os feitos com `insert()`/
+    # `update()` do Core e o COPY da importação, sempre em UTC
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        init=False,
+        insert_default=utcnow,
+        onupdate=utcnow,
+        server_default=utc_now(),
+    )
+
+
+@table_registry.mapped_as_dataclass
+class TodoCounter:
+    __tablename__ = 'todo_counters'
+
+    # mantida pelos triggers de `todos`, na mesma transação de cada escrita
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE'), primary_key=True
+    )
+    state: Mapped[TodoState] = mapped_column(primary_key=True)
+    count: Mapped[int] = mapped_column(default=0)
+
+
+@table_registry.mapped_as_dataclass
+class RevokedToken:
+    __tablename__ = 'revoked_tokens'
+
+    # `jti` dos refresh tokens revogados (logout ou rotação); as linhas são
+    # removidas depois de `expires_at`, quando o token já não vale mesmo
+    jti: Mapped[str] = mapped_column(String, primary_key=True)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, index=True)
+
+
+@table_registry.mapped_as_dataclass
+class TodoVersion:
+    __tablename__ = 'todo_versions'
+
+    # incrementada pelos triggers de `todos` a cada comando que altera os
+    # todos do usuário, na mesma transação e com o lock da linha: cresce na
+    # ordem dos commits, ao contrário de relógios e sequences
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE'), primary_key=True
+    )
+    version: Mapped[int] = mapped_column(BigInteger, default=0)
+
+
+# Busca textual: pg_trgm no Postgres, tabela FTS5 (trigram) no SQLite
+event.listen(
+    Todo.__table__,
+    'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(
+        dialect='postgresql'
+    ),
+)
+for statement in (
+    'CREATE VIRTUAL TABLE todos_fts USING fts5(title, description, '
+    "content='todos', content_rowid='id', tokenize='trigram')",
+    'CREATE TRIGGER todos_fts_ai AFTER INSERT ON todos BEGIN '
+    'INSERT INTO todos_fts(rowid, title, description) '
+    'VALUES (new.id, new.title, new.description); END',
+    'CREATE TRIGGER todos_fts_ad AFTER DELETE ON todos BEGIN '
+    'INSERT INTO todos_fts(todos_fts, rowid, title, description) '
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    'CREATE TRIGGER todos_fts_au AFTER UPDATE ON todos BEGIN '
+    'INSERT INTO todos_fts(todos_fts, rowid, title, description) '
+    "VALUES ('delete', old.id, old.title, old.description); "
+    'INSERT INTO todos_fts(rowid, title, description) '
+    'VALUES (new.id, new.title, new.description); END',
+):
+    event.listen(
+        Todo.__table__,
+        'after_create',
+        DDL(statement).execute_if(dialect='sqlite'),
+    )
+event.listen(
+    Todo.__table__,
+    'after_drop',
+    DDL('DROP TABLE IF EXISTS todos_fts').execute_if(dialect='sqlite'),
+)
+
+# Contadores por estado: triggers por comando (com tabelas de transição) no
+# Postgres, inclusive para COPY; triggers por linha no SQLite
+event.listen(
+    Todo.__table__,
+    'after_create',
+    DDL(
+        'CREATE OR REPLACE FUNCTION todo_counters_apply() RETURNS trigger '
+        'LANGUAGE plpgsql AS $$ BEGIN '
+        "IF TG_OP = 'INSERT' THEN "
+        'INSERT INTO todo_counters (user_id, state, count) '
+        'SELECT user_id, state, count(*) FROM new_rows '
+        'GROUP BY user_id, state ORDER BY user_id, state '
+        'ON CONFLICT (user_id, state) '
+        'DO UPDATE SET count = todo_counters.count + excluded.count; '
+        "ELSIF TG_OP = 'DELETE' THEN "
+        'INSERT INTO todo_counters (user_id, state, count) '
+        'SELECT user_id, state, -count(*) FROM old_rows '
+        'GROUP BY user_id, state ORDER BY user_id, state '
+        'ON CONFLICT (user_id, state) '
+        'DO UPDATE SET count = todo_counters.count + excluded.count; '
+        'ELSE '
+        'INSERT INTO todo_counters (user_id, state, count) '
+        'SELECT user_id, state, sum(delta) FROM ('
+        'SELECT user_id, state, 1 AS delta FROM new_rows UNION ALL '
+        'SELECT user_id, state, -1 FROM old_rows) AS changes '
+        'GROUP BY user_id, state HAVING sum(delta) <> 0 '
+        'ORDER BY user_id, state '
+        'ON CONFLICT (user_id, state) '
+        'DO UPDATE SET count = todo_counters.count + excluded.count; '
+        'END IF; RETURN NULL; END $$'
+    ).execute_if(dialect='postgresql'),
+)
+for operation, tables in (
+    ('INSERT', 'NEW TABLE AS new_rows'),
+    ('UPDATE', 'OLD TABLE AS old_rows NEW TABLE AS new_rows'),
+    ('DELETE', 'OLD TABLE AS old_rows'),
+):
+    event.listen(
+        Todo.__table__,
+        'after_create',
+        DDL(
+            f'CREATE TRIGGER todo_counters_{operation.lower()} '
+            f'AFTER {operation} ON todos REFERENCING {tables} '
+            'FOR EACH STATEMENT EXECUTE FUNCTION todo_counters_apply()'
+        ).execute_if(dialect='postgresql'),
+    )
+event.listen(
+    Todo.__table__,
+    'after_drop',
+    DDL('DROP FUNCTION IF EXISTS todo_counters_apply()').execute_if(
+        dialect='postgresql'
+    ),
+)
+for statement in (
+    'CREATE TRIGGER todo_counters_ai AFTER INSERT ON todos BEGIN '
+    'INSERT INTO todo_counters (user_id, state, count) '
+    'VALUES (new.user_id, new.state, 1) ON CONFLICT (user_id, state) '
+    'DO UPDATE SET count = count + 1; END',
+    'CREATE TRIGGER todo_counters_ad AFTER DELETE ON todos BEGIN '
+    'UPDATE todo_counters SET count = count - 1 '
+    'WHERE user_id = old.user_id AND state = old.state; END',
+    'CREATE TRIGGER todo_counters_au AFTER UPDATE OF user_id, state ON todos '
+    'WHEN old.user_id IS NOT new.user_id OR old.state IS NOT new.state BEGIN '
+    'UPDATE todo_counters SET count = count - 1 '
+    'WHERE user_id = old.user_id AND state = old.state; '
+    'INSERT INTO todo_counters (user_id, state, count) '
+    'VALUES (new.user_id, new.state, 1) ON CONFLICT (user_id, state) '
+    'DO UPDATE SET count = count + 1; END',
+):
+    event.listen(
+        Todo.__table__,
+        'after_create',
+        DDL(statement).execute_if(dialect='sqlite'),
+    )
+
+# Versões: mesmo esquema dos contadores (por comando no Postgres, por linha
+# no SQLite). Em comandos com vários usuários as linhas são travadas em
+# ordem de `user_id`, como nos contadores.
+event.listen(
+    Todo.__table__,
+    'after_create',
+    DDL(
+        'CREATE OR REPLACE FUNCTION todo_versions_bump() RETURNS trigger '
+        'LANGUAGE plpgsql AS $$ BEGIN '
+        "IF TG_OP = 'INSERT' THEN "
+        'INSERT INTO todo_versions (user_id, version) '
+        'SELECT DISTINCT user_id, 1 FROM new_rows ORDER BY user_id '
+        'ON CONFLICT (user_id) '
+        'DO UPDATE SET version = todo_versions.version + 1; '
+        "ELSIF TG_OP = 'DELETE' THEN "
+        'INSERT INTO todo_versions (user_id, version) '
+        'SELECT DISTINCT user_id, 1 FROM old_rows ORDER BY user_id '
+        'ON CONFLICT (user_id) '
+        'DO UPDATE SET version = todo_versions.version + 1; '
+        'ELSE '
+        'INSERT INTO todo_versions (user_id, version) '
+        'SELECT user_id, 1 FROM ('
+        'SELECT user_id FROM new_rows UNION '
+        'SELECT user_id FROM old_rows) AS changed ORDER BY user_id '
+        'ON CONFLICT (user_id) '
+        'DO UPDATE SET version = todo_versions.version + 1; '
+        'END IF; RETURN NULL; END $$'
+    ).execute_if(dialect='postgresql'),
+)
+for operation, tables in (
+    ('INSERT', 'NEW TABLE AS new_rows'),
+    ('UPDATE', 'OLD TABLE AS old_rows NEW TABLE AS new_rows'),
+    ('DELETE', 'OLD TABLE AS old_rows'),
+):
+    event.listen(
+        Todo.__table__,
+        'after_create',
+        DDL(
+            f'CREATE TRIGGER todo_versions_{operation.lower()} '
+            f'AFTER {operation} ON todos REFERENCING {tables} '
+            'FOR EACH STATEMENT EXECUTE FUNCTION todo_versions_bump()'
+        ).execute_if(dialect='postgresql'),
+    )
+event.listen(
+    Todo.__table__,
+    'after_drop',
+    DDL('DROP FUNCTION IF EXISTS todo_versions_bump()').execute_if(
+        dialect='postgresql'
+    ),
+)
+for statement in (
+    'CREATE TRIGGER todo_versions_ai AFTER INSERT ON todos BEGIN '
+    'INSERT INTO todo_versions (user_id, version) '
+    'VALUES (new.user_id, 1) ON CONFLICT (user_id) '
+    'DO UPDATE SET version = version + 1; END',
+    'CREATE TRIGGER todo_versions_ad AFTER DELETE ON todos BEGIN '
+    'INSERT INTO todo_versions (user_id, version) '
+    'VALUES (old.user_id, 1) ON CONFLICT (user_id) '
+    'DO UPDATE SET version = version + 1; END',
+    'CREATE TRIGGER todo_versions_au AFTER UPDATE ON todos BEGIN '
+    'INSERT INTO todo_versions (user_id, version) '
+    'VALUES (new.user_id, 1) ON CONFLICT (user_id) '
+    'DO UPDATE SET version = version + 1; '
+    'INSERT INTO todo_versions (user_id, version) '
+    'SELECT old.user_id, 1 WHERE old.user_id IS NOT new.user_id '
+    'ON CONFLICT (user_id) DO UPDATE SET version = version + 1; END',
+):
+    event.listen(
+        Todo.__table__,
+        'after_create',
+        DDL(statement).execute_if(dialect='sqlite'),
+    )
@@ -0,0 +1,203 @@
+import math
+from abc import ABC, abstractmethod
+from http import HTTPStatus
+from threading import Lock
+from time import monotonic
+from typing import Optional
+
+from fastapi.responses import JSONResponse
+from jwt import PyJWTError
+
+from fast_zero.metrics import ROUTE_SCOPE_KEY, resolve_route
+from fast_zero.security import decode_access_token
+from fast_zero.settings import Bucket, RouteLimits
+
+
+class RateLimitStorage(ABC):
+    """
+    Estado dos limites. As implementações precisam aceitar chamadas
+    concorrentes. A `MemoryStorage` limita cada processo (worker)
+    separadamente; um backend compartilhado aplica os limites ao conjunto.
+    """
+
+    @abstractmethod
+    def take(self, key: str, bucket: Bucket) -> float:
+        """Consome uma ficha: 0 se havia, senão os segundos até a próxima."""
+
+    @abstractmethod
+    def acquire(self, key: str, limit: int) -> bool:
+        """Ocupa uma das `limit` vagas de `key`, se houver."""
+
+    @abstractmethod
+    def release(self, key: str): ...
+
+    @abstractmethod
+    def clear(self): ...
+
+
+class MemoryShard:
+    def __init__(self):
+        self.lock = Lock()
+        self.full_at: dict[str, float] = {}
+        # chaves que sobraram na última limpeza
+        self.kept = 0
+        self.in_flight: dict[str, int] = {}
+
+
+class MemoryStorage(RateLimitStorage):
+    """
+    Estado em memória dividido em `shards` dicionários, cada um com o seu
+    lock: chaves diferentes raramente disputam o mesmo lock.
+
+    Os baldes seguem o GCRA: em vez de fichas e horário da última recarga,
+    cada chave guarda só o instante em que o balde estaria cheio de novo.
+    Chaves com o balde cheio equivalem a chaves ausentes e são descartadas
+    quando um shard passa de `max_keys` e do dobro do que sobrou na limpeza
+    anterior: com muitas chaves ativas, cada limpeza é paga pelas inserções
+    desde a última, não refeita a cada requisição.
+    """
+
+    def __init__(self, shards: int = 16, max_keys: int = 10_000):
+        self.max_keys = max_keys
+        self._shards = [MemoryShard() for _ in range(shards)]
+
+    def _shard(self, key: str) -> MemoryShard:
+        return self._shards[hash(key) % len(self._shards)]
+
+    def take(self, key: str, bucket: Bucket) -> float:
+        interval = 1 / bucket.rate
+        shard = self._shard(key)
+        with shard.lock:
+            now = monotonic()
+            full_at = max(shard.full_at.get(key, now), now) + interval
+            wait = full_at - now - bucket.burst * interval
+            if wait > 0:
+                return wait
+            shard.full_at[key] = full_at
+            if len(shard.full_at) > max(self.max_keys, 2 * shard.kept):
+                shard.full_at = {
+                    other: at
+                    for other, at in shard.full_at.items()
+                    if at > now
+                }
+                shard.kept = len(shard.full_at)
+            return 0
+
+    def acquire(self, key: str, limit: int) -> bool:
+        shard = self._shard(key)
+        with shard.lock:
+            count = shard.in_flight.get(key, 0)
+            if count >= limit:
+                return False
+            shard.in_flight[key] = count + 1
+            return True
+
+    def release(self, key: str):
+        shard = self._shard(key)
+        with shard.lock:
+            # `clear` pode ter apagado a chave com a requisição em andamento
+            count = shard.in_flight.pop(key, 1) - 1
+            if count:
+                shard.in_flight[key] = count
+
+    def clear(self):
+        for shard in self._shards:
+            with shard.lock:
+                shard.full_at.clear()
+                shard.kept = 0
+                shard.in_flight.clear()
+
+
+def bearer_subject(scope) -> Optional[str]:
+    """`sub` do token do header `Authorization`, se for válido."""
+    for name, value in scope['headers']:
+        if name == b'authorization':
+            scheme, _, token = value.decode('latin-1').partition(' ')
+            if scheme.lower() != 'bearer' or not token:
+                return None
+            try:
+                # mesmo cache de tokens de `get_current_user`
+                return decode_access_token(token).get('sub')
+            except PyJWTError:
+                return None
+    return None
+
+
+class RateLimitMiddleware:
+    """
+    Middleware ASGI com limites por rota (`Settings.RATE_LIMITS`): balde de
+    fichas por IP e por usuário autenticado e um teto de requisições
+    simultâneas por usuário. Requisições acima do limite recebem 429 com
+    `Retry-After`, antes de chegar ao endpoint.
+
+    Rotas sem entrada própria compartilham os baldes de `*`.
+    """
+
+    def __init__(
+        self,
+        app,
+        routes,
+        limits: dict[str, RouteLimits],
+        storage: RateLimitStorage,
+    ):
+        self.app = app
+        self.routes = routes
+        self.limits = limits
+        self.storage = storage
+
+    def route_limits(self, scope) -> tuple[str, Optional[RouteLimits]]:
+        route = scope.get(ROUTE_SCOPE_KEY) or resolve_route(self.routes, scope)
+        name = f'{scope["method"]} {route}'
+        if name not in self.limits:
+            name = '*'
+        return name, self.limits.get(name)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        name, limits = self.route_limits(scope)
+        if limits is None:
+            await self.app(scope, receive, send)
+            return
+
+        user = None
+        if limits.per_user or limits.max_concurrent_per_user:
+            user = bearer_subject(scope)
+
+        buckets = []
+        if limits.per_ip:
+            client = scope.get('client')
+            ip = client[0] if client else 'unknown'
+            buckets.append((f'{name}|ip|{ip}', limits.per_ip))
+        if limits.per_user and user:
+            buckets.append((f'{name}|user|{user}', limits.per_user))
+        for key, bucket in buckets:
+            wait = self.storage.take(key, bucket)
+            if wait:
+                await too_many_requests(wait)(scope, receive, send)
+                return
+
+        in_flight_key = None
+        if limits.max_concurrent_per_user and user:
+            in_flight_key = f'{name}|in_flight|{user}'
+            if not self.storage.acquire(
+                in_flight_key, limits.max_concurrent_per_user
+            ):
+                await too_many_requests(1)(scope, receive, send)
+                return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if in_flight_key:
+                self.storage.release(in_flight_key)
+
+
+def too_many_requests(wait: float) -> JSONResponse:
+    return JSONResponse(
+        status_code=HTTPStatus.TOO_MANY_REQUESTS,
+        content={'detail': 'Too many requests'},
+        headers={'Retry-After': str(max(math.ceil(wait), 1))},
+    )
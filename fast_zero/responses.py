@@ -0,0 +1,64 @@
+import hashlib
+from http import HTTPStatus
+from typing import Any, Optional, Sequence
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    `JSONResponse` serializado pelo `to_json` do pydantic-core: aceita
+    dicts, listas, enums e modelos já construídos sem passar pelo `json`
+    da stdlib.
+
+    Quando o endpoint devolve a resposta pronta, o FastAPI não revalida o
+    conteúdo contra o `response_model`, que continua valendo para o OpenAPI.
+    """
+
+    def render(self, content: Any) -> bytes:  # noqa: PLR6301
+        return to_json(content)
+
+
+def row_payload(row) -> dict:
+    """Linha Core (`select(*colunas)` / `RETURNING`) como dict, sem validar."""
+    return row._asdict()
+
+
+def page_payload(
+    key: str,
+    rows: Sequence,
+    next_cursor: Optional[str],
+    exclude: Sequence[str] = (),
+):
+    items = [row._asdict() for row in rows]
+    # colunas auxiliares da consulta (ex.: o total) que não vão no item
+    for item in items:
+        for name in exclude:
+            del item[name]
+    payload = {key: items}
+    # equivalente ao `response_model_exclude_none=True`
+    if next_cursor is not None:
+        payload['next_cursor'] = next_cursor
+    return payload
+
+
+def make_etag(*version) -> str:
+    """ETag forte a partir dos valores que identificam a versão da resposta."""
+    digest = hashlib.blake2b(repr(version).encode(), digest_size=16)
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # `If-None-Match` usa comparação fraca: `W/"x"` também casa com `"x"`
+    if not if_none_match:
+        return False
+    tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+    return '*' in tags or etag in tags
+
+
+def not_modified(etag: str) -> Response:
+    return Response(
+        status_code=HTTPStatus.NOT_MODIFIED, headers={'ETag': etag}
+    )
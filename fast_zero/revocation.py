@@ -0,0 +1,34 @@
+import asyncio
+import logging
+
+from sqlalchemy import delete
+
+from fast_zero.models import RevokedToken, utcnow
+
+logger = logging.getLogger(__name__)
+
+
+async def prune_revocations(session) -> int:
+    """Apaga as revogações de tokens que já expiraram; devolve quantas."""
+    result = await session.execute(
+        delete(RevokedToken).where(RevokedToken.expires_at <= utcnow())
+    )
+    await session.commit()
+    return result.rowcount
+
+
+async def prune_periodically(session_factory, interval: float):
+    """
+    Roda `prune_revocations` agora e a cada `interval` segundos, com
+    sessões próprias, até a task ser cancelada (iniciada no lifespan).
+
+    Qualquer falha vai para o log e só adia a próxima limpeza; o
+    `CancelledError` não é uma `Exception` e encerra o laço.
+    """
+    while True:
+        try:
+            async with session_factory() as session:
+                await prune_revocations(session)
+        except Exception:
+            logger.exception('pruning expired revocations failed')
+        await asyncio.sleep(interval)
@@ -1,42 +1,122 @@
+from datetime import UTC, datetime
 from http import HTTPStatus
 from typing import Annotated
 
 from fastapi import APIRouter, Depends
 from fastapi.exceptions import HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
+from jwt import PyJWTError
 from sqlalchemy import select
-from sqlalchemy.orm import Session as SQLAlchemySession
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from fast_zero.database import get_session
-from fast_zero.models import User
-from fast_zero.schemas import Token
+from fast_zero.database import get_session, insert_ignoring_conflicts
+from fast_zero.models import RevokedToken, User
+from fast_zero.schemas import (
+    Message,
+    RefreshTokenSchema,
+    Token,
+    TokenPair,
+    UserPublic,
+)
 from fast_zero.security import (
     create_access_token,
+    create_refresh_token,
+    decode_refresh_token,
     get_current_user,
+    hashing_pool,
     verify_password,
 )
 
 router = APIRouter(prefix='/auth', tags=['auth'])
-T_Session = Annotated[SQLAlchemySession, Depends(get_session)]
+T_Session = Annotated[AsyncSession, Depends(get_session)]
 T_OAuth2Form = Annotated[OAuth2PasswordRequestForm, Depends()]
-CurrentUser = Annotated[User, Depends(get_current_user)]
+CurrentUser = Annotated[UserPublic, Depends(get_current_user)]
 
 
-@router.post('/token', response_model=Token)
-def login_for_access_token(session: T_Session, form_data: T_OAuth2Form):
-    user = session.scalar(select(User).where(User.email == form_data.username))
+@router.post('/token', response_model=TokenPair)
+async def login_for_access_token(session: T_Session, form_data: T_OAuth2Form):
+    user = await session.scalar(
+        select(User).where(User.email == form_data.username)
+    )
     # import ipdb; ipdb.set_trace()  # noqa: E702, I001, I001, PLC0415
-    if not user or not verify_password(form_data.password, user.password):
+    if not user or not await hashing_pool.run(
+        verify_password, form_data.password, user.password
+    ):
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND,
             detail='Incorrect email or password',
         )
 
-    access_token = create_access_token(data={'sub': user.email})
-    return {'access_token': access_token, 'token_type': 'Bearer'}
+    return token_pair(user.email)
 
 
 @router.get('/refresh_token', response_model=Token)
-def refresh_access_token(user: CurrentUser):
+async def refresh_access_token(user: CurrentUser):
     new_access_token = create_access_token(data={'sub': user.email})
     return {'access_token': new_access_token, 'token_type': 'Bearer'}
+
+
+@router.post('/refresh_token', response_model=TokenPair)
+async def rotate_refresh_token(body: RefreshTokenSchema, session: T_Session):
+    """
+    Troca um refresh token por um novo par de tokens, sem buscar o usuário:
+    as claims do token assinado bastam. O token usado é revogado (rotação);
+    reapresentá-lo, por exemplo depois de roubado, dá 401.
+    """
+    payload = refresh_token_payload(body.refresh_token)
+
+    # um único comando: a inserção revoga o token e, em conflito, mostra que
+    # ele já tinha sido usado (em qualquer worker, ou em duas requisições
+    # simultâneas com o mesmo token)
+    if not await revoke(session, payload):
+        raise invalid_refresh_token()
+
+    return token_pair(payload['sub'])
+
+
+@router.post('/logout', response_model=Message)
+async def logout(body: RefreshTokenSchema, session: T_Session):
+    payload = refresh_token_payload(body.refresh_token)
+    # idempotente: revogar de novo não é erro
+    await revoke(session, payload)
+    return {'message': 'Logged out'}
+
+
+def token_pair(email: str) -> dict:
+    return {
+        'access_token': create_access_token(data={'sub': email}),
+        'refresh_token': create_refresh_token(data={'sub': email}),
+        'token_type': 'Bearer',
+    }
+
+
+def invalid_refresh_token() -> HTTPException:
+    return HTTPException(
+        status_code=HTTPStatus.UNAUTHORIZED,
+        detail='Invalid refresh token',
+    )
+
+
+def refresh_token_payload(token: str) -> dict:
+    try:
+        return decode_refresh_token(token)
+    except PyJWTError:
+        raise invalid_refresh_token()
+
+
+async def revoke(session: AsyncSession, payload: dict) -> bool:
+    """Registra a revogação; `False` se o token já estava revogado."""
+    expires_at = datetime.fromtimestamp(payload['exp'], UTC)
+    revoked = (
+        await session.execute(
+            insert_ignoring_conflicts(
+                RevokedToken, session.get_bind().dialect.name
+            )
+            .values(
+                jti=payload['jti'], expires_at=expires_at.replace(tzinfo=None)
+            )
+            .returning(RevokedToken.jti)
+        )
+    ).first()
+    await session.commit()
+    return revoked is not None
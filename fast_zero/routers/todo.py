@@ -1,104 +1,542 @@
+import csv
+import io
+import json
 from http import HTTPStatus
-from typing import Annotated, Optional
+from typing import Annotated, Callable, Literal, Optional
 
 # import ipdb  # noqa: F401
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select
-from sqlalchemy.orm import Session as SQLAlchemySession
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import (
+    Integer,
+    Select,
+    String,
+    any_,
+    bindparam,
+    cast,
+    column,
+    delete,
+    func,
+    insert,
+    select,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from fast_zero.database import get_session
-from fast_zero.models import Todo, TodoState, User
+from fast_zero.database import (
+    get_read_session,
+    get_session,
+    get_session_factory,
+)
+from fast_zero.importing import ImportFormatError, copy_todos, iter_todos
+from fast_zero.models import Todo, TodoCounter, TodoState, TodoVersion
+from fast_zero.pagination import (
+    TotalMode,
+    apply_keyset,
+    bound_estimate,
+    estimate_count,
+    paginate,
+)
+from fast_zero.responses import (
+    FastJSONResponse,
+    etag_matches,
+    make_etag,
+    not_modified,
+    page_payload,
+    row_payload,
+)
 from fast_zero.schemas import (
     Message,
+    TodoBulkCreate,
+    TodoBulkDelete,
+    TodoBulkResult,
+    TodoBulkUpdate,
+    TodoImportResult,
     TodoList,
     TodoPublic,
     TodoSchema,
+    TodoStats,
     TodoUpdate,
+    UserPublic,
 )
-from fast_zero.security import get_current_user
+from fast_zero.search import apply_search
+from fast_zero.security import get_current_user, user_cache
+from fast_zero.settings import Settings
 
+settings = Settings()  # type: ignore
 router = APIRouter(prefix='/todos', tags=['todos'])
 
-T_Session = Annotated[SQLAlchemySession, Depends(get_session)]
-CurrentUser = Annotated[User, Depends(get_current_user)]
+T_Session = Annotated[AsyncSession, Depends(get_session)]
+T_ReadSession = Annotated[AsyncSession, Depends(get_read_session)]
+CurrentUser = Annotated[UserPublic, Depends(get_current_user)]
+T_SessionFactory = Annotated[Callable, Depends(get_session_factory)]
+TODO_COLUMNS = (Todo.id, Todo.title, Todo.description, Todo.state)
+EXPORT_FIELDS = ('id', 'title', 'description', 'state')
+EXPORT_MEDIA_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+
+def check_batch_size(items: list):
+    if len(items) > settings.TODO_BULK_MAX_SIZE:
+        raise HTTPException(
+            status_code=HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+            detail=f'Batch exceeds {settings.TODO_BULK_MAX_SIZE} items',
+        )
+
+
+async def owner_not_found(session, user: UserPublic) -> HTTPException:
+    # removido por outro worker, mas ainda no cache deste: a chave
+    # estrangeira `todos.user_id` falha no INSERT
+    await session.rollback()
+    user_cache.invalidate(user.email)
+    return HTTPException(
+        status_code=HTTPStatus.NOT_FOUND, detail='User not found'
+    )
+
+
+def todo_id_in(ids: list[int], dialect: str):
+    # `= ANY(array)` mantém o mesmo SQL para qualquer tamanho de lote
+    if dialect == 'postgresql':
+        return Todo.id == any_(bindparam('ids', ids, type_=ARRAY(Integer)))
+    return Todo.id.in_(ids)
 
 
 @router.post('/', response_model=TodoPublic)
-def create_todo(todo: TodoSchema, session: T_Session, user: CurrentUser):
-    db_todo = Todo(
-        title=todo.title,
-        description=todo.description,
-        state=todo.state,
-        user_id=user.id,
+async def create_todo(todo: TodoSchema, session: T_Session, user: CurrentUser):
+    try:
+        db_todo = (
+            await session.execute(
+                insert(Todo)
+                .values(
+                    title=todo.title,
+                    description=todo.description,
+                    state=todo.state,
+                    user_id=user.id,
+                )
+                .returning(*TODO_COLUMNS)
+            )
+        ).one()
+    except IntegrityError:
+        raise await owner_not_found(session, user)
+    await session.commit()
+
+    return FastJSONResponse(row_payload(db_todo))
+
+
+def filter_todos(
+    query: Select,
+    title: Optional[str],
+    description: Optional[str],
+    state: Optional[TodoState],
+):
+    if title:
+        query = query.filter(Todo.title.ilike(f'%{title}%', escape='\\'))
+
+    if description:
+        query = query.filter(
+            Todo.description.ilike(f'%{description}%', escape='\\')
+        )
+
+    if state:
+        query = query.filter(Todo.state == state)
+
+    return query
+
+
+def todos_version(user_id: int) -> Select:
+    """
+    `(count, versão)` dos todos do usuário, base do ETag de `list_todos`.
+    A versão de `todo_versions` cresce na ordem dos commits; um
+    `max(updated_at)` não: o horário é tomado antes do commit, e uma
+    transação mais lenta pode gravar um valor menor que o já visto.
+    """
+    version = (
+        select(TodoVersion.version)
+        .where(TodoVersion.user_id == user_id)
+        .scalar_subquery()
+    )
+    # `select_from`: a busca (`JOIN todos_fts` no SQLite) parte de `todos`
+    return (
+        select(func.count(), version)
+        .select_from(Todo)
+        .where(Todo.user_id == user_id)
+    )
+
+
+def encode_ndjson(rows):
+    return ''.join(
+        json.dumps({
+            'id': row.id,
+            'title': row.title,
+            'description': row.description,
+            'state': row.state.value,
+        })
+        + '\n'
+        for row in rows
+    )
+
+
+def encode_csv(rows, header: bool = False):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_FIELDS)
+    writer.writerows(
+        (row.id, row.title, row.description, row.state.value) for row in rows
+    )
+    return buffer.getvalue()
+
+
+@router.post(
+    '/bulk', response_model=TodoBulkResult, response_model_exclude_none=True
+)
+async def create_todos_bulk(
+    batch: TodoBulkCreate, session: T_Session, user: CurrentUser
+):
+    check_batch_size(batch.todos)
+    if not batch.todos:
+        return {'results': []}
+
+    try:
+        rows = await session.execute(
+            insert(Todo).returning(
+                *TODO_COLUMNS, sort_by_parameter_order=True
+            ),
+            [
+                {**todo.model_dump(), 'user_id': user.id}
+                for todo in batch.todos
+            ],
+        )
+    except IntegrityError:
+        raise await owner_not_found(session, user)
+    results = [
+        {'id': row.id, 'status': HTTPStatus.CREATED, 'todo': row_payload(row)}
+        for row in rows.all()
+    ]
+    await session.commit()
+
+    return FastJSONResponse({'results': results})
+
+
+@router.patch(
+    '/bulk', response_model=TodoBulkResult, response_model_exclude_none=True
+)
+async def patch_todos_bulk(
+    batch: TodoBulkUpdate, session: T_Session, user: CurrentUser
+):
+    check_batch_size(batch.todos)
+    ids = [item.id for item in batch.todos]
+    if len(set(ids)) != len(ids):
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail='Duplicate todo ids in batch',
+        )
+    if not ids:
+        return {'results': []}
+
+    # UPDATE ... FROM (VALUES ...): campos nulos mantêm o valor atual
+    state_type = Todo.__table__.c.state.type
+    changes = values(
+        column('id', Integer),
+        column('title', String),
+        column('description', String),
+        column('state', state_type),
+        name='changes',
+    ).data([
+        (item.id, item.title, item.description, item.state)
+        for item in batch.todos
+    ])
+    rows = await session.execute(
+        update(Todo)
+        .where(Todo.id == changes.c.id, Todo.user_id == user.id)
+        .values(
+            title=func.coalesce(changes.c.title, Todo.title),
+            description=func.coalesce(changes.c.description, Todo.description),
+            state=func.coalesce(cast(changes.c.state, state_type), Todo.state),
+        )
+        .returning(*TODO_COLUMNS)
+        .execution_options(synchronize_session=False)
     )
-    session.add(db_todo)
-    session.commit()
-    session.refresh(db_todo)
+    updated = {row.id: row_payload(row) for row in rows.all()}
+    await session.commit()
+
+    return FastJSONResponse({
+        'results': [
+            {'id': todo_id, 'status': HTTPStatus.OK, 'todo': updated[todo_id]}
+            if todo_id in updated
+            else {
+                'id': todo_id,
+                'status': HTTPStatus.NOT_FOUND,
+                'detail': 'Task not found.',
+            }
+            for todo_id in ids
+        ]
+    })
+
+
+@router.delete(
+    '/bulk', response_model=TodoBulkResult, response_model_exclude_none=True
+)
+async def delete_todos_bulk(
+    batch: TodoBulkDelete, session: T_Session, user: CurrentUser
+):
+    check_batch_size(batch.ids)
+    if not batch.ids:
+        return {'results': []}
+
+    dialect = session.get_bind().dialect.name
+    deleted = await session.scalars(
+        delete(Todo)
+        .where(Todo.user_id == user.id, todo_id_in(batch.ids, dialect))
+        .returning(Todo.id)
+        .execution_options(synchronize_session=False)
+    )
+    deleted = set(deleted.all())
+    await session.commit()
+
+    return FastJSONResponse({
+        'results': [
+            {'id': todo_id, 'status': HTTPStatus.OK}
+            if todo_id in deleted
+            else {
+                'id': todo_id,
+                'status': HTTPStatus.NOT_FOUND,
+                'detail': 'Task not found.',
+            }
+            for todo_id in batch.ids
+        ]
+    })
+
+
+@router.get('/export')
+async def export_todos(  # noqa: PLR0913, PLR0917
+    session_factory: T_SessionFactory,
+    user: CurrentUser,
+    format: Literal['ndjson', 'csv'] = Query('ndjson'),
+    title: Optional[str] = Query(None),
+    description: Optional[str] = Query(None),
+    state: Optional[TodoState] = Query(None),
+):
+    query = filter_todos(
+        select(*TODO_COLUMNS).where(Todo.user_id == user.id),
+        title,
+        description,
+        state,
+    ).order_by(Todo.id)
 
-    return db_todo
+    encode = encode_csv if format == 'csv' else encode_ndjson
+
+    async def content():
+        if format == 'csv':
+            yield encode_csv([], header=True)
+        # cursor no servidor: no máximo EXPORT_CHUNK_SIZE linhas em memória
+        async with session_factory() as session:
+            result = await session.stream(
+                query.execution_options(yield_per=settings.EXPORT_CHUNK_SIZE)
+            )
+            async for rows in result.partitions():
+                yield encode(rows)
+
+    return StreamingResponse(
+        content(),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={
+            'Content-Disposition': f'attachment; filename=todos.{format}'
+        },
+    )
 
 
-@router.get('/', response_model=TodoList)
-def list_todos(  # noqa
+@router.post(
+    '/import',
+    response_model=TodoImportResult,
+    openapi_extra={
+        'requestBody': {
+            'required': True,
+            'content': {media: {} for media in EXPORT_MEDIA_TYPES.values()},
+        }
+    },
+)
+async def import_todos(
+    request: Request,
     session: T_Session,
     user: CurrentUser,
+    format: Literal['ndjson', 'csv'] = Query('ndjson'),
+):
+    """
+    Importa o corpo em lotes de `IMPORT_CHUNK_SIZE` linhas, um `COPY` por
+    lote, todos na mesma transação: se a requisição falhar no meio, nenhum
+    lote fica gravado. Linhas inválidas não interrompem a importação.
+    """
+    result = {'imported': 0, 'failed': 0, 'chunks': [], 'errors': []}
+    rows = []
+
+    async def flush():
+        try:
+            await session.run_sync(copy_todos, rows)
+        except IntegrityError:
+            raise await owner_not_found(session, user)
+        result['imported'] += len(rows)
+        result['chunks'].append({
+            'chunk': len(result['chunks']) + 1,
+            'rows': len(rows),
+        })
+        rows.clear()
+
+    try:
+        async for line, todo in iter_todos(
+            request.stream(), format, settings.IMPORT_MAX_LINE_LENGTH
+        ):
+            if isinstance(todo, str):
+                result['failed'] += 1
+                if len(result['errors']) < settings.IMPORT_MAX_ERRORS:
+                    result['errors'].append({'line': line, 'detail': todo})
+                continue
+
+            rows.append((todo.title, todo.description, todo.state, user.id))
+            if len(rows) >= settings.IMPORT_CHUNK_SIZE:
+                await flush()
+    except ImportFormatError as error:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST, detail=str(error)
+        )
+
+    if rows:
+        await flush()
+    await session.commit()
+
+    return result
+
+
+@router.get('/stats', response_model=TodoStats)
+async def todo_stats(session: T_Session, user: CurrentUser):
+    # contadores mantidos pelos triggers: leitura pela chave primária, sem
+    # GROUP BY sobre `todos`
+    rows = await session.execute(
+        select(TodoCounter.state, TodoCounter.count).where(
+            TodoCounter.user_id == user.id
+        )
+    )
+    counts = dict.fromkeys(TodoState, 0)
+    counts.update(rows.tuples().all())
+
+    return FastJSONResponse({'total': sum(counts.values()), 'counts': counts})
+
+
+@router.get('/', response_model=TodoList, response_model_exclude_none=True)
+async def list_todos(  # noqa
+    request: Request,
+    session: T_ReadSession,
+    user: CurrentUser,
     title: Optional[str] = Query(None),
     description: Optional[str] = Query(None),
     state: Optional[TodoState] = Query(None),
     offset: int = Query(0),
     limit: int = Query(10),
+    after: Optional[str] = Query(None),
+    sort: Literal['id', 'title'] = Query('id'),
+    q: Optional[str] = Query(None, min_length=3),
+    include_total: Optional[TotalMode] = Query(None),
 ):
     # import ipdb; ipdb.set_trace()  # noqa: E702, I001, I001, PLC0415
-    query = select(Todo).where(Todo.user_id == user.id)
-    # import ipdb; ipdb.set_trace()  # noqa: E702, I001, I001, PLC0415
-    if title:
-        query = query.filter(Todo.title.ilike(f'%{title}%', escape='\\'))
+    query = filter_todos(
+        select(*TODO_COLUMNS).where(Todo.user_id == user.id),
+        title,
+        description,
+        state,
+    )
+    # `count` do conjunto filtrado (um DELETE ou saída do filtro o muda) e a
+    # versão dos todos do usuário (muda em qualquer escrita)
+    version_query = filter_todos(
+        todos_version(user.id), title, description, state
+    )
+    dialect = session.get_bind().dialect.name
+    if q:
+        version_query = apply_search(version_query, q, dialect).order_by(None)
 
-    if description:
-        query = query.filter(
-            Todo.description.ilike(f'%{description}%', escape='\\')
-        )
+    # calculado antes da página: numa escrita concorrente o ETag fica mais
+    # antigo que o conteúdo (o cliente só baixa de novo), nunca o contrário
+    count, version = (await session.execute(version_query)).one()
+    etag = make_etag(user.id, count, version, str(request.query_params))
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        return not_modified(etag)
 
-    if state:
-        query = query.filter(Todo.state == state)
+    if q:
+        # resultados ordenados por relevância: paginação apenas por offset
+        query = apply_search(query, q, dialect)
+        todos = (
+            await session.execute(query.offset(offset).limit(limit))
+        ).all()
+        next_cursor = None
+        complete = len(todos) < limit
+    else:
+        todos = (
+            await session.execute(
+                apply_keyset(query, Todo, sort, after)
+                .offset(offset)
+                .limit(limit + 1)
+            )
+        ).all()
+        todos, next_cursor = paginate(todos, limit, sort)
+        complete = next_cursor is None
 
-    todos = session.execute(query.offset(offset).limit(limit)).scalars().all()
+    headers = {'ETag': etag}
+    if include_total == 'exact':
+        # o `count` da versão já é o total filtrado, sem cursor nem offset
+        headers['X-Total-Count'] = str(count)
+    elif include_total == 'estimate':
+        estimate = await session.run_sync(estimate_count, query)
+        headers['X-Total-Count'] = str(
+            count
+            if estimate is None
+            else bound_estimate(estimate, todos, complete, offset, after)
+        )
 
-    # Retornando os dados como um dicionário com a chave `todos`
-    return TodoList(todos=[TodoPublic.model_validate(todo) for todo in todos])
+    # linhas vindas do banco: serializadas direto, sem revalidar cada item
+    return FastJSONResponse(
+        page_payload('todos', todos, next_cursor), headers=headers
+    )
 
 
 @router.patch('/{todo_id}', response_model=TodoPublic)
-def patch_todo(
+async def patch_todo(
     todo_id: int, session: T_Session, user: CurrentUser, todo: TodoUpdate
 ):
-    db_todo = session.scalar(
-        select(Todo).where((Todo.user_id == user.id) & (Todo.id == todo_id))
+    changes = todo.model_dump(exclude_unset=True)
+    owned_todo = (Todo.user_id == user.id) & (Todo.id == todo_id)
+    # UPDATE ... RETURNING: busca, altera e devolve a linha em um só comando
+    query = (
+        update(Todo)
+        .where(owned_todo)
+        .values(**changes)
+        .returning(*TODO_COLUMNS)
+        .execution_options(synchronize_session=False)
+        if changes
+        else select(*TODO_COLUMNS).where(owned_todo)
     )
+    db_todo = (await session.execute(query)).first()
     if not db_todo:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail='Task not found.'
         )
 
-    for key, value in todo.model_dump(exclude_unset=True).items():
-        setattr(db_todo, key, value)
-
-    session.add(db_todo)
-    session.commit()
-    session.refresh(db_todo)
-    return db_todo
+    await session.commit()
+    return FastJSONResponse(row_payload(db_todo))
 
 
 @router.delete('/{todo_id}', response_model=Message)
-def delete_todo(todo_id: int, session: T_Session, user: CurrentUser):
-    todo = session.scalar(
-        select(Todo).where((Todo.user_id == user.id) & (Todo.id == todo_id))
+async def delete_todo(todo_id: int, session: T_Session, user: CurrentUser):
+    deleted_id = await session.scalar(
+        delete(Todo)
+        .where((Todo.user_id == user.id) & (Todo.id == todo_id))
+        .returning(Todo.id)
+        .execution_options(synchronize_session=False)
     )
-    if not todo:
+    if not deleted_id:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail='Task not found.'
         )
-    session.delete(todo)
-    session.commit()
+    await session.commit()
 
     return Message(message='Task has been deleted successfully.')
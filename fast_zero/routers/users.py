@@ -1,62 +1,144 @@
 from http import HTTPStatus
-from typing import Annotated
+from typing import Annotated, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
-from sqlalchemy.orm import Session as SQLAlchemySession
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from fast_zero.database import get_session
+from fast_zero.database import (
+    get_read_session,
+    get_session,
+    insert_ignoring_conflicts,
+)
 from fast_zero.models import User
+from fast_zero.pagination import (
+    TotalMode,
+    apply_keyset,
+    bound_estimate,
+    count_query,
+    estimate_count,
+    paginate,
+)
+from fast_zero.responses import (
+    FastJSONResponse,
+    etag_matches,
+    make_etag,
+    not_modified,
+    page_payload,
+    row_payload,
+)
 from fast_zero.schemas import Message, UserList, UserPublic, UserSchema
-from fast_zero.security import get_current_user, get_password_hash
+from fast_zero.security import (
+    get_current_user,
+    get_password_hash,
+    hashing_pool,
+    user_cache,
+)
 
 router = APIRouter(prefix='/users', tags=['users'])
 
-T_Session = Annotated[SQLAlchemySession, Depends(get_session)]
-T_CurrentUser = Annotated[User, Depends(get_current_user)]
+T_Session = Annotated[AsyncSession, Depends(get_session)]
+T_ReadSession = Annotated[AsyncSession, Depends(get_read_session)]
+T_CurrentUser = Annotated[UserPublic, Depends(get_current_user)]
+USER_COLUMNS = (User.id, User.username, User.email)
 
 
 @router.post('/', status_code=HTTPStatus.CREATED, response_model=UserPublic)
-def create_user(user: UserSchema, session: T_Session):
-    db_user = session.scalar(
-        select(User).where(
-            (User.username == user.username) | (User.email == user.email)
+async def create_user(user: UserSchema, session: T_Session):
+    # INSERT ... ON CONFLICT DO NOTHING RETURNING: sem SELECT prévio e sem
+    # corrida entre a verificação e a inserção
+    db_user = (
+        await session.execute(
+            insert_ignoring_conflicts(User, session.get_bind().dialect.name)
+            .values(
+                username=user.username,
+                password=await hashing_pool.run(
+                    get_password_hash, user.password
+                ),
+                email=user.email,
+            )
+            .returning(*USER_COLUMNS)
         )
-    )
-    UserExistsException = HTTPException(status_code=HTTPStatus.BAD_REQUEST)
+    ).first()
 
-    if db_user:
-        if db_user.username == user.username:
+    if not db_user:
+        # só no caminho de conflito: descobre qual campo já existe
+        conflict = await session.scalar(
+            select(User).where(
+                (User.username == user.username) | (User.email == user.email)
+            )
+        )
+        UserExistsException = HTTPException(status_code=HTTPStatus.BAD_REQUEST)
+        if conflict and conflict.username == user.username:
             UserExistsException.detail = 'Username already exists'
-            raise UserExistsException
-        elif db_user.email == user.email:
+        else:
             UserExistsException.detail = 'Email already exists'
-            raise UserExistsException
-    db_user = User(
-        username=user.username,
-        password=get_password_hash(user.password),
-        email=user.email,
-    )
+        raise UserExistsException
 
-    session.add(db_user)
-    session.commit()
-    session.refresh(db_user)
+    await session.commit()
 
-    return db_user
+    return FastJSONResponse(
+        row_payload(db_user), status_code=HTTPStatus.CREATED
+    )
 
 
-@router.get('/', status_code=HTTPStatus.OK, response_model=UserList)
-def read_users(
-    session: T_Session,
+@router.get(
+    '/',
+    status_code=HTTPStatus.OK,
+    response_model=UserList,
+    response_model_exclude_none=True,
+)
+async def read_users(  # noqa: PLR0913, PLR0917
+    session: T_ReadSession,
     limit: int = 10,
     skip: int = 0,
+    after: Optional[str] = None,
+    sort: Literal['id', 'username'] = 'id',
+    include_total: Optional[TotalMode] = None,
 ):
-    users = session.scalars(select(User).limit(limit).offset(skip))
-    return {'users': users}
+    query = select(*USER_COLUMNS)
+    if include_total == 'exact':
+        # total na mesma consulta da página, como subconsulta escalar
+        query = query.add_columns(
+            count_query(select(User.id)).scalar_subquery().label('total')
+        )
+    rows = await session.execute(
+        apply_keyset(query, User, sort, after).limit(limit + 1).offset(skip)
+    )
+    users, next_cursor = paginate(rows.all(), limit, sort)
+
+    headers = {}
+    if include_total == 'exact':
+        # página vazia (cursor ou `skip` além do fim) não traz a coluna
+        total = (
+            users[0].total
+            if users
+            else await session.scalar(count_query(select(User.id)))
+        )
+        headers['X-Total-Count'] = str(total)
+    elif include_total == 'estimate':
+        estimate = await session.run_sync(estimate_count, select(User.id))
+        if estimate is None:
+            estimate = await session.scalar(count_query(select(User.id)))
+        else:
+            estimate = bound_estimate(
+                estimate, users, next_cursor is None, skip, after
+            )
+        headers['X-Total-Count'] = str(estimate)
+
+    return FastJSONResponse(
+        page_payload(
+            'users',
+            users,
+            next_cursor,
+            exclude=('total',) if include_total == 'exact' else (),
+        ),
+        headers=headers,
+    )
 
 
 @router.put('/{user_id}', response_model=UserPublic)
-def udpate_user(
+async def udpate_user(
     user_id: int,
     user: UserSchema,
     session: T_Session,
@@ -67,36 +149,58 @@ def udpate_user(
             status_code=HTTPStatus.FORBIDDEN, detail='Not enough permission'
         )
 
-    current_user.email = user.email
-    current_user.username = user.username
-    current_user.password = get_password_hash(user.password)
+    db_user = await session.get(User, current_user.id)
+    if not db_user:
+        user_cache.invalidate(current_user.email)
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND, detail='User not found'
+        )
+
+    db_user.email = user.email
+    db_user.username = user.username
+    db_user.password = await hashing_pool.run(get_password_hash, user.password)
 
-    session.commit()
-    session.refresh(current_user)
+    await session.commit()
+    await session.refresh(db_user)
+    user_cache.invalidate(current_user.email)
 
-    return current_user
+    return db_user
 
 
 @router.delete('/{user_id}', response_model=Message)
-def delete_user(user_id: int, session: T_Session, current_user: T_CurrentUser):
+async def delete_user(
+    user_id: int, session: T_Session, current_user: T_CurrentUser
+):
     # import ipdb; ipdb.set_trace()  # noqa: E702, I001, I001, PLC0415
 
     if current_user.id != user_id:
         raise HTTPException(
             status_code=HTTPStatus.FORBIDDEN, detail='Not enough permission'
         )
-    session.delete(current_user)
-    session.commit()
+    await session.execute(delete(User).where(User.id == current_user.id))
+    await session.commit()
+    user_cache.invalidate(current_user.email)
 
     return {'message': 'User deleted'}
 
 
 @router.get('/{user_id}', response_model=UserPublic)
-def get_user_by_id(user_id: int, session: T_Session):
-    db_user = session.scalar(select(User).where(User.id == user_id))
+async def get_user_by_id(
+    user_id: int, request: Request, session: T_ReadSession
+):
+    db_user = (
+        await session.execute(
+            select(*USER_COLUMNS, User.updated_at).where(User.id == user_id)
+        )
+    ).first()
     if not db_user:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail='User not found'
         )
 
-    return db_user
+    user = row_payload(db_user)
+    etag = make_etag(user['id'], user.pop('updated_at'))
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        return not_modified(etag)
+
+    return FastJSONResponse(user, headers={'ETag': etag})
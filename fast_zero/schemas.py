@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, ConfigDict, EmailStr
 
@@ -25,6 +25,7 @@ class UserPublic(BaseModel):
 
 class UserList(BaseModel):
     users: List[UserPublic]
+    next_cursor: Optional[str] = None
 
 
 class Token(BaseModel):
@@ -32,6 +33,14 @@ class Token(BaseModel):
     token_type: str
 
 
+class TokenPair(Token):
+    refresh_token: str
+
+
+class RefreshTokenSchema(BaseModel):
+    refresh_token: str
+
+
 class TodoSchema(BaseModel):
     title: str
     description: str
@@ -46,9 +55,59 @@ class TodoPublic(TodoSchema):
 
 class TodoList(BaseModel):
     todos: List[TodoPublic]
+    next_cursor: Optional[str] = None
+
+
+class TodoStats(BaseModel):
+    total: int
+    counts: Dict[TodoState, int]
 
 
 class TodoUpdate(TodoSchema):
     title: Optional[str] = None
     description: Optional[str] = None
     state: Optional[TodoState] = None
+
+
+class TodoBulkCreate(BaseModel):
+    todos: List[TodoSchema]
+
+
+class TodoBulkUpdateItem(TodoUpdate):
+    id: int
+
+
+class TodoBulkUpdate(BaseModel):
+    todos: List[TodoBulkUpdateItem]
+
+
+class TodoBulkDelete(BaseModel):
+    ids: List[int]
+
+
+class TodoBulkItemResult(BaseModel):
+    id: Optional[int] = None
+    status: int
+    todo: Optional[TodoPublic] = None
+    detail: Optional[str] = None
+
+
+class TodoBulkResult(BaseModel):
+    results: List[TodoBulkItemResult]
+
+
+class TodoImportChunk(BaseModel):
+    chunk: int
+    rows: int
+
+
+class TodoImportError(BaseModel):
+    line: int
+    detail: str
+
+
+class TodoImportResult(BaseModel):
+    imported: int
+    failed: int
+    chunks: List[TodoImportChunk]
+    errors: List[TodoImportError]
@@ -0,0 +1,44 @@
+from sqlalchemy import Select, column, func, literal_column, or_, table
+
+from fast_zero.models import Todo
+
+todos_fts = table('todos_fts', column('rowid'), column('rank'))
+
+
+def escape_like(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def apply_search(query: Select, q: str, dialect: str) -> Select:
+    """
+    Filtra `query` pelos todos cujo título ou descrição contém `q` e ordena
+    pela relevância.
+
+    - postgresql: `ILIKE` servido pelos índices GIN trigram, ordenado por
+      `similarity()`;
+    - sqlite: `MATCH` na tabela FTS5 (tokenizer trigram), ordenado por bm25;
+    - demais: `ILIKE` sem ranking.
+    """
+    if dialect == 'sqlite':
+        phrase = '"{}"'.format(q.replace('"', '""'))
+        return (
+            query.join(todos_fts, todos_fts.c.rowid == Todo.id)
+            .where(literal_column('todos_fts').op('MATCH')(phrase))
+            .order_by(todos_fts.c.rank, Todo.id)
+        )
+
+    pattern = f'%{escape_like(q)}%'
+    query = query.where(
+        or_(
+            Todo.title.ilike(pattern, escape='\\'),
+            Todo.description.ilike(pattern, escape='\\'),
+        )
+    )
+    if dialect == 'postgresql':
+        rank = func.greatest(
+            func.similarity(Todo.title, q),
+            func.similarity(Todo.description, q),
+        )
+        return query.order_by(rank.desc(), Todo.id)
+
+    return query.order_by(Todo.id)
@@ -1,21 +1,46 @@
 from datetime import datetime, timedelta
+from hashlib import sha256
 from http import HTTPStatus
+from secrets import token_urlsafe
+from time import time
 
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
-from jwt import ExpiredSignatureError, PyJWTError, decode, encode
+from jwt import (
+    ExpiredSignatureError,
+    InvalidTokenError,
+    PyJWTError,
+    decode,
+    encode,
+)
 from pwdlib import PasswordHash
 from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from zoneinfo import ZoneInfo
 
-from fast_zero.database import get_session
+from fast_zero.cache import TTLCache
+from fast_zero.database import get_read_session
+from fast_zero.hashing import HashingPool
 from fast_zero.models import User
+from fast_zero.schemas import UserPublic
 from fast_zero.settings import Settings
 
 settings = Settings()  # type: ignore
 pwd_context = PasswordHash.recommended()
+hashing_pool = HashingPool(
+    max_workers=settings.HASHING_WORKERS,
+    max_queue=settings.HASHING_MAX_QUEUE,
+    # as funções de hashing são importadas daqui nos processos do pool
+    preload=(__name__,),
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='auth/token')
+# Identidade (id, email, username) do usuário autenticado, indexada pelo `sub`
+user_cache = TTLCache(
+    maxsize=settings.USER_CACHE_MAX_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS
+)
+# Claims de tokens já verificados, indexadas pelo digest do token até o `exp`
+token_cache = TTLCache(maxsize=settings.TOKEN_CACHE_MAX_SIZE, ttl=0)
+REFRESH_TOKEN_TYPE = 'refresh'
 
 
 def get_password_hash(password: str):
@@ -34,15 +59,67 @@ def create_access_token(data: dict):
     to_encode.update({'exp': expire})
 
     encoded_jwt = encode(
-        to_encode,
-        key=settings.SECRET_KEY,
-        algorithm=settings.ALGORITHM
+        to_encode, key=settings.SECRET_KEY, algorithm=settings.ALGORITHM
     )
     return encoded_jwt
 
 
-def get_current_user(
-    session: Session = Depends(get_session), token=Depends(oauth2_scheme)
+def create_refresh_token(data: dict):
+    """
+    Token de longa duração que só serve para `POST /auth/refresh_token` e
+    `POST /auth/logout`; o `jti` identifica o token na revogação.
+    """
+    expire = datetime.now(tz=ZoneInfo('UTC')) + timedelta(
+        days=settings.REFRESH_TOKEN_EXPIRE_DAYS
+    )
+    to_encode = data | {
+        'type': REFRESH_TOKEN_TYPE,
+        'jti': token_urlsafe(16),
+        'exp': expire,
+    }
+
+    return encode(
+        to_encode, key=settings.SECRET_KEY, algorithm=settings.ALGORITHM
+    )
+
+
+def decode_refresh_token(token: str) -> dict:
+    payload = verify_token(token)
+    if payload.get('type') != REFRESH_TOKEN_TYPE:
+        raise InvalidTokenError('not a refresh token')
+    if not payload.get('sub') or not payload.get('jti'):
+        raise InvalidTokenError('incomplete refresh token')
+    return payload
+
+
+def verify_token(token: str) -> dict:
+    return decode(
+        jwt=token,
+        key=settings.SECRET_KEY,
+        algorithms=[settings.ALGORITHM],
+        options={'verify_exp': True},
+    )
+
+
+def decode_access_token(token: str) -> dict:
+    if not settings.TOKEN_CACHE_ENABLED:
+        return verify_token(token)
+
+    key = sha256(token.encode()).digest()
+    payload = token_cache.get(key)
+    if payload and payload['exp'] > time():
+        return payload
+
+    payload = verify_token(token)
+    if 'exp' in payload:
+        token_cache.set(key, payload, ttl=payload['exp'] - time())
+
+    return payload
+
+
+async def get_current_user(
+    session: AsyncSession = Depends(get_read_session),
+    token=Depends(oauth2_scheme),
 ):
     # breakpoint()
     credentials_exception = HTTPException(
@@ -52,14 +129,10 @@ def get_current_user(
     )
     # import ipdb; ipdb.set_trace()  # noqa: E702, I001, I001, PLC0415
     try:
-        payload = decode(
-            jwt=token,
-            key=settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM],
-            options={'verify_exp': True},
-        )
+        payload = decode_access_token(token)
         username: str = payload.get('sub')
-        if not username:
+        # refresh tokens não autenticam requisições
+        if not username or payload.get('type') == REFRESH_TOKEN_TYPE:
             raise credentials_exception
 
     except ExpiredSignatureError:
@@ -67,9 +140,19 @@ def get_current_user(
     except PyJWTError:
         raise credentials_exception
 
-    user_db = session.scalar(select(User).where(User.email == username))
+    current_user = user_cache.get(username)
+    if current_user:
+        return current_user
+
+    # lida antes da consulta: uma escrita que invalide o usuário enquanto
+    # ela roda descarta o resultado, em vez de deixá-lo no cache até o TTL
+    generation = user_cache.generation(username)
+    user_db = await session.scalar(select(User).where(User.email == username))
 
     if not user_db:
         raise credentials_exception
 
-    return user_db
+    current_user = UserPublic.model_validate(user_db)
+    user_cache.set(username, current_user, generation=generation)
+
+    return current_user
@@ -0,0 +1,105 @@
+import logging
+import logging.config
+import math
+import os
+from copy import deepcopy
+from importlib.util import find_spec
+from pathlib import Path
+from typing import Optional
+
+import uvicorn
+from uvicorn.config import LOGGING_CONFIG
+
+from fast_zero.settings import Settings
+
+logger = logging.getLogger(__name__)
+CGROUP_ROOT = Path('/sys/fs/cgroup')
+
+
+def cgroup_cpu_limit(root: Path = CGROUP_ROOT) -> Optional[float]:
+    """
+    Cota de CPU do container (cgroup v2 `cpu.max` ou v1 `cfs_quota_us`),
+    em CPUs. `None` quando não há limite.
+    """
+    try:
+        quota, period = (root / 'cpu.max').read_text().split()
+    except FileNotFoundError:
+        try:
+            quota = (root / 'cpu' / 'cpu.cfs_quota_us').read_text().strip()
+            period = (root / 'cpu' / 'cpu.cfs_period_us').read_text()
+        except FileNotFoundError:
+            return None
+    if quota in {'max', '-1'}:
+        return None
+    return int(quota) / int(period)
+
+
+def available_cpus(root: Path = CGROUP_ROOT) -> int:
+    """CPUs que o processo pode usar: afinidade e cota do cgroup."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # pragma: no cover - sem sched_getaffinity
+        cpus = os.cpu_count() or 1
+    limit = cgroup_cpu_limit(root)
+    if limit is not None:
+        cpus = min(cpus, math.ceil(limit))
+    return max(cpus, 1)
+
+
+def log_config(level: str) -> dict:
+    """A configuração de log do uvicorn, com os loggers de `fast_zero`."""
+    config = deepcopy(LOGGING_CONFIG)
+    config['loggers']['fast_zero'] = {
+        'handlers': ['default'],
+        'level': level.upper(),
+        'propagate': False,
+    }
+    # o SQLAlchemy nomeia o logger do pool pela classe: sem isso os pools
+    # de `fast_zero.metrics` registrariam cada checkout em DEBUG
+    for pool in ('TimedQueuePool', 'TimedAsyncQueuePool'):
+        config['loggers'][f'fast_zero.metrics.{pool}'] = {'level': 'WARNING'}
+    return config
+
+
+def server_options(settings: Settings, **overrides) -> dict:
+    """
+    Argumentos de `uvicorn.run` para produção a partir do `Settings`.
+
+    Com vários workers o uvicorn inicia cada um com `spawn`: o app (e o
+    pool de conexões) é criado dentro do worker, nunca herdado do processo
+    principal.
+    """
+    options = {
+        'host': settings.SERVER_HOST,
+        'port': settings.SERVER_PORT,
+        'workers': settings.SERVER_WORKERS or available_cpus(),
+        # uvloop e httptools são opcionais: sem eles, asyncio e h11
+        'loop': 'uvloop' if find_spec('uvloop') else 'asyncio',
+        'http': 'httptools' if find_spec('httptools') else 'h11',
+        'backlog': settings.SERVER_BACKLOG,
+        'timeout_keep_alive': settings.SERVER_KEEPALIVE_SECONDS,
+        'timeout_graceful_shutdown': settings.SERVER_GRACEFUL_SHUTDOWN_SECONDS,
+        'access_log': settings.SERVER_ACCESS_LOG,
+        'proxy_headers': bool(settings.SERVER_FORWARDED_ALLOW_IPS),
+        'forwarded_allow_ips': settings.SERVER_FORWARDED_ALLOW_IPS,
+        'log_level': settings.LOG_LEVEL.lower(),
+    }
+    options |= {
+        key: value for key, value in overrides.items() if value is not None
+    }
+    options['log_config'] = log_config(options['log_level'])
+    return options
+
+
+def serve(settings: Settings, **overrides):
+    options = server_options(settings, **overrides)
+    logging.config.dictConfig(options['log_config'])
+    logger.info(
+        'starting %d workers on %s:%d (loop=%s, http=%s)',
+        options['workers'],
+        options['host'],
+        options['port'],
+        options['loop'],
+        options['http'],
+    )
+    uvicorn.run('fast_zero.factory:create_app', factory=True, **options)
@@ -1,6 +1,47 @@
+from typing import Literal, Optional
+
+from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+class Bucket(BaseModel):
+    # fichas por segundo e quantas podem se acumular (rajada)
+    rate: float = Field(gt=0)
+    burst: int = Field(ge=1)
+
+
+class RouteLimits(BaseModel):
+    per_ip: Optional[Bucket] = None
+    per_user: Optional[Bucket] = None
+    # requisições simultâneas do mesmo usuário
+    max_concurrent_per_user: Optional[int] = None
+
+
+# chaves no formato `MÉTODO /template/da/rota`; `*` vale para as rotas sem
+# entrada própria (uma entrada própria substitui `*` por inteiro)
+DEFAULT_RATE_LIMITS = {
+    '*': RouteLimits(
+        per_ip=Bucket(rate=100, burst=200),
+        per_user=Bucket(rate=50, burst=100),
+        max_concurrent_per_user=16,
+    ),
+    # Argon2: cada chamada ocupa um processo do pool de hashing
+    'POST /auth/token': RouteLimits(per_ip=Bucket(rate=1, burst=20)),
+    'POST /users/': RouteLimits(per_ip=Bucket(rate=1, burst=20)),
+    'PUT /users/{user_id}': RouteLimits(per_user=Bucket(rate=1, burst=5)),
+    # consultas filtradas e exportações seguram conexões do pool
+    'GET /todos/': RouteLimits(
+        per_user=Bucket(rate=10, burst=30), max_concurrent_per_user=4
+    ),
+    'GET /todos/export': RouteLimits(
+        per_user=Bucket(rate=0.2, burst=5), max_concurrent_per_user=1
+    ),
+    'POST /todos/import': RouteLimits(
+        per_user=Bucket(rate=0.2, burst=5), max_concurrent_per_user=1
+    ),
+}
+
+
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(
         env_file='.env', env_file_encoding='utf-8', extra='ignore'
@@ -9,3 +50,70 @@ class Settings(BaseSettings):
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     SECRET_KEY: str
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    # segundos entre as limpezas das revogações de tokens já expirados;
+    # 0 desliga
+    REVOCATION_PRUNE_SECONDS: float = 3600
+    # 'sync' usa Session + driver bloqueante no threadpool,
+    # 'async' usa AsyncSession + psycopg async no event loop.
+    DATABASE_MODE: Literal['sync', 'async'] = 'sync'
+    # pool por processo: com N workers o banco vê até
+    # N * (POOL_SIZE + MAX_OVERFLOW) conexões
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_TIMEOUT: float = 30
+    # segundos; -1 nunca recicla
+    DATABASE_POOL_RECYCLE: int = -1
+    DATABASE_POOL_PRE_PING: bool = False
+    # milissegundos; 0 desliga (só Postgres)
+    DATABASE_STATEMENT_TIMEOUT_MS: int = 0
+    # PgBouncer em modo transaction: sem prepared statements do psycopg
+    DATABASE_PGBOUNCER: bool = False
+    # conexões abertas por engine na inicialização; 0 não toca no banco
+    DATABASE_POOL_WARMUP: int = 1
+    # réplicas de leitura, em JSON: '["postgresql+psycopg://..."]'
+    DATABASE_REPLICA_URLS: list[str] = []
+    # segundos em que quem acabou de escrever lê do primário
+    DATABASE_REPLICA_STICKY_SECONDS: float = 5
+    # segundos fora da rotação depois de uma falha de conexão
+    DATABASE_REPLICA_RETRY_SECONDS: float = 30
+    USER_CACHE_MAX_SIZE: int = 1024
+    # o cache é por processo: com vários workers, alterar ou remover um
+    # usuário só invalida o do worker que atendeu, e os outros seguem com a
+    # cópia antiga até o TTL (um todo criado para um usuário removido
+    # responde 404)
+    USER_CACHE_TTL_SECONDS: float = 60
+    TOKEN_CACHE_ENABLED: bool = True
+    TOKEN_CACHE_MAX_SIZE: int = 4096
+    HASHING_WORKERS: int = 2
+    HASHING_MAX_QUEUE: int = 64
+    HASHING_RETRY_AFTER_SECONDS: int = 1
+    TODO_BULK_MAX_SIZE: int = 500
+    EXPORT_CHUNK_SIZE: int = 1000
+    IMPORT_CHUNK_SIZE: int = 5000
+    IMPORT_MAX_ERRORS: int = 100
+    # caracteres por linha (ou registro CSV) importada; acima disso a linha
+    # é um erro e não fica em memória
+    IMPORT_MAX_LINE_LENGTH: int = 65536
+    # comandos SQL mais lentos que isso vão para o log em WARNING
+    SLOW_QUERY_THRESHOLD_MS: float = 200
+    SERVER_TIMING_ENABLED: bool = True
+    LOG_LEVEL: str = 'INFO'
+    # `python -m fast_zero serve`; 0 workers: um por CPU disponível
+    SERVER_HOST: str = '0.0.0.0'
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 0
+    SERVER_BACKLOG: int = 2048
+    # acima do idle timeout do balanceador (60s nos mais comuns), para que
+    # ele, e não o servidor, feche as conexões ociosas
+    SERVER_KEEPALIVE_SECONDS: int = 75
+    SERVER_GRACEFUL_SHUTDOWN_SECONDS: int = 30
+    # proxies (IPs separados por vírgula, '*' para todos) cujos
+    # X-Forwarded-For/Proto valem como o cliente: os limites `per_ip` usam
+    # esse endereço; vazio ignora os headers
+    SERVER_FORWARDED_ALLOW_IPS: str = '127.0.0.1'
+    # as requisições já são contadas em `/metrics`
+    SERVER_ACCESS_LOG: bool = False
+    RATE_LIMIT_ENABLED: bool = True
+    # em JSON na variável de ambiente, no formato de `DEFAULT_RATE_LIMITS`
+    RATE_LIMITS: dict[str, RouteLimits] = DEFAULT_RATE_LIMITS
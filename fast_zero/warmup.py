@@ -0,0 +1,121 @@
+import logging
+from contextlib import AsyncExitStack, ExitStack
+from time import perf_counter
+
+from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Connection, Engine, select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from fast_zero import database
+from fast_zero.models import Todo, TodoCounter, User
+from fast_zero.pagination import apply_keyset
+from fast_zero.routers.todo import TODO_COLUMNS, filter_todos, todos_version
+from fast_zero.routers.users import USER_COLUMNS
+from fast_zero.settings import Settings
+
+logger = logging.getLogger(__name__)
+# nenhuma linha tem esses valores: as consultas só compilam e planejam
+NO_ID, NO_EMAIL = 0, ''
+
+
+def hot_queries():
+    """
+    As consultas dos endpoints mais usados, com a mesma estrutura (e por
+    isso a mesma chave no cache de SQL compilado) que eles montam com os
+    parâmetros padrão.
+    """
+    return [
+        # login e `get_current_user`
+        select(User).where(User.email == NO_EMAIL),
+        # `list_todos`: versão do ETag e primeira página
+        filter_todos(todos_version(NO_ID), None, None, None),
+        apply_keyset(
+            filter_todos(
+                select(*TODO_COLUMNS).where(Todo.user_id == NO_ID),
+                None,
+                None,
+                None,
+            ),
+            Todo,
+            'id',
+            None,
+        )
+        .offset(0)
+        .limit(1),
+        select(TodoCounter.state, TodoCounter.count).where(
+            TodoCounter.user_id == NO_ID
+        ),
+        # `read_users` e `get_user_by_id`
+        apply_keyset(select(*USER_COLUMNS), User, 'id', None)
+        .limit(1)
+        .offset(0),
+        select(*USER_COLUMNS, User.updated_at).where(User.id == NO_ID),
+    ]
+
+
+def run_hot_queries(connection: Connection):
+    for query in hot_queries():
+        connection.execute(query).close()
+
+
+def warm_up_engine(engine: Engine, connections: int):
+    # abertas ao mesmo tempo para o pool guardar todas ao devolvê-las
+    with ExitStack() as stack:
+        opened = [
+            stack.enter_context(engine.connect()) for _ in range(connections)
+        ]
+        run_hot_queries(opened[0])
+
+
+async def warm_up_async_engine(engine: AsyncEngine, connections: int):
+    async with AsyncExitStack() as stack:
+        opened = [
+            await stack.enter_async_context(engine.connect())
+            for _ in range(connections)
+        ]
+        await opened[0].run_sync(run_hot_queries)
+
+
+async def warm_up(app: FastAPI, settings: Settings):
+    """
+    Prepara o processo antes da primeira requisição: abre
+    `DATABASE_POOL_WARMUP` conexões no primário e em cada réplica, executa
+    as consultas quentes e monta o schema OpenAPI.
+
+    Falhas do banco não impedem a inicialização: o aquecimento é só uma
+    otimização e as requisições tentam conectar de novo.
+    """
+    started_at = perf_counter()
+    connections = settings.DATABASE_POOL_WARMUP
+    engines = [
+        (database.engine, database.async_engine),
+        *(
+            (replica.engine, replica.async_engine)
+            for replica in database.read_replicas.replicas
+        ),
+    ]
+    for sync_engine, async_engine in engines if connections > 0 else []:
+        try:
+            if async_engine is not None:
+                await warm_up_async_engine(async_engine, connections)
+            else:
+                await run_in_threadpool(
+                    warm_up_engine, sync_engine, connections
+                )
+        except DBAPIError as exc:
+            logger.warning(
+                'database warm-up failed for %s: %s',
+                sync_engine.url.render_as_string(hide_password=True),
+                exc.orig,
+            )
+
+    app.openapi()
+    logger.info(
+        'startup warm-up: %d connections per engine, %d hot queries in '
+        '%.1f ms',
+        max(connections, 0),
+        len(hot_queries()),
+        (perf_counter() - started_at) * 1000,
+    )
@@ -0,0 +1,121 @@
+"""add todo_counters table
+
+Revision ID: a3c7e5f9b2d4
+Revises: f2b8c4d9e1a3
+Create Date: 2026-10-18 16:02:55.716034
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c7e5f9b2d4'
+down_revision: Union[str, None] = 'f2b8c4d9e1a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('todo_counters',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('state', postgresql.ENUM('draft', 'todo', 'state', 'doing', 'done', 'trash', name='todostate', create_type=False), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'state')
+    )
+
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        # até o commit da migração (que cria os triggers) nenhuma escrita em
+        # `todos` entra entre a contagem inicial e os triggers; leituras
+        # continuam liberadas
+        op.execute('LOCK TABLE todos IN SHARE ROW EXCLUSIVE MODE')
+
+    op.execute(
+        'INSERT INTO todo_counters (user_id, state, count) '
+        'SELECT user_id, state, count(*) FROM todos GROUP BY user_id, state'
+    )
+
+    if dialect == 'postgresql':
+        op.execute(
+            'CREATE OR REPLACE FUNCTION todo_counters_apply() RETURNS trigger '
+            'LANGUAGE plpgsql AS $$ BEGIN '
+            "IF TG_OP = 'INSERT' THEN "
+            'INSERT INTO todo_counters (user_id, state, count) '
+            'SELECT user_id, state, count(*) FROM new_rows '
+            'GROUP BY user_id, state ORDER BY user_id, state '
+            'ON CONFLICT (user_id, state) '
+            'DO UPDATE SET count = todo_counters.count + excluded.count; '
+            "ELSIF TG_OP = 'DELETE' THEN "
+            'INSERT INTO todo_counters (user_id, state, count) '
+            'SELECT user_id, state, -count(*) FROM old_rows '
+            'GROUP BY user_id, state ORDER BY user_id, state '
+            'ON CONFLICT (user_id, state) '
+            'DO UPDATE SET count = todo_counters.count + excluded.count; '
+            'ELSE '
+            'INSERT INTO todo_counters (user_id, state, count) '
+            'SELECT user_id, state, sum(delta) FROM ('
+            'SELECT user_id, state, 1 AS delta FROM new_rows UNION ALL '
+            'SELECT user_id, state, -1 FROM old_rows) AS changes '
+            'GROUP BY user_id, state HAVING sum(delta) <> 0 '
+            'ORDER BY user_id, state '
+            'ON CONFLICT (user_id, state) '
+            'DO UPDATE SET count = todo_counters.count + excluded.count; '
+            'END IF; RETURN NULL; END $$'
+        )
+        for operation, tables in (
+            ('INSERT', 'NEW TABLE AS new_rows'),
+            ('UPDATE', 'OLD TABLE AS old_rows NEW TABLE AS new_rows'),
+            ('DELETE', 'OLD TABLE AS old_rows'),
+        ):
+            op.execute(
+                f'CREATE TRIGGER todo_counters_{operation.lower()} '
+                f'AFTER {operation} ON todos REFERENCING {tables} '
+                'FOR EACH STATEMENT EXECUTE FUNCTION todo_counters_apply()'
+            )
+
+    elif dialect == 'sqlite':
+        op.execute(
+            'CREATE TRIGGER todo_counters_ai AFTER INSERT ON todos BEGIN '
+            'INSERT INTO todo_counters (user_id, state, count) '
+            'VALUES (new.user_id, new.state, 1) ON CONFLICT (user_id, state) '
+            'DO UPDATE SET count = count + 1; END'
+        )
+        op.execute(
+            'CREATE TRIGGER todo_counters_ad AFTER DELETE ON todos BEGIN '
+            'UPDATE todo_counters SET count = count - 1 '
+            'WHERE user_id = old.user_id AND state = old.state; END'
+        )
+        op.execute(
+            'CREATE TRIGGER todo_counters_au '
+            'AFTER UPDATE OF user_id, state ON todos '
+            'WHEN old.user_id IS NOT new.user_id OR old.state IS NOT new.state '
+            'BEGIN '
+            'UPDATE todo_counters SET count = count - 1 '
+            'WHERE user_id = old.user_id AND state = old.state; '
+            'INSERT INTO todo_counters (user_id, state, count) '
+            'VALUES (new.user_id, new.state, 1) ON CONFLICT (user_id, state) '
+            'DO UPDATE SET count = count + 1; END'
+        )
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute('DROP TRIGGER IF EXISTS todo_counters_delete ON todos')
+        op.execute('DROP TRIGGER IF EXISTS todo_counters_update ON todos')
+        op.execute('DROP TRIGGER IF EXISTS todo_counters_insert ON todos')
+        op.execute('DROP FUNCTION IF EXISTS todo_counters_apply()')
+
+    elif dialect == 'sqlite':
+        op.execute('DROP TRIGGER IF EXISTS todo_counters_au')
+        op.execute('DROP TRIGGER IF EXISTS todo_counters_ad')
+        op.execute('DROP TRIGGER IF EXISTS todo_counters_ai')
+
+    op.drop_table('todo_counters')
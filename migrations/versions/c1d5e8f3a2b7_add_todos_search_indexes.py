@@ -0,0 +1,72 @@
+"""add todos search indexes
+
+Revision ID: c1d5e8f3a2b7
+Revises: a7425031965c
+Create Date: 2026-10-18 10:12:41.118203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c1d5e8f3a2b7'
+down_revision: Union[str, None] = 'a7425031965c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.create_index(
+            'ix_todos_title_trgm', 'todos', ['title'],
+            postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'},
+        )
+        op.create_index(
+            'ix_todos_description_trgm', 'todos', ['description'],
+            postgresql_using='gin',
+            postgresql_ops={'description': 'gin_trgm_ops'},
+        )
+
+    elif dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE todos_fts USING fts5(title, description, "
+            "content='todos', content_rowid='id', tokenize='trigram')"
+        )
+        op.execute(
+            'CREATE TRIGGER todos_fts_ai AFTER INSERT ON todos BEGIN '
+            'INSERT INTO todos_fts(rowid, title, description) '
+            'VALUES (new.id, new.title, new.description); END'
+        )
+        op.execute(
+            'CREATE TRIGGER todos_fts_ad AFTER DELETE ON todos BEGIN '
+            "INSERT INTO todos_fts(todos_fts, rowid, title, description) "
+            "VALUES ('delete', old.id, old.title, old.description); END"
+        )
+        op.execute(
+            'CREATE TRIGGER todos_fts_au AFTER UPDATE ON todos BEGIN '
+            "INSERT INTO todos_fts(todos_fts, rowid, title, description) "
+            "VALUES ('delete', old.id, old.title, old.description); "
+            'INSERT INTO todos_fts(rowid, title, description) '
+            'VALUES (new.id, new.title, new.description); END'
+        )
+        op.execute("INSERT INTO todos_fts(todos_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.drop_index('ix_todos_description_trgm', table_name='todos')
+        op.drop_index('ix_todos_title_trgm', table_name='todos')
+
+    elif dialect == 'sqlite':
+        op.execute('DROP TRIGGER IF EXISTS todos_fts_au')
+        op.execute('DROP TRIGGER IF EXISTS todos_fts_ad')
+        op.execute('DROP TRIGGER IF EXISTS todos_fts_ai')
+        op.execute('DROP TABLE IF EXISTS todos_fts')
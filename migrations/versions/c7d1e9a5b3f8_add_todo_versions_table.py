@@ -0,0 +1,123 @@
+"""add todo_versions table
+
+Revision ID: c7d1e9a5b3f8
+Revises: b8e2f6a4c9d3
+Create Date: 2026-10-19 14:22:07.518342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d1e9a5b3f8'
+down_revision: Union[str, None] = 'b8e2f6a4c9d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('todo_versions',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        # escritas em `todos` esperam até o commit: nenhuma fica entre o
+        # preenchimento inicial e a criação dos triggers
+        op.execute('LOCK TABLE todos IN SHARE ROW EXCLUSIVE MODE')
+        op.execute(
+            'CREATE OR REPLACE FUNCTION todo_versions_bump() RETURNS trigger '
+            'LANGUAGE plpgsql AS $$ BEGIN '
+            "IF TG_OP = 'INSERT' THEN "
+            'INSERT INTO todo_versions (user_id, version) '
+            'SELECT DISTINCT user_id, 1 FROM new_rows ORDER BY user_id '
+            'ON CONFLICT (user_id) '
+            'DO UPDATE SET version = todo_versions.version + 1; '
+            "ELSIF TG_OP = 'DELETE' THEN "
+            'INSERT INTO todo_versions (user_id, version) '
+            'SELECT DISTINCT user_id, 1 FROM old_rows ORDER BY user_id '
+            'ON CONFLICT (user_id) '
+            'DO UPDATE SET version = todo_versions.version + 1; '
+            'ELSE '
+            'INSERT INTO todo_versions (user_id, version) '
+            'SELECT user_id, 1 FROM ('
+            'SELECT user_id FROM new_rows UNION '
+            'SELECT user_id FROM old_rows) AS changed ORDER BY user_id '
+            'ON CONFLICT (user_id) '
+            'DO UPDATE SET version = todo_versions.version + 1; '
+            'END IF; RETURN NULL; END $$'
+        )
+        for operation, tables in (
+            ('INSERT', 'NEW TABLE AS new_rows'),
+            ('UPDATE', 'OLD TABLE AS old_rows NEW TABLE AS new_rows'),
+            ('DELETE', 'OLD TABLE AS old_rows'),
+        ):
+            op.execute(
+                f'CREATE TRIGGER todo_versions_{operation.lower()} '
+                f'AFTER {operation} ON todos REFERENCING {tables} '
+                'FOR EACH STATEMENT EXECUTE FUNCTION todo_versions_bump()'
+            )
+        # o mesmo relógio (UTC) da aplicação, qualquer que seja o TimeZone
+        op.alter_column(
+            'todos',
+            'updated_at',
+            server_default=sa.text("timezone('utc', now())"),
+        )
+
+    elif dialect == 'sqlite':
+        op.execute(
+            'CREATE TRIGGER todo_versions_ai AFTER INSERT ON todos BEGIN '
+            'INSERT INTO todo_versions (user_id, version) '
+            'VALUES (new.user_id, 1) ON CONFLICT (user_id) '
+            'DO UPDATE SET version = version + 1; END'
+        )
+        op.execute(
+            'CREATE TRIGGER todo_versions_ad AFTER DELETE ON todos BEGIN '
+            'INSERT INTO todo_versions (user_id, version) '
+            'VALUES (old.user_id, 1) ON CONFLICT (user_id) '
+            'DO UPDATE SET version = version + 1; END'
+        )
+        op.execute(
+            'CREATE TRIGGER todo_versions_au AFTER UPDATE ON todos BEGIN '
+            'INSERT INTO todo_versions (user_id, version) '
+            'VALUES (new.user_id, 1) ON CONFLICT (user_id) '
+            'DO UPDATE SET version = version + 1; '
+            'INSERT INTO todo_versions (user_id, version) '
+            'SELECT old.user_id, 1 WHERE old.user_id IS NOT new.user_id '
+            'ON CONFLICT (user_id) DO UPDATE SET version = version + 1; END'
+        )
+
+    # depois dos triggers, na mesma transação (e com o lock no Postgres)
+    op.execute(
+        'INSERT INTO todo_versions (user_id, version) '
+        'SELECT DISTINCT user_id, 1 FROM todos'
+    )
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.alter_column(
+            'todos',
+            'updated_at',
+            server_default=sa.text('(CURRENT_TIMESTAMP)'),
+        )
+        op.execute('DROP TRIGGER IF EXISTS todo_versions_delete ON todos')
+        op.execute('DROP TRIGGER IF EXISTS todo_versions_update ON todos')
+        op.execute('DROP TRIGGER IF EXISTS todo_versions_insert ON todos')
+        op.execute('DROP FUNCTION IF EXISTS todo_versions_bump()')
+
+    elif dialect == 'sqlite':
+        op.execute('DROP TRIGGER IF EXISTS todo_versions_au')
+        op.execute('DROP TRIGGER IF EXISTS todo_versions_ad')
+        op.execute('DROP TRIGGER IF EXISTS todo_versions_ai')
+
+    op.drop_table('todo_versions')
@@ -1,15 +1,28 @@
+import re
+from contextlib import contextmanager
+
 import factory
 import factory.fuzzy
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
 from testcontainers.postgres import PostgresContainer
 
-from fast_zero.app import app
-from fast_zero.database import get_session
+from fast_zero.app import app, settings
+from fast_zero.database import (
+    ThreadedSession,
+    get_session,
+    get_session_factory,
+)
 from fast_zero.models import Todo, TodoState, User, table_registry
-from fast_zero.security import get_password_hash
+from fast_zero.security import (
+    get_password_hash,
+    token_cache,
+    user_cache,
+)
 
 
 class UserFactory(factory.Factory):
@@ -31,12 +44,93 @@ class TodoFactory(factory.Factory):
     user_id = 1
 
 
+@contextmanager
+def capture_statements(*engines):
+    """
+    Coleta `(statement, parameters)` de cada comando enviado ao banco pelos
+    `engines` enquanto o bloco `with` estiver ativo.
+    """
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):  # noqa: PLR0913, PLR0917
+        statements.append((statement, parameters))
+
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', capture)
+    try:
+        yield statements
+    finally:
+        for engine in engines:
+            event.remove(engine, 'before_cursor_execute', capture)
+
+
+def query_count(response) -> int:
+    """Comandos SQL da requisição, lidos do header `Server-Timing`."""
+    match = re.search(
+        r'db;dur=[\d.]+;desc="(\d+) queries"',
+        response.headers.get('server-timing', ''),
+    )
+    assert match, 'response has no db Server-Timing entry'
+    return int(match.group(1))
+
+
+def assert_max_queries(response, limit: int):
+    """Falha se o endpoint passou de `limit` comandos SQL."""
+    count = query_count(response)
+    assert count <= limit, f'{count} queries, expected at most {limit}'
+
+
+@pytest.fixture
+def db_engines(engine, async_engine):
+    """Os engines dos dois modos, para `capture_statements(*db_engines)`."""
+    return engine, async_engine.sync_engine
+
+
+@pytest.fixture
+def auth_header(client: TestClient, token: str):
+    """
+    Header de autenticação com o usuário já no cache: os comandos
+    capturados depois são só os do endpoint.
+    """
+    header = {'Authorization': f'Bearer {token}'}
+    client.get('/auth/refresh_token', headers=header)
+    return header
+
+
+@pytest.fixture
+def anyio_backend():
+    # os testes do `HashingPool` usam primitivas do asyncio diretamente
+    return 'asyncio'
+
+
+@pytest.fixture(autouse=True)
+def _lifespan_settings(monkeypatch):
+    """
+    O lifespan usa os engines de `DATABASE_URL` direto, sem passar pelos
+    overrides do `client`: sem aquecimento nem limpeza de revogações, o
+    `TestClient(app)` não toca nesse banco.
+    """
+    monkeypatch.setattr(settings, 'DATABASE_POOL_WARMUP', 0)
+    monkeypatch.setattr(settings, 'REVOCATION_PRUNE_SECONDS', 0)
+
+
 @pytest.fixture(scope='session')
-def engine():
+def database_url():
     with PostgresContainer('postgres:16', driver='psycopg') as postgres:
-        _engine = create_engine(postgres.get_connection_url())  # type: ignore
-        with _engine.begin():
-            yield _engine
+        yield postgres.get_connection_url()
+
+
+@pytest.fixture(scope='session')
+def engine(database_url):
+    _engine = create_engine(database_url)  # type: ignore
+    with _engine.begin():
+        yield _engine
+
+
+@pytest.fixture(scope='session')
+def async_engine(database_url):
+    # NullPool: cada TestClient roda em um event loop próprio
+    return create_async_engine(database_url, poolclass=NullPool)
 
 
 @pytest.fixture
@@ -45,19 +139,50 @@ def session(engine):
     with Session(engine) as sess:
         yield sess
     table_registry.metadata.drop_all(engine)
+    # conexões do pool podem guardar prepared statements (psycopg) com os
+    # OIDs dos tipos que acabaram de ser removidos
+    engine.dispose()
 
 
-@pytest.fixture
-def client(session):
-    def get_session_override():
-        return session
+@pytest.fixture(params=['sync', 'async'])
+def client(request, session, engine, async_engine, monkeypatch):
+    """
+    Executa cada teste de API nos dois modos de `DATABASE_MODE`, garantindo
+    que ambos se comportam da mesma forma.
+
+    Sem os limites padrão de requisições: os testes fazem rajadas com o
+    mesmo token, e os de `test_ratelimit` definem os limites que usam.
+    """
+    for name in list(settings.RATE_LIMITS):
+        monkeypatch.delitem(settings.RATE_LIMITS, name)
+
+    if request.param == 'sync':
+
+        def session_factory():
+            return ThreadedSession(Session(engine))
+
+        async def get_session_override():
+            return ThreadedSession(session)
+
+    else:
+
+        def session_factory():
+            return AsyncSession(async_engine, expire_on_commit=False)
+
+        async def get_session_override():
+            async with session_factory() as async_session:
+                yield async_session
 
     with TestClient(app) as test_client:
         app.dependency_overrides[get_session] = get_session_override
+        app.dependency_overrides[get_session_factory] = lambda: session_factory
 
         yield test_client
 
     app.dependency_overrides.clear()
+    user_cache.clear()
+    token_cache.clear()
+    app.state.rate_limit_storage.clear()
 
 
 @pytest.fixture
@@ -90,3 +215,13 @@ def token(client: TestClient, user: User):
     )
 
     return response.json()['access_token']
+
+
+@pytest.fixture
+def refresh_token(client: TestClient, user: User):
+    response = client.post(
+        url='/auth/token',
+        data={'username': user.email, 'password': user.clean_password},  # type: ignore
+    )
+
+    return response.json()['refresh_token']
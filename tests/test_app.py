@@ -2,9 +2,21 @@ from http import HTTPStatus
 
 from fastapi.testclient import TestClient
 
+from fast_zero import database
+from fast_zero.app import app
+from tests.conftest import capture_statements
+
 
 def test_read_root_dever_retornar_ok_e_olar_mundo(client: TestClient):
     response = client.get('/')
 
     assert response.status_code == HTTPStatus.OK
     assert response.json() == {'message': 'Olá mundo!'}
+
+
+def test_lifespan_nao_deve_tocar_no_banco_de_database_url():
+    with capture_statements(database.engine) as statements:
+        with TestClient(app):
+            pass
+
+    assert statements == []
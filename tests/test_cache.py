@@ -0,0 +1,82 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from freezegun import freeze_time
+
+from fast_zero.cache import TTLCache
+
+
+def test_cache_deve_contar_hits_e_misses():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'size': 1, 'maxsize': 2}
+
+
+def test_cache_deve_descartar_o_menos_usado_recentemente():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 'A')
+    cache.set('b', 'B')
+    cache.get('a')
+    cache.set('c', 'C')
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 'A'
+    assert cache.get('c') == 'C'
+
+
+def test_cache_deve_expirar_entradas_apos_ttl():
+    with freeze_time('2024-07-20 12:00:00') as frozen:
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set('a', 'A')
+        cache.set('b', 'B', ttl=300)
+        frozen.tick(61)
+
+        assert cache.get('a') is None
+        assert cache.get('b') == 'B'
+        assert len(cache) == 1
+
+
+def test_cache_invalidate_deve_remover_a_entrada():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+    cache.invalidate('a')
+    cache.invalidate('inexistente')
+
+    assert cache.get('a') is None
+
+
+def test_cache_deve_ignorar_set_de_carga_anterior_ao_invalidate():
+    cache = TTLCache(maxsize=2, ttl=60)
+    generation = cache.generation('a')
+    # escrita concorrente enquanto o valor antigo era carregado
+    cache.invalidate('a')
+    cache.set('a', 'velho', generation=generation)
+
+    assert cache.get('a') is None
+    cache.set('a', 'novo', generation=cache.generation('a'))
+    assert cache.get('a') == 'novo'
+
+
+def test_cache_com_maxsize_zero_nao_armazena():
+    cache = TTLCache(maxsize=0, ttl=60)
+    cache.set('a', 1)
+
+    assert cache.get('a') is None
+
+
+def test_cache_deve_suportar_acesso_concorrente():
+    cache = TTLCache(maxsize=64, ttl=60)
+    n_workers, n_ops = 8, 1000
+
+    def worker(n: int):
+        for i in range(n_ops):
+            cache.set((n, i % 100), i)
+            cache.get((n, (i * 7) % 100))
+
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        list(executor.map(worker, range(n_workers)))
+
+    assert len(cache) == cache.maxsize
+    assert cache.hits + cache.misses == n_workers * n_ops
@@ -0,0 +1,173 @@
+from datetime import datetime
+from http import HTTPStatus
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from fast_zero.models import Todo, User
+from fast_zero.responses import etag_matches
+from tests.conftest import TodoFactory, capture_statements
+
+
+@pytest.fixture
+def todos(session: Session, user: User):
+    todos = TodoFactory.create_batch(3, user_id=user.id)
+    session.add_all(todos)
+    session.commit()
+    return [todo.id for todo in todos]
+
+
+def test_list_todos_deve_responder_304_com_o_mesmo_etag(
+    client: TestClient, auth_header, todos, db_engines
+):
+    response = client.get('/todos/', headers=auth_header)
+    etag = response.headers['etag']
+
+    with capture_statements(*db_engines) as statements:
+        response = client.get(
+            '/todos/', headers={**auth_header, 'If-None-Match': etag}
+        )
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.headers['etag'] == etag
+    assert not response.content
+    # só o count/max: a página não é consultada nem serializada
+    assert len(statements) == 1
+
+
+@pytest.mark.parametrize(
+    ('method', 'path', 'json'),
+    [
+        (
+            'POST',
+            '/todos/',
+            {'title': 't', 'description': 'd', 'state': 'todo'},
+        ),
+        ('PATCH', '/todos/{id}', {'title': 'novo'}),
+        ('DELETE', '/todos/{id}', None),
+    ],
+)
+def test_list_todos_deve_mudar_o_etag_apos_escritas(  # noqa: PLR0913, PLR0917
+    client: TestClient, auth_header, todos, method, path, json
+):
+    etag = client.get('/todos/', headers=auth_header).headers['etag']
+
+    client.request(
+        method, path.format(id=todos[1]), headers=auth_header, json=json
+    )
+    response = client.get(
+        '/todos/', headers={**auth_header, 'If-None-Match': etag}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['etag'] != etag
+
+
+def test_list_todos_etag_depende_dos_parametros(
+    client: TestClient, auth_header, todos
+):
+    first = client.get('/todos/', headers=auth_header, params={'limit': 1})
+    second = client.get('/todos/', headers=auth_header, params={'limit': 2})
+
+    assert first.headers['etag'] != second.headers['etag']
+
+
+def test_list_todos_etag_muda_quando_todo_sai_do_filtro(
+    client: TestClient, auth_header, todos
+):
+    params = {'state': 'trash'}
+    client.patch(
+        f'/todos/{todos[0]}', headers=auth_header, json={'state': 'trash'}
+    )
+    response = client.get('/todos/', headers=auth_header, params=params)
+    etag = response.headers['etag']
+
+    client.patch(
+        f'/todos/{todos[0]}', headers=auth_header, json={'state': 'done'}
+    )
+    response = client.get(
+        '/todos/',
+        headers={**auth_header, 'If-None-Match': etag},
+        params=params,
+    )
+
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_list_todos_etag_nao_depende_do_relogio(
+    client: TestClient, auth_header, todos, session: Session
+):
+    etag = client.get('/todos/', headers=auth_header).headers['etag']
+
+    # escrita com um horário antigo (outro relógio, ou uma transação que
+    # terminou depois de outra mais recente)
+    session.execute(
+        update(Todo)
+        .where(Todo.id == todos[0])
+        .values(title='antigo', updated_at=datetime(2000, 1, 1))
+    )
+    session.commit()
+    response = client.get(
+        '/todos/', headers={**auth_header, 'If-None-Match': etag}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['todos'][0]['title'] == 'antigo'
+
+
+def test_list_todos_etag_deve_mudar_apos_importacao(
+    client: TestClient, auth_header, todos
+):
+    etag = client.get('/todos/', headers=auth_header).headers['etag']
+
+    imported = client.post(
+        '/todos/import',
+        headers={**auth_header, 'Content-Type': 'application/x-ndjson'},
+        content=b'{"title": "t", "description": "d", "state": "todo"}\n',
+    )
+    response = client.get(
+        '/todos/', headers={**auth_header, 'If-None-Match': etag}
+    )
+
+    assert imported.status_code == HTTPStatus.OK
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_get_user_by_id_deve_responder_304_ate_o_usuario_mudar(
+    client: TestClient, user: User, auth_header
+):
+    etag = client.get(f'/users/{user.id}').headers['etag']
+
+    response = client.get(f'/users/{user.id}', headers={'If-None-Match': etag})
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+    client.put(
+        f'/users/{user.id}',
+        headers=auth_header,
+        json={
+            'username': 'outro',
+            'email': user.email,
+            'password': 'nova',
+        },
+    )
+    response = client.get(f'/users/{user.id}', headers={'If-None-Match': etag})
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['username'] == 'outro'
+    assert response.headers['etag'] != etag
+
+
+@pytest.mark.parametrize(
+    ('header', 'expected'),
+    [
+        ('"abc"', True),
+        ('W/"abc"', True),
+        ('"x", "abc"', True),
+        ('*', True),
+        ('"x"', False),
+        (None, False),
+    ],
+)
+def test_etag_matches(header, expected):
+    assert etag_matches(header, '"abc"') is expected
@@ -0,0 +1,75 @@
+import asyncio
+import time
+from http import HTTPStatus
+from threading import BoundedSemaphore
+
+import pytest
+from fastapi.testclient import TestClient
+
+from fast_zero.app import app
+from fast_zero.hashing import HashingPool, PoolSaturatedError
+from fast_zero.security import hashing_pool
+
+
+@pytest.fixture
+def pool():
+    _pool = HashingPool(max_workers=1, max_queue=0)
+    yield _pool
+    _pool.shutdown()
+
+
+@pytest.mark.anyio
+async def test_hashing_pool_deve_executar_e_medir_tempos(pool: HashingPool):
+    EXPECTED_RESULT = 1024
+
+    result = await pool.run(pow, 2, 10)
+
+    assert result == EXPECTED_RESULT
+    assert pool.stats()['hash_time']['count'] == 1
+    assert pool.stats()['queue_wait']['count'] == 1
+
+
+@pytest.mark.anyio
+async def test_hashing_pool_deve_recusar_quando_a_fila_esta_cheia(
+    pool: HashingPool,
+):
+    busy = asyncio.ensure_future(pool.run(time.sleep, 0.5))
+    await asyncio.sleep(0)
+
+    with pytest.raises(PoolSaturatedError):
+        await pool.run(pow, 2, 10)
+
+    await busy
+
+
+def test_hashing_pool_nao_deve_usar_fork(pool: HashingPool):
+    executor = pool.start()
+
+    assert executor._mp_context.get_start_method() != 'fork'
+
+
+def test_lifespan_deve_iniciar_e_encerrar_o_pool():
+    with TestClient(app):
+        executor = hashing_pool._executor
+        assert executor is not None
+
+    assert hashing_pool._executor is None
+    assert executor._shutdown_thread
+
+
+def test_create_user_deve_retornar_503_com_pool_saturado(
+    client: TestClient, monkeypatch
+):
+    monkeypatch.setattr(hashing_pool, '_slots', BoundedSemaphore(0))
+
+    response = client.post(
+        '/users/',
+        json={
+            'email': 'test@gmail.com',
+            'username': 'tester',
+            'password': 'teste123456789',
+        },
+    )
+
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert response.headers['Retry-After'] == '1'
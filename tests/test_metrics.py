@@ -0,0 +1,188 @@
+import asyncio
+import gc
+import re
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from threading import Thread
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from fast_zero.database import create_engines
+from fast_zero.metrics import (
+    POOL_WAIT,
+    Counter,
+    Histogram,
+    TimedAsyncQueuePool,
+    TimedQueuePool,
+    render_pool,
+)
+from fast_zero.settings import Settings
+
+CALLS = 1000
+
+
+def sample(text: str, name: str, **labels) -> float:
+    """Valor de uma série na saída de `/metrics` (0 se ainda não existe)."""
+    selector = ','.join(f'{key}="{value}"' for key, value in labels.items())
+    pattern = re.escape(f'{name}{{{selector}}}' if labels else name)
+    match = re.search(rf'^{pattern} (\S+)$', text, re.MULTILINE)
+    return float(match.group(1)) if match else 0
+
+
+def test_metrics_deve_usar_o_formato_texto_do_prometheus(client: TestClient):
+    response = client.get('/metrics')
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'].startswith('text/plain')
+    assert '# TYPE http_request_duration_seconds histogram' in response.text
+    assert '# TYPE http_requests_total counter' in response.text
+    assert '# TYPE argon2_hash_seconds summary' in response.text
+    # a própria requisição de scrape está em andamento
+    assert (
+        sample(
+            response.text,
+            'http_requests_in_flight',
+            method='GET',
+            route='/metrics',
+        )
+        == 1
+    )
+
+
+def test_metrics_deve_contar_por_template_da_rota_e_status(
+    client: TestClient, token: str
+):
+    header = {'Authorization': f'Bearer {token}'}
+    labels = {'method': 'DELETE', 'route': '/todos/{todo_id}', 'status': '404'}
+    before = sample(
+        client.get('/metrics').text, 'http_requests_total', **labels
+    )
+
+    client.delete('/todos/1', headers=header)
+    client.delete('/todos/2', headers=header)
+    text = client.get('/metrics').text
+
+    assert sample(text, 'http_requests_total', **labels) == before + 2
+    assert 'route="/todos/1"' not in text
+    assert (
+        sample(
+            text,
+            'http_request_duration_seconds_bucket',
+            method='DELETE',
+            route='/todos/{todo_id}',
+            le='+Inf',
+        )
+        >= 2  # noqa: PLR2004
+    )
+    assert (
+        sample(
+            text,
+            'http_requests_in_flight',
+            method='DELETE',
+            route='/todos/{todo_id}',
+        )
+        == 0
+    )
+
+
+def test_metrics_deve_expor_tempo_do_argon2(client: TestClient, user):
+    before = sample(client.get('/metrics').text, 'argon2_hash_seconds_count')
+
+    client.post(
+        '/auth/token',
+        data={'username': user.email, 'password': user.clean_password},
+    )
+
+    text = client.get('/metrics').text
+    assert sample(text, 'argon2_hash_seconds_count') == before + 1
+    assert sample(text, 'argon2_hash_seconds_sum') > 0
+
+
+def test_histogram_deve_acumular_buckets_de_varias_threads():
+    histogram = Histogram('h', 'teste', ('route',), buckets=(0.1, 1.0))
+    counter = Counter('c', 'teste', ('route',))
+
+    def record(value):
+        for _ in range(CALLS):
+            histogram.observe(value, '/x')
+            counter.inc('/x')
+
+    with ThreadPoolExecutor(4) as executor:
+        list(executor.map(record, [0.05, 0.5, 5, 0.1]))
+
+    text = histogram.render() + '\n' + counter.render()
+    # buckets cumulativos: `le` inclui o próprio limite
+    assert sample(text, 'h_bucket', route='/x', le='0.1') == 2 * CALLS
+    assert sample(text, 'h_bucket', route='/x', le='1.0') == 3 * CALLS
+    assert sample(text, 'h_bucket', route='/x', le='+Inf') == 4 * CALLS
+    assert sample(text, 'h_count', route='/x') == 4 * CALLS
+    assert sample(text, 'h_sum', route='/x') == pytest.approx(5.65 * CALLS)
+    assert sample(text, 'c', route='/x') == 4 * CALLS
+
+
+def test_threads_encerradas_devem_ser_somadas_ao_base():
+    histogram = Histogram('h', 'teste', buckets=(1.0,))
+    counter = Counter('c', 'teste')
+
+    def record():
+        histogram.observe(0.5)
+        counter.inc()
+
+    for _ in range(CALLS):
+        thread = Thread(target=record)
+        thread.start()
+        thread.join()
+    del thread
+    gc.collect()
+
+    # só o base: nenhum dicionário de thread encerrada fica para trás
+    assert len(histogram._shards.snapshot()) == 1
+    assert len(counter._shards.snapshot()) == 1
+    text = histogram.render() + '\n' + counter.render()
+    assert sample(text, 'h_count') == CALLS
+    assert sample(text, 'h_sum') == pytest.approx(0.5 * CALLS)
+    assert sample(text, 'c') == CALLS
+
+
+def test_render_pool_deve_expor_conexoes_e_espera(tmp_path):
+    engine = create_engine(
+        f'sqlite:///{tmp_path}/pool.db', poolclass=TimedQueuePool
+    )
+    waits = sample(POOL_WAIT.render(), 'db_pool_checkout_wait_seconds_count')
+
+    with engine.connect():
+        text = '\n'.join(render_pool(engine))
+
+    assert sample(text, 'db_pool_checked_out') == 1
+    assert sample(text, 'db_pool_overflow') == 0
+    assert (
+        sample(POOL_WAIT.render(), 'db_pool_checkout_wait_seconds_count')
+        == waits + 1
+    )
+    engine.dispose()
+
+
+def test_modo_async_deve_medir_a_espera_por_conexoes(database_url):
+    engine, async_engine = create_engines(
+        Settings(DATABASE_URL=database_url, DATABASE_MODE='async')
+    )
+    waits = sample(POOL_WAIT.render(), 'db_pool_checkout_wait_seconds_count')
+
+    async def checkout():
+        async with async_engine.connect() as conn:
+            await conn.execute(text('SELECT 1'))
+            pool = render_pool(async_engine.sync_engine)
+        await async_engine.dispose()
+        return '\n'.join(pool)
+
+    pool = asyncio.run(checkout())
+    engine.dispose()
+
+    assert isinstance(async_engine.pool, TimedAsyncQueuePool)
+    assert sample(pool, 'db_pool_checked_out') == 1
+    assert (
+        sample(POOL_WAIT.render(), 'db_pool_checkout_wait_seconds_count')
+        == waits + 1
+    )
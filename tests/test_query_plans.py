@@ -0,0 +1,163 @@
+"""
+Regressão de planos de execução: roda `EXPLAIN` sobre cada SELECT, UPDATE e
+DELETE emitido pelos endpoints de todos (incluindo o `get_current_user`)
+contra uma tabela populada e falha se algum deles cair em um seq scan.
+"""
+
+import re
+from http import HTTPStatus
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import insert, select, text
+from sqlalchemy.orm import Session
+
+from fast_zero.models import Todo, TodoState, User
+from fast_zero.pagination import encode_cursor
+from fast_zero.security import user_cache
+from tests.conftest import capture_statements
+
+# usuários suficientes para que o planejador prefira os índices sozinho;
+# os todos ficam com os primeiros `TODO_OWNERS`
+N_USERS = 10_000
+TODO_OWNERS = 100
+TODOS_PER_OWNER = 200
+TRACKED_STATEMENTS = ('SELECT', 'UPDATE', 'DELETE')
+
+
+def walk_plan(node):
+    yield node
+    for child in node.get('Plans', []):
+        yield from walk_plan(child)
+
+
+def seq_scans(session: Session, statement: str, parameters):
+    connection = session.connection()
+    if connection.dialect.name == 'postgresql':
+        plan = connection.exec_driver_sql(
+            f'EXPLAIN (FORMAT JSON) {statement}', parameters
+        ).scalar_one()
+        return [
+            node['Relation Name']
+            for node in walk_plan(plan[0]['Plan'])
+            if node['Node Type'] == 'Seq Scan'
+        ]
+
+    rows = connection.exec_driver_sql(
+        f'EXPLAIN QUERY PLAN {statement}', parameters
+    ).all()
+    return [
+        row[-1]
+        for row in rows
+        if re.match(r'SCAN (todos|users)\b(?! USING)', row[-1])
+    ]
+
+
+@pytest.fixture
+def seeded_todos(session: Session, user: User):
+    session.execute(
+        insert(User),
+        [
+            {
+                'username': f'seed{n}',
+                'email': f'seed{n}@test.com',
+                'password': 'seed',
+            }
+            for n in range(N_USERS - 1)
+        ],
+    )
+    owner_ids = session.scalars(
+        select(User.id).order_by(User.id).limit(TODO_OWNERS)
+    ).all()
+    states = list(TodoState)
+    session.execute(
+        insert(Todo),
+        [
+            {
+                'title': f'todo {n}',
+                'description': f'description {n}',
+                'state': states[n % len(states)],
+                'user_id': owner_ids[n % len(owner_ids)],
+            }
+            for n in range(TODO_OWNERS * TODOS_PER_OWNER)
+        ],
+    )
+    session.commit()
+    session.execute(text('ANALYZE'))
+    session.commit()
+
+    return session.scalars(
+        select(Todo.id).where(Todo.user_id == user.id).order_by(Todo.id)
+    ).all()
+
+
+def build_request(scenario: str, todo_ids):
+    todo_id = todo_ids[len(todo_ids) // 2]
+    requests = {
+        'list_todos': ('GET', '/todos/', {}, None),
+        'list_todos_state': ('GET', '/todos/', {'state': 'done'}, None),
+        'list_todos_cursor': (
+            'GET',
+            '/todos/',
+            {'after': encode_cursor('id', todo_id, todo_id)},
+            None,
+        ),
+        'list_todos_title_cursor': (
+            'GET',
+            '/todos/',
+            {
+                'sort': 'title',
+                'after': encode_cursor('title', 'todo', todo_id),
+            },
+            None,
+        ),
+        'patch_todo': ('PATCH', f'/todos/{todo_id}', {}, {'state': 'done'}),
+        'delete_todo': ('DELETE', f'/todos/{todo_id}', {}, None),
+        'todo_stats': ('GET', '/todos/stats', {}, None),
+    }
+    return requests[scenario]
+
+
+@pytest.mark.parametrize(
+    'scenario',
+    [
+        'list_todos',
+        'list_todos_state',
+        'list_todos_cursor',
+        'list_todos_title_cursor',
+        'patch_todo',
+        'delete_todo',
+        'todo_stats',
+    ],
+)
+def test_endpoints_de_todos_nao_devem_usar_seq_scan(  # noqa: PLR0913, PLR0917
+    session: Session,
+    client: TestClient,
+    engine,
+    async_engine,
+    token: str,
+    seeded_todos,
+    scenario: str,
+):
+    method, url, params, json = build_request(scenario, seeded_todos)
+    # força o `get_current_user` a consultar o banco
+    user_cache.clear()
+
+    with capture_statements(engine, async_engine.sync_engine) as statements:
+        response = client.request(
+            method,
+            url,
+            params=params,
+            json=json,
+            headers={'Authorization': f'Bearer {token}'},
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    statements = [
+        (statement, parameters)
+        for statement, parameters in statements
+        if statement.lstrip().upper().startswith(TRACKED_STATEMENTS)
+    ]
+    assert statements
+    for statement, parameters in statements:
+        assert seq_scans(session, statement, parameters) == [], statement
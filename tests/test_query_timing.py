@@ -0,0 +1,127 @@
+import logging
+from http import HTTPStatus
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from fast_zero import database
+from fast_zero.models import User
+from tests.conftest import (
+    TodoFactory,
+    assert_max_queries,
+    capture_statements,
+    query_count,
+)
+
+
+@pytest.fixture
+def todo_id(session: Session, user: User):
+    todo = TodoFactory(user_id=user.id)
+    session.add(todo)
+    session.commit()
+    return todo.id
+
+
+def test_server_timing_deve_contar_os_comandos_da_requisicao(
+    client: TestClient, auth_header, todo_id, db_engines
+):
+    with capture_statements(*db_engines) as statements:
+        response = client.get('/todos/', headers=auth_header)
+
+    assert response.status_code == HTTPStatus.OK
+    assert query_count(response) == len(statements)
+    assert 'db-slowest;dur=' in response.headers['server-timing']
+
+
+def test_server_timing_sem_banco_deve_contar_zero(client: TestClient):
+    response = client.get('/')
+
+    assert query_count(response) == 0
+
+
+# orçamento de comandos por endpoint, com o usuário autenticado em cache
+@pytest.mark.parametrize(
+    ('method', 'path', 'json', 'limit'),
+    [
+        ('GET', '/todos/', None, 2),
+        ('GET', '/todos/stats', None, 1),
+        (
+            'POST',
+            '/todos/',
+            {'title': 't', 'description': 'd', 'state': 'todo'},
+            1,
+        ),
+        ('PATCH', '/todos/{todo_id}', {'title': 'novo'}, 1),
+        ('DELETE', '/todos/{todo_id}', None, 1),
+        ('GET', '/users/', None, 1),
+        ('GET', '/users/{user_id}', None, 1),
+        (
+            'POST',
+            '/users/',
+            {'username': 'novo', 'email': 'novo@test.com', 'password': 'x'},
+            1,
+        ),
+        (
+            'PUT',
+            '/users/{user_id}',
+            {'username': 'novo', 'email': 'novo@test.com', 'password': 'x'},
+            3,
+        ),
+        ('DELETE', '/users/{user_id}', None, 1),
+    ],
+)
+def test_endpoints_devem_respeitar_o_orcamento_de_comandos(  # noqa: PLR0913, PLR0917
+    request, client: TestClient, auth_header, user, method, path, json, limit
+):
+    # só cria o todo quando a rota precisa: no Postgres a FK impede apagar
+    # o usuário que ainda tem todos
+    if '{todo_id}' in path:
+        path = path.format(todo_id=request.getfixturevalue('todo_id'))
+
+    response = client.request(
+        method, path.format(user_id=user.id), headers=auth_header, json=json
+    )
+
+    assert response.status_code < HTTPStatus.BAD_REQUEST
+    assert_max_queries(response, limit)
+
+
+def test_login_deve_usar_um_comando(client: TestClient, user):
+    response = client.post(
+        '/auth/token',
+        data={'username': user.email, 'password': user.clean_password},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert_max_queries(response, 1)
+
+
+def test_comandos_lentos_devem_ir_para_o_log(
+    client: TestClient, auth_header, monkeypatch, caplog
+):
+    monkeypatch.setattr(database.settings, 'SLOW_QUERY_THRESHOLD_MS', 0)
+
+    with caplog.at_level(logging.WARNING, logger='fast_zero.database'):
+        client.get('/todos/', headers=auth_header)
+
+    assert any(
+        record.getMessage().startswith('slow query')
+        and 'todos' in record.getMessage()
+        for record in caplog.records
+    )
+
+
+def test_resumo_da_requisicao_deve_registrar_o_comando_mais_lento(
+    client: TestClient, auth_header, caplog
+):
+    with caplog.at_level(logging.DEBUG, logger='fast_zero.metrics'):
+        client.get('/todos/', headers=auth_header)
+
+    (message,) = [
+        record.getMessage()
+        for record in caplog.records
+        if record.name == 'fast_zero.metrics'
+    ]
+    assert message.startswith('GET /todos/: 2 queries in ')
+    assert 'SELECT' in message
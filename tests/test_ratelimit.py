@@ -0,0 +1,187 @@
+import asyncio
+from http import HTTPStatus
+
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+from fast_zero import ratelimit
+from fast_zero.app import app, settings
+from fast_zero.ratelimit import MemoryStorage, RateLimitMiddleware
+from fast_zero.security import create_access_token
+from fast_zero.settings import Bucket, RouteLimits, Settings
+
+BURST = 3
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ratelimit, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_balde_deve_permitir_a_rajada_e_depois_esperar(clock):
+    storage = MemoryStorage()
+    bucket = Bucket(rate=2, burst=BURST)
+
+    allowed = [storage.take('k', bucket) for _ in range(BURST)]
+    wait = storage.take('k', bucket)
+
+    assert allowed == [0] * BURST
+    assert wait == pytest.approx(0.5)
+
+
+def test_balde_deve_recarregar_com_o_tempo(clock):
+    storage = MemoryStorage()
+    bucket = Bucket(rate=2, burst=BURST)
+    for _ in range(BURST):
+        storage.take('k', bucket)
+
+    clock[0] += 0.5
+
+    assert storage.take('k', bucket) == 0
+    assert storage.take('k', bucket) > 0
+    assert storage.take('outra', bucket) == 0
+
+
+def test_baldes_cheios_devem_ser_descartados(clock):
+    storage = MemoryStorage(shards=1, max_keys=2)
+    bucket = Bucket(rate=1, burst=BURST)
+    storage.take('a', bucket)
+    storage.take('b', bucket)
+
+    clock[0] += 10
+    storage.take('c', bucket)
+
+    assert set(storage._shards[0].full_at) == {'c'}
+
+
+def test_limpeza_com_chaves_ativas_nao_deve_rodar_a_cada_chamada(clock):
+    storage = MemoryStorage(shards=1, max_keys=2)
+    bucket = Bucket(rate=1, burst=BURST)
+    for key in 'abc':
+        storage.take(key, bucket)
+    # nenhum balde cheio: a limpeza manteve as três chaves
+    full_at = storage._shards[0].full_at
+
+    for key in 'def':
+        storage.take(key, bucket)
+
+    assert storage._shards[0].full_at is full_at
+    storage.take('g', bucket)
+    assert storage._shards[0].full_at is not full_at
+
+
+@pytest.mark.parametrize(('rate', 'burst'), [(0, BURST), (-1, BURST), (1, 0)])
+def test_balde_deve_recusar_taxa_ou_rajada_invalida(rate, burst):
+    with pytest.raises(ValidationError):
+        Bucket(rate=rate, burst=burst)
+
+
+def test_settings_deve_recusar_balde_invalido(monkeypatch):
+    monkeypatch.setenv(
+        'RATE_LIMITS', '{"*": {"per_ip": {"rate": 0, "burst": 10}}}'
+    )
+
+    with pytest.raises(ValidationError):
+        Settings()
+
+
+def test_vagas_devem_ser_liberadas():
+    storage = MemoryStorage()
+
+    assert storage.acquire('k', 1)
+    assert not storage.acquire('k', 1)
+    storage.release('k')
+    assert storage.acquire('k', 1)
+
+
+def test_login_deve_ser_limitado_por_ip(client: TestClient, user, monkeypatch):
+    monkeypatch.setitem(
+        settings.RATE_LIMITS,
+        'POST /auth/token',
+        RouteLimits(per_ip=Bucket(rate=0.01, burst=2)),
+    )
+    data = {'username': user.email, 'password': user.clean_password}
+
+    statuses = [
+        client.post('/auth/token', data=data).status_code for _ in range(2)
+    ]
+    response = client.post('/auth/token', data=data)
+
+    assert statuses == [HTTPStatus.OK] * 2
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    # uma ficha a cada 100s, menos o tempo dos logins anteriores
+    assert 0 < int(response.headers['retry-after']) <= 100  # noqa: PLR2004
+    assert response.json() == {'detail': 'Too many requests'}
+
+
+def test_list_todos_deve_ser_limitado_por_usuario(
+    client: TestClient, token, other_user, monkeypatch
+):
+    monkeypatch.setitem(
+        settings.RATE_LIMITS,
+        'GET /todos/',
+        RouteLimits(per_user=Bucket(rate=0.01, burst=1)),
+    )
+    other_token = create_access_token({'sub': other_user.email})
+
+    first = client.get('/todos/', headers={'Authorization': f'Bearer {token}'})
+    second = client.get(
+        '/todos/', headers={'Authorization': f'Bearer {token}'}
+    )
+    other = client.get(
+        '/todos/', headers={'Authorization': f'Bearer {other_token}'}
+    )
+
+    assert first.status_code == HTTPStatus.OK
+    assert second.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert other.status_code == HTTPStatus.OK
+
+
+def test_requisicoes_simultaneas_devem_ser_limitadas_por_usuario():
+    release = asyncio.Event()
+
+    async def slow_app(scope, receive, send):
+        await release.wait()
+        await send({'type': 'http.response.start', 'status': 200})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    middleware = RateLimitMiddleware(
+        slow_app,
+        routes=app.routes,
+        limits={'*': RouteLimits(max_concurrent_per_user=1)},
+        storage=MemoryStorage(),
+    )
+    token = create_access_token({'sub': 'concorrente@test.com'})
+
+    async def request():
+        statuses = []
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                statuses.append(message['status'])
+
+        scope = {
+            'type': 'http',
+            'method': 'GET',
+            'path': '/todos/',
+            'headers': [(b'authorization', f'Bearer {token}'.encode())],
+            'client': ('127.0.0.1', 1234),
+        }
+        await middleware(scope, None, send)
+        return statuses[0]
+
+    async def scenario():
+        first = asyncio.create_task(request())
+        await asyncio.sleep(0)
+        rejected = await request()
+        release.set()
+        return rejected, await first, await request()
+
+    assert asyncio.run(scenario()) == (
+        HTTPStatus.TOO_MANY_REQUESTS,
+        HTTPStatus.OK,
+        HTTPStatus.OK,
+    )
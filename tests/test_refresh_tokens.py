@@ -0,0 +1,165 @@
+import asyncio
+from contextlib import suppress
+from datetime import datetime, timedelta
+from http import HTTPStatus
+
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from fast_zero.database import ThreadedSession
+from fast_zero.models import RevokedToken, utcnow
+from fast_zero.revocation import prune_periodically, prune_revocations
+from fast_zero.security import decode_refresh_token
+from tests.conftest import query_count
+
+
+def refresh(client: TestClient, refresh_token: str):
+    return client.post(
+        '/auth/refresh_token', json={'refresh_token': refresh_token}
+    )
+
+
+def test_login_deve_retornar_um_refresh_token(client: TestClient, user):
+    response = client.post(
+        '/auth/token',
+        data={'username': user.email, 'password': user.clean_password},
+    )
+
+    payload = decode_refresh_token(response.json()['refresh_token'])
+    assert payload['sub'] == user.email
+    assert payload['jti']
+
+
+def test_refresh_deve_rotacionar_o_token(client: TestClient, refresh_token):
+    response = refresh(client, refresh_token)
+    reused = refresh(client, refresh_token)
+
+    assert response.status_code == HTTPStatus.OK
+    tokens = response.json()
+    assert tokens['token_type'] == 'Bearer'
+    assert tokens['refresh_token'] != refresh_token
+    assert refresh(client, tokens['refresh_token']).status_code == (
+        HTTPStatus.OK
+    )
+    assert reused.status_code == HTTPStatus.UNAUTHORIZED
+    assert reused.json() == {'detail': 'Invalid refresh token'}
+
+
+def test_refresh_deve_executar_so_a_insercao_da_revogacao(
+    client: TestClient, refresh_token
+):
+    first = refresh(client, refresh_token)
+    second = refresh(client, first.json()['refresh_token'])
+
+    # nem o usuário nem a revogação são buscados
+    assert query_count(first) == 1
+    assert query_count(second) == 1
+
+
+def test_reuso_deve_ser_detectado_pela_propria_insercao(
+    client: TestClient, refresh_token
+):
+    refresh(client, refresh_token)
+
+    reused = refresh(client, refresh_token)
+
+    # o `ON CONFLICT DO NOTHING` sem linha retornada é o 401
+    assert reused.status_code == HTTPStatus.UNAUTHORIZED
+    assert query_count(reused) == 1
+
+
+def test_logout_deve_revogar_o_refresh_token(
+    client: TestClient, refresh_token
+):
+    response = client.post(
+        '/auth/logout', json={'refresh_token': refresh_token}
+    )
+    again = client.post('/auth/logout', json={'refresh_token': refresh_token})
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {'message': 'Logged out'}
+    assert again.status_code == HTTPStatus.OK
+    assert refresh(client, refresh_token).status_code == (
+        HTTPStatus.UNAUTHORIZED
+    )
+
+
+def test_revogacao_de_outro_worker_deve_ser_respeitada(
+    client: TestClient, refresh_token, session: Session
+):
+    # revogado por outro worker: só a tabela sabe
+    session.add(
+        RevokedToken(
+            jti=decode_refresh_token(refresh_token)['jti'],
+            expires_at=utcnow() + timedelta(days=1),
+        )
+    )
+    session.commit()
+
+    response = refresh(client, refresh_token)
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_limpeza_deve_apagar_revogacoes_expiradas(session: Session):
+    session.add_all([
+        RevokedToken(jti='expirado', expires_at=datetime(2020, 1, 1)),
+        RevokedToken(jti='vigente', expires_at=utcnow() + timedelta(days=1)),
+    ])
+    session.commit()
+
+    pruned = asyncio.run(prune_revocations(ThreadedSession(session)))
+    session.expire_all()
+
+    assert pruned == 1
+    assert session.scalars(select(RevokedToken.jti)).all() == ['vigente']
+
+
+def test_limpeza_periodica_deve_seguir_apos_uma_falha(
+    session: Session, engine, caplog
+):
+    session.add(RevokedToken(jti='expirado', expires_at=datetime(2020, 1, 1)))
+    session.commit()
+    calls = []
+
+    def session_factory():
+        calls.append(1)
+        if len(calls) == 1:
+            raise TimeoutError('pool timeout')
+        return ThreadedSession(Session(engine))
+
+    def remaining():
+        session.expire_all()
+        return session.scalars(select(RevokedToken.jti)).all()
+
+    async def run():
+        task = asyncio.create_task(prune_periodically(session_factory, 0.01))
+        for _ in range(500):
+            await asyncio.sleep(0.01)
+            if len(calls) > 1 and not remaining():
+                break
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+
+    assert remaining() == []
+    assert 'pruning expired revocations failed' in caplog.messages
+
+
+def test_refresh_token_nao_deve_autenticar(client: TestClient, refresh_token):
+    response = client.get(
+        '/auth/refresh_token',
+        headers={'Authorization': f'Bearer {refresh_token}'},
+    )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_access_token_nao_deve_renovar(client: TestClient, token):
+    response = refresh(client, token)
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+    assert response.json() == {'detail': 'Invalid refresh token'}
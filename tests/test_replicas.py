@@ -0,0 +1,265 @@
+import logging
+from http import HTTPStatus
+from time import monotonic, time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import make_url
+from sqlalchemy.orm import Session
+
+from fast_zero import database
+from fast_zero.database import WRITE_COOKIE, Replica, ReplicaRouter
+from fast_zero.models import User, table_registry
+from fast_zero.settings import Settings
+from tests.conftest import TodoFactory
+
+SECRET = 'secret'
+
+
+@pytest.fixture
+def replica_url(database_url, engine):
+    # segundo banco no mesmo servidor, com o schema e sem dados
+    url = make_url(database_url)
+    url = url.set(database=f'{url.database}_replica')
+    with engine.connect().execution_options(
+        isolation_level='AUTOCOMMIT'
+    ) as conn:
+        conn.exec_driver_sql(f'DROP DATABASE IF EXISTS {url.database}')
+        conn.exec_driver_sql(f'CREATE DATABASE {url.database}')
+
+    yield url.render_as_string(hide_password=False)
+
+    with engine.connect().execution_options(
+        isolation_level='AUTOCOMMIT'
+    ) as conn:
+        conn.exec_driver_sql(f'DROP DATABASE {url.database} WITH (FORCE)')
+
+
+@pytest.fixture
+def replica(replica_url, user: User):
+    replica = Replica(replica_url, Settings(DATABASE_MODE='sync'))
+    table_registry.metadata.create_all(replica.engine)
+    # o usuário já replicado, para autenticar lendo da réplica
+    with Session(replica.engine) as session:
+        session.add(
+            User(
+                username=user.username,
+                email=user.email,
+                password=user.password,
+            )
+        )
+        session.commit()
+
+    yield replica
+    replica.engine.dispose()
+
+
+@pytest.fixture
+def router(monkeypatch, replica):
+    router = ReplicaRouter(
+        [replica], sticky_seconds=60, retry_seconds=30, secret=SECRET
+    )
+    monkeypatch.setattr(database, 'read_replicas', router)
+    return router
+
+
+def test_leituras_devem_ir_para_a_replica(
+    client: TestClient, session, user, token, router
+):
+    session.add(TodoFactory(user_id=user.id))
+    session.commit()
+    header = {'Authorization': f'Bearer {token}'}
+
+    todos = client.get('/todos/', headers=header).json()['todos']
+    users = client.get('/users/').json()['users']
+
+    # o todo só existe no primário
+    assert todos == []
+    assert [u['email'] for u in users] == [user.email]
+
+
+def test_depois_de_escrever_deve_ler_do_primario(
+    client: TestClient, token, router
+):
+    header = {'Authorization': f'Bearer {token}'}
+
+    response = client.post(
+        '/todos/',
+        headers=header,
+        json={'title': 't', 'description': 'd', 'state': 'todo'},
+    )
+    todos = client.get('/todos/', headers=header).json()['todos']
+
+    assert response.status_code == HTTPStatus.OK
+    assert [todo['title'] for todo in todos] == ['t']
+
+
+def test_criar_usuario_deve_ler_do_primario_em_seguida(
+    client: TestClient, user, router
+):
+    response = client.post(
+        '/users/',
+        json={
+            'username': 'new',
+            'email': 'new@example.com',
+            'password': 'secret',
+        },
+    )
+    users = client.get('/users/').json()['users']
+
+    assert response.status_code == HTTPStatus.CREATED
+    assert router.wrote_recently(response.cookies[WRITE_COOKIE])
+    # a réplica só tem `user`
+    assert [u['email'] for u in users] == [user.email, 'new@example.com']
+
+
+def test_login_deve_marcar_o_cliente(client: TestClient, user, router):
+    response = client.post(
+        '/auth/token',
+        data={'username': user.email, 'password': user.clean_password},  # type: ignore
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert router.wrote_recently(response.cookies[WRITE_COOKIE])
+
+
+def test_escrita_sem_replicas_nao_deve_marcar_o_cliente(
+    client: TestClient, user
+):
+    response = client.post(
+        '/auth/token',
+        data={'username': user.email, 'password': user.clean_password},  # type: ignore
+    )
+
+    assert WRITE_COOKIE not in response.cookies
+
+
+def test_replica_indisponivel_deve_cair_no_primario(
+    client: TestClient, user, replica_url, monkeypatch, caplog
+):
+    missing = make_url(replica_url).set(database='missing_replica')
+    replica = Replica(
+        missing.render_as_string(hide_password=False),
+        Settings(DATABASE_MODE='sync'),
+    )
+    monkeypatch.setattr(
+        database,
+        'read_replicas',
+        ReplicaRouter(
+            [replica], sticky_seconds=60, retry_seconds=30, secret=SECRET
+        ),
+    )
+
+    with caplog.at_level(logging.WARNING, logger='fast_zero.database'):
+        response = client.get('/users/')
+
+    assert response.status_code == HTTPStatus.OK
+    assert [u['email'] for u in response.json()['users']] == [user.email]
+    assert replica.unhealthy_until > monotonic()
+    assert 'read replica' in caplog.text
+    replica.engine.dispose()
+
+
+def test_replicas_devem_revezar_em_round_robin():
+    settings = Settings(DATABASE_MODE='sync')
+    first, second = (
+        Replica('sqlite://', settings),
+        Replica('sqlite://', settings),
+    )
+    router = ReplicaRouter(
+        [first, second], sticky_seconds=60, retry_seconds=30, secret=SECRET
+    )
+
+    assert [router.choose() for _ in range(4)] == [
+        first,
+        second,
+        first,
+        second,
+    ]
+
+
+def test_replica_com_falha_deve_sair_da_rotacao():
+    settings = Settings(DATABASE_MODE='sync')
+    first, second = (
+        Replica('sqlite://', settings),
+        Replica('sqlite://', settings),
+    )
+    router = ReplicaRouter(
+        [first, second], sticky_seconds=60, retry_seconds=30, secret=SECRET
+    )
+
+    router.mark_unhealthy(first)
+    chosen = [router.choose() for _ in range(3)]
+    router.mark_unhealthy(second)
+
+    assert chosen == [second] * 3
+    assert router.choose() is None
+
+
+def test_cliente_que_escreveu_deve_ler_do_primario():
+    replica = Replica('sqlite://', Settings(DATABASE_MODE='sync'))
+    router = ReplicaRouter(
+        [replica], sticky_seconds=60, retry_seconds=30, secret=SECRET
+    )
+    # outro worker: mesma chave, nenhum estado compartilhado
+    other = ReplicaRouter(
+        [replica], sticky_seconds=60, retry_seconds=30, secret=SECRET
+    )
+
+    marker = router.write_marker()
+
+    assert router.choose(marker) is None
+    assert other.choose(marker) is None
+    assert router.choose() is replica
+
+
+@pytest.mark.parametrize(
+    'marker',
+    [
+        '',
+        'garbage',
+        f'{time() + 3600:.3f}.forged',
+        f'{time() + 3600:.3f}.assinatura-não-ascii',
+        ReplicaRouter(
+            [], sticky_seconds=60, retry_seconds=30, secret='other'
+        ).write_marker(),
+    ],
+)
+def test_marca_de_escrita_invalida_deve_ser_ignorada(marker):
+    router = ReplicaRouter(
+        [], sticky_seconds=60, retry_seconds=30, secret=SECRET
+    )
+
+    assert not router.wrote_recently(marker)
+
+
+def test_cookie_de_escrita_nao_ascii_deve_ser_ignorado(
+    client: TestClient, token, router
+):
+    header = {
+        'Authorization': f'Bearer {token}',
+        'Cookie': f'{WRITE_COOKIE}=1.sinal-não-ascii'.encode('latin-1'),
+    }
+
+    response = client.get('/todos/', headers=header)
+
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_marca_de_escrita_deve_expirar(monkeypatch):
+    router = ReplicaRouter(
+        [], sticky_seconds=5, retry_seconds=30, secret=SECRET
+    )
+    marker = router.write_marker()
+
+    assert router.wrote_recently(marker)
+    monkeypatch.setattr(database, 'time', lambda: time() + 6)
+    assert not router.wrote_recently(marker)
+
+
+def test_sem_replicas_deve_ler_do_primario():
+    router = ReplicaRouter(
+        [], sticky_seconds=60, retry_seconds=30, secret=SECRET
+    )
+
+    assert router.choose() is None
@@ -0,0 +1,43 @@
+from http import HTTPStatus
+
+from fastapi.testclient import TestClient
+
+from fast_zero.models import TodoState
+from fast_zero.responses import FastJSONResponse, page_payload
+from fast_zero.schemas import TodoPublic
+
+
+def test_fast_json_response_serializa_enums_e_modelos():
+    todo = TodoPublic(id=1, title='ação', description='d', state='done')
+
+    response = FastJSONResponse({'todo': todo, 'state': TodoState.todo})
+
+    assert (
+        response.body
+        == (
+            '{"todo":{"title":"ação","description":"d","state":"done","id":1},'
+            '"state":"todo"}'
+        ).encode()
+    )
+    assert response.headers['content-type'] == 'application/json'
+
+
+def test_page_payload_omite_cursor_nulo():
+    assert page_payload('todos', [], None) == {'todos': []}
+    assert page_payload('todos', [], 'abc') == {
+        'todos': [],
+        'next_cursor': 'abc',
+    }
+
+
+def test_rotas_sem_response_class_usam_fast_json_response(
+    client: TestClient, monkeypatch
+):
+    monkeypatch.setattr(
+        FastJSONResponse, 'render', lambda self, content: b'{"fast":true}'
+    )
+
+    response = client.get('/')
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {'fast': True}
@@ -0,0 +1,71 @@
+from http import HTTPStatus
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from fast_zero.models import User
+from tests.conftest import TodoFactory, capture_statements
+
+
+def test_patch_todo_deve_usar_um_unico_comando(  # noqa: PLR0913, PLR0917
+    session: Session, client: TestClient, user: User, auth_header, db_engines
+):
+    todo = TodoFactory(user_id=user.id)
+    session.add(todo)
+    session.commit()
+    session.refresh(todo)
+
+    with capture_statements(*db_engines) as statements:
+        response = client.patch(
+            f'/todos/{todo.id}', headers=auth_header, json={'title': 'novo'}
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['title'] == 'novo'
+    assert len(statements) == 1
+
+
+def test_delete_todo_deve_usar_um_unico_comando(
+    session: Session, client: TestClient, user: User, auth_header, db_engines
+):
+    todo = TodoFactory(user_id=user.id)
+    session.add(todo)
+    session.commit()
+    session.refresh(todo)
+
+    with capture_statements(*db_engines) as statements:
+        response = client.delete(f'/todos/{todo.id}', headers=auth_header)
+
+    assert response.status_code == HTTPStatus.OK
+    assert len(statements) == 1
+
+
+def test_create_todo_deve_usar_um_unico_comando(
+    client: TestClient, auth_header, db_engines
+):
+    with capture_statements(*db_engines) as statements:
+        response = client.post(
+            '/todos/',
+            headers=auth_header,
+            json={'title': 't', 'description': 'd', 'state': 'draft'},
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    assert len(statements) == 1
+
+
+def test_create_user_deve_usar_um_unico_comando(
+    client: TestClient, db_engines
+):
+    with capture_statements(*db_engines) as statements:
+        response = client.post(
+            '/users/',
+            json={
+                'username': 'tester',
+                'email': 'test@gmail.com',
+                'password': 'teste123456789',
+            },
+        )
+
+    assert response.status_code == HTTPStatus.CREATED
+    assert len(statements) == 1
@@ -1,11 +1,25 @@
-from jwt import decode
+import pytest
+from freezegun import freeze_time
+from jwt import ExpiredSignatureError, decode
 
-from fast_zero.security import create_access_token
+from fast_zero import security
+from fast_zero.security import (
+    create_access_token,
+    decode_access_token,
+    token_cache,
+)
 from fast_zero.settings import Settings
 
 settings = Settings()  # type: ignore
 
 
+@pytest.fixture
+def empty_token_cache():
+    token_cache.clear()
+    yield token_cache
+    token_cache.clear()
+
+
 def test_jwt():
     data = {'sub': 'test@test.com'}
     result = create_access_token(data)
@@ -13,3 +27,41 @@ def test_jwt():
 
     assert decoded['sub'] == data['sub']
     assert decoded['exp']
+
+
+def test_decode_access_token_deve_verificar_o_token_uma_unica_vez(
+    empty_token_cache,
+):
+    token = create_access_token({'sub': 'test@test.com'})
+
+    first = decode_access_token(token)
+    second = decode_access_token(token)
+
+    assert first == second
+    assert empty_token_cache.stats()['misses'] == 1
+    assert empty_token_cache.stats()['hits'] == 1
+
+
+def test_decode_access_token_sem_cache_quando_desabilitado(
+    empty_token_cache, monkeypatch
+):
+    monkeypatch.setattr(security.settings, 'TOKEN_CACHE_ENABLED', False)
+    token = create_access_token({'sub': 'test@test.com'})
+
+    decode_access_token(token)
+    decode_access_token(token)
+
+    assert len(empty_token_cache) == 0
+
+
+def test_decode_access_token_nao_deve_aceitar_token_expirado_do_cache(
+    empty_token_cache,
+):
+    with freeze_time('2023-07-14 12:00:00', tz_offset=0) as frozen:
+        token = create_access_token({'sub': 'test@test.com'})
+        decode_access_token(token)
+
+        frozen.tick(settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60 + 1)
+
+        with pytest.raises(ExpiredSignatureError):
+            decode_access_token(token)
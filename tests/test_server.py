@@ -0,0 +1,111 @@
+import subprocess
+import sys
+
+import pytest
+
+from fast_zero import server
+from fast_zero.server import available_cpus, cgroup_cpu_limit, server_options
+from fast_zero.settings import Settings
+
+NODE_CPUS = 16
+
+
+@pytest.fixture
+def node_cpus(monkeypatch):
+    monkeypatch.setattr(
+        server.os, 'sched_getaffinity', lambda pid: set(range(NODE_CPUS))
+    )
+    return NODE_CPUS
+
+
+def test_cgroup_v2_deve_limitar_as_cpus(tmp_path, node_cpus):
+    (tmp_path / 'cpu.max').write_text('150000 100000\n')
+
+    assert cgroup_cpu_limit(tmp_path) == 1.5  # noqa: PLR2004
+    assert available_cpus(tmp_path) == 2  # noqa: PLR2004
+
+
+def test_cgroup_v2_sem_limite_deve_usar_a_afinidade(tmp_path, node_cpus):
+    (tmp_path / 'cpu.max').write_text('max 100000\n')
+
+    assert cgroup_cpu_limit(tmp_path) is None
+    assert available_cpus(tmp_path) == node_cpus
+
+
+def test_cgroup_v1_deve_limitar_as_cpus(tmp_path, node_cpus):
+    (tmp_path / 'cpu').mkdir()
+    (tmp_path / 'cpu' / 'cpu.cfs_quota_us').write_text('400000\n')
+    (tmp_path / 'cpu' / 'cpu.cfs_period_us').write_text('100000\n')
+
+    assert available_cpus(tmp_path) == 4  # noqa: PLR2004
+
+
+def test_sem_cgroup_deve_usar_a_afinidade(tmp_path, node_cpus):
+    assert cgroup_cpu_limit(tmp_path) is None
+    assert available_cpus(tmp_path) == node_cpus
+
+
+def test_server_options_deve_usar_um_worker_por_cpu(monkeypatch):
+    monkeypatch.setattr(server, 'available_cpus', lambda: 3)
+
+    options = server_options(Settings(SERVER_KEEPALIVE_SECONDS=90))
+
+    assert options['workers'] == 3  # noqa: PLR2004
+    assert options['timeout_keep_alive'] == 90  # noqa: PLR2004
+    assert options['log_config']['loggers']['fast_zero']['level'] == 'INFO'
+
+
+def test_server_options_argumentos_devem_sobrescrever_o_settings():
+    options = server_options(
+        Settings(SERVER_WORKERS=4), workers=2, port=9000, host=None
+    )
+
+    assert options['workers'] == 2  # noqa: PLR2004
+    assert options['port'] == 9000  # noqa: PLR2004
+    assert options['host'] == '0.0.0.0'
+
+
+def test_server_options_deve_repassar_os_proxies_confiaveis():
+    options = server_options(Settings(SERVER_FORWARDED_ALLOW_IPS='10.0.0.1'))
+    direct = server_options(Settings(SERVER_FORWARDED_ALLOW_IPS=''))
+
+    assert options['proxy_headers'] is True
+    assert options['forwarded_allow_ips'] == '10.0.0.1'
+    assert direct['proxy_headers'] is False
+
+
+def test_server_options_sem_uvloop_e_httptools(monkeypatch):
+    monkeypatch.setattr(server, 'find_spec', lambda name: None)
+
+    options = server_options(Settings())
+
+    assert (options['loop'], options['http']) == ('asyncio', 'h11')
+
+
+def test_serve_deve_montar_o_app_so_pela_factory(monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        server.uvicorn,
+        'run',
+        lambda target, **options: calls.append((target, options)),
+    )
+    monkeypatch.setattr(server.logging.config, 'dictConfig', lambda c: None)
+
+    server.serve(Settings(SERVER_WORKERS=1))
+
+    [(target, options)] = calls
+    module = target.split(':')[0]
+    # cada worker importa `module`: ele não pode montar o app na importação
+    imported = subprocess.run(
+        [
+            sys.executable,
+            '-c',
+            f'import sys, {module}; print("fast_zero.app" in sys.modules)',
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert options['factory'] is True
+    assert imported.stdout.strip() == 'False'
@@ -0,0 +1,164 @@
+import random
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from fast_zero import __main__ as cli
+from fast_zero.counters import rebuild_counters
+from fast_zero.models import Todo, TodoCounter, TodoState, User
+
+WORKERS = 8
+OPERATIONS = 40
+
+
+def stored_counters(session: Session):
+    rows = session.execute(
+        select(TodoCounter.user_id, TodoCounter.state, TodoCounter.count)
+    )
+    return {(user_id, state): n for user_id, state, n in rows if n}
+
+
+def actual_counters(session: Session):
+    rows = session.execute(
+        select(Todo.user_id, Todo.state, func.count()).group_by(
+            Todo.user_id, Todo.state
+        )
+    )
+    return {(user_id, state): n for user_id, state, n in rows}
+
+
+def test_stats_deve_acompanhar_as_escritas(client: TestClient, token: str):
+    headers = {'Authorization': f'Bearer {token}'}
+    ids = [
+        client.post(
+            '/todos/',
+            headers=headers,
+            json={'title': 't', 'description': 'd', 'state': 'todo'},
+        ).json()['id']
+        for _ in range(3)
+    ]
+    client.patch(f'/todos/{ids[0]}', headers=headers, json={'state': 'done'})
+    client.patch(f'/todos/{ids[1]}', headers=headers, json={'title': 'x'})
+    client.delete(f'/todos/{ids[2]}', headers=headers)
+    client.post(
+        '/todos/bulk',
+        headers=headers,
+        json={
+            'todos': [{'title': 't', 'description': 'd', 'state': 'draft'}] * 2
+        },
+    )
+    client.post(
+        '/todos/import',
+        headers=headers,
+        content=b'{"title": "t", "description": "d", "state": "doing"}\n',
+    )
+
+    response = client.get('/todos/stats', headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {
+        'total': 5,
+        'counts': {
+            'draft': 2,
+            'todo': 1,
+            'state': 0,
+            'doing': 1,
+            'done': 1,
+            'trash': 0,
+        },
+    }
+
+
+def test_contadores_consistentes_com_escritas_concorrentes(
+    session: Session, engine, user: User, other_user: User
+):
+    user_ids = [user.id, other_user.id]
+    states = list(TodoState)
+
+    def random_todo(user_id: int):
+        return (
+            select(Todo.id)
+            .where(Todo.user_id == user_id)
+            .order_by(func.random())
+            .limit(1)
+            .scalar_subquery()
+        )
+
+    def worker(seed: int):
+        rng = random.Random(seed)
+        with Session(engine) as worker_session:
+            for _ in range(OPERATIONS):
+                user_id = rng.choice(user_ids)
+                operation = rng.random()
+                if operation < 0.5:  # noqa: PLR2004
+                    statement = insert(Todo).values(
+                        title='t',
+                        description='d',
+                        state=rng.choice(states),
+                        user_id=user_id,
+                    )
+                elif operation < 0.8:  # noqa: PLR2004
+                    statement = (
+                        update(Todo)
+                        .where(Todo.id == random_todo(user_id))
+                        .values(state=rng.choice(states))
+                    )
+                else:
+                    statement = delete(Todo).where(
+                        Todo.id == random_todo(user_id)
+                    )
+                worker_session.execute(statement)
+                worker_session.commit()
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as executor:
+        list(executor.map(worker, range(WORKERS)))
+
+    assert actual_counters(session)
+    assert stored_counters(session) == actual_counters(session)
+
+
+def test_rebuild_counters_deve_corrigir_contadores(
+    session: Session, user: User, other_user: User
+):
+    session.execute(
+        insert(Todo),
+        [
+            {
+                'title': 't',
+                'description': 'd',
+                'state': state,
+                'user_id': user_id,
+            }
+            for user_id in (user.id, other_user.id)
+            for state in (TodoState.todo, TodoState.todo, TodoState.done)
+        ],
+    )
+    session.execute(update(TodoCounter).values(count=99))
+    session.commit()
+
+    assert rebuild_counters(session, user.id) == 2  # noqa: PLR2004
+    assert stored_counters(session)[user.id, TodoState.todo] == 2  # noqa: PLR2004
+    assert stored_counters(session)[other_user.id, TodoState.todo] == 99  # noqa: PLR2004
+
+    rebuild_counters(session)
+    assert stored_counters(session) == actual_counters(session)
+
+
+def test_comando_repair_counters(
+    session: Session, engine, user: User, monkeypatch, capsys
+):
+    session.execute(
+        insert(TodoCounter).values(
+            user_id=user.id, state=TodoState.trash, count=7
+        )
+    )
+    session.commit()
+    monkeypatch.setattr(cli, 'engine', engine)
+
+    cli.main(['repair-counters'])
+
+    assert capsys.readouterr().out == '0 todo counters rebuilt\n'
+    assert not stored_counters(session)
@@ -6,9 +6,11 @@ from typing import Dict, List
 
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import delete, select
 from sqlalchemy.orm import Session
 
-from fast_zero.models import TodoState, User
+from fast_zero.models import Todo, TodoState, User
+from fast_zero.pagination import encode_cursor
 from tests.conftest import TodoFactory
 
 
@@ -31,6 +33,28 @@ def test_create_todo(client: TestClient, token: str):
     }
 
 
+@pytest.mark.parametrize('path', ['/todos/', '/todos/bulk'])
+def test_create_todo_de_usuario_removido_por_outro_worker(
+    session: Session, client: TestClient, user: User, auth_header, path
+):
+    # o usuário segue no cache deste processo
+    session.execute(delete(User).where(User.id == user.id))
+    session.commit()
+    todo = {'title': 't', 'description': 'd', 'state': 'todo'}
+
+    response = client.post(
+        path,
+        headers=auth_header,
+        json={'todos': [todo]} if path.endswith('bulk') else todo,
+    )
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert response.json() == {'detail': 'User not found'}
+    # o cache foi invalidado: a próxima requisição já consulta o banco
+    response = client.get('/todos/', headers=auth_header)
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
 def test_list_todos_should_return_5_todos(
     session: Session, client: TestClient, user: User, token: str
 ):
@@ -338,3 +362,125 @@ def test_patch_todo_must_be_fail_with_inexistent_todo(
     )
     assert response.json()['detail'] == 'Task not found.'
     assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+@pytest.mark.parametrize('sort', ['id', 'title'])
+def test_list_todos_cursor_deve_percorrer_todos_sem_repetir(
+    session: Session, client: TestClient, user: User, token: str, sort: str
+):
+    todos = TodoFactory.build_batch(23, user_id=user.id)
+    session.bulk_save_objects(todos)
+    session.commit()
+
+    seen, params = [], {'limit': 5, 'sort': sort}
+    while True:
+        response = client.get(
+            url='/todos/',
+            params=params,
+            headers={'Authorization': f'Bearer {token}'},
+        )
+        assert response.status_code == HTTPStatus.OK
+        seen.extend(response.json()['todos'])
+        if 'next_cursor' not in response.json():
+            break
+        params['after'] = response.json()['next_cursor']
+
+    # a ordem esperada vem do banco: `sorted()` compara por codepoint, e o
+    # Postgres ordena os títulos pela collation
+    expected = session.scalars(
+        select(Todo.id)
+        .where(Todo.user_id == user.id)
+        .order_by(getattr(Todo, sort), Todo.id)
+    ).all()
+    assert len(seen) == len(todos)
+    assert [todo['id'] for todo in seen] == expected
+
+
+@pytest.mark.parametrize(
+    'params',
+    [
+        {'after': 'nao-e-um-cursor'},
+        {'after': 'WyJ0aXRsZSIsImEiLDFd', 'sort': 'id'},
+        {'after': encode_cursor('title', {'a': 1}, 1), 'sort': 'title'},
+        {'after': encode_cursor('title', ['a'], 1), 'sort': 'title'},
+        {'after': encode_cursor('title', 1, 1), 'sort': 'title'},
+        {'after': encode_cursor('id', True, True), 'sort': 'id'},
+    ],
+)
+def test_list_todos_cursor_invalido_deve_retornar_400(
+    client: TestClient, token: str, params: Dict[str, str]
+):
+    response = client.get(
+        url='/todos/',
+        params=params,
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'detail': 'Invalid cursor'}
+
+
+def test_list_todos_q_deve_retornar_resultados_ranqueados(
+    session: Session, client: TestClient, user: User, token: str
+):
+    session.bulk_save_objects([
+        TodoFactory.build(
+            title='haystack with a needle inside it',
+            description='xyz',
+            user_id=user.id,
+        ),
+        TodoFactory.build(title='Needle', description='xyz', user_id=user.id),
+        TodoFactory.build(title='nothing', description='xyz', user_id=user.id),
+        TodoFactory.build(
+            title='other', description='a needle here', user_id=user.id
+        ),
+    ])
+    session.commit()
+
+    response = client.get(
+        url='/todos/',
+        params={'q': 'needle'},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    titles = [todo['title'] for todo in response.json()['todos']]
+    assert titles[0] == 'Needle'
+    assert sorted(titles) == sorted([
+        'Needle',
+        'haystack with a needle inside it',
+        'other',
+    ])
+
+
+def test_list_todos_q_deve_exigir_ao_menos_3_caracteres(
+    client: TestClient, token: str
+):
+    response = client.get(
+        url='/todos/',
+        params={'q': 'ab'},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_list_todos_q_deve_refletir_alteracoes_e_remocoes(
+    session: Session, client: TestClient, user: User, token: str
+):
+    todo = TodoFactory(title='needle', description='xyz', user_id=user.id)
+    session.add(todo)
+    session.commit()
+    auth_header = {'Authorization': f'Bearer {token}'}
+
+    client.patch(
+        f'/todos/{todo.id}', headers=auth_header, json={'title': 'pin'}
+    )
+    response = client.get(
+        '/todos/', params={'q': 'needle'}, headers=auth_header
+    )
+    assert response.json()['todos'] == []
+
+    client.delete(f'/todos/{todo.id}', headers=auth_header)
+    response = client.get('/todos/', params={'q': 'pin'}, headers=auth_header)
+    assert response.json()['todos'] == []
@@ -0,0 +1,146 @@
+from http import HTTPStatus
+
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from fast_zero.models import Todo, User
+from fast_zero.routers import todo as todo_router
+from tests.conftest import TodoFactory
+
+
+def test_create_todos_bulk(client: TestClient, token: str):
+    todos = [
+        {'title': f'title {n}', 'description': 'bulk', 'state': 'todo'}
+        for n in range(3)
+    ]
+
+    response = client.post(
+        url='/todos/bulk',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'todos': todos},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {
+        'results': [
+            {
+                'id': n + 1,
+                'status': HTTPStatus.CREATED,
+                'todo': {'id': n + 1, **todo},
+            }
+            for n, todo in enumerate(todos)
+        ]
+    }
+
+
+def test_patch_todos_bulk_deve_atualizar_apenas_os_todos_do_usuario(  # noqa: PLR0913, PLR0917
+    session: Session,
+    client: TestClient,
+    user: User,
+    other_user: User,
+    token: str,
+):
+    mine = TodoFactory(title='mine', state='draft', user_id=user.id)
+    other = TodoFactory(user_id=other_user.id)
+    session.add_all([mine, other])
+    session.commit()
+
+    response = client.patch(
+        url='/todos/bulk',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'todos': [
+                {'id': mine.id, 'state': 'done'},
+                {'id': other.id, 'title': 'hijacked'},
+                {'id': 999, 'title': 'missing'},
+            ]
+        },
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {
+        'results': [
+            {
+                'id': mine.id,
+                'status': HTTPStatus.OK,
+                'todo': {
+                    'id': mine.id,
+                    'title': 'mine',
+                    'description': mine.description,
+                    'state': 'done',
+                },
+            },
+            {
+                'id': other.id,
+                'status': HTTPStatus.NOT_FOUND,
+                'detail': 'Task not found.',
+            },
+            {
+                'id': 999,
+                'status': HTTPStatus.NOT_FOUND,
+                'detail': 'Task not found.',
+            },
+        ]
+    }
+    session.expire_all()
+    assert session.scalar(select(Todo.title).where(Todo.id == other.id)) != (
+        'hijacked'
+    )
+
+
+def test_patch_todos_bulk_com_ids_duplicados(client: TestClient, token: str):
+    response = client.patch(
+        url='/todos/bulk',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'todos': [{'id': 1, 'title': 'a'}, {'id': 1, 'title': 'b'}]},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'detail': 'Duplicate todo ids in batch'}
+
+
+def test_delete_todos_bulk(  # noqa: PLR0913, PLR0917
+    session: Session,
+    client: TestClient,
+    user: User,
+    other_user: User,
+    token: str,
+):
+    mine = TodoFactory.create_batch(2, user_id=user.id)
+    other = TodoFactory(user_id=other_user.id)
+    session.add_all([*mine, other])
+    session.commit()
+    ids = [mine[0].id, other.id, mine[1].id]
+
+    response = client.request(
+        'DELETE',
+        url='/todos/bulk',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'ids': ids},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert [result['status'] for result in response.json()['results']] == [
+        HTTPStatus.OK,
+        HTTPStatus.NOT_FOUND,
+        HTTPStatus.OK,
+    ]
+    session.expire_all()
+    assert session.scalars(select(Todo.id)).all() == [other.id]
+
+
+def test_bulk_deve_respeitar_tamanho_maximo_do_lote(
+    client: TestClient, token: str, monkeypatch
+):
+    monkeypatch.setattr(todo_router.settings, 'TODO_BULK_MAX_SIZE', 2)
+
+    response = client.request(
+        'DELETE',
+        url='/todos/bulk',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'ids': [1, 2, 3]},
+    )
+
+    assert response.status_code == HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+    assert response.json() == {'detail': 'Batch exceeds 2 items'}
@@ -0,0 +1,70 @@
+import csv
+import io
+import json
+from http import HTTPStatus
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from fast_zero.models import TodoState, User
+from fast_zero.routers import todo as todo_router
+from tests.conftest import TodoFactory
+
+
+@pytest.fixture
+def todos(session: Session, user: User, other_user: User):
+    todos = TodoFactory.create_batch(7, user_id=user.id, state=TodoState.todo)
+    todos[3].state = TodoState.done
+    session.add_all([*todos, TodoFactory(user_id=other_user.id)])
+    session.commit()
+    return [
+        {
+            'id': todo.id,
+            'title': todo.title,
+            'description': todo.description,
+            'state': todo.state.value,
+        }
+        for todo in todos
+    ]
+
+
+def test_export_todos_ndjson_em_partes(
+    client: TestClient, token: str, todos, monkeypatch
+):
+    monkeypatch.setattr(todo_router.settings, 'EXPORT_CHUNK_SIZE', 2)
+
+    response = client.get(
+        '/todos/export', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    assert [json.loads(line) for line in response.text.splitlines()] == todos
+
+
+def test_export_todos_csv(client: TestClient, token: str, todos):
+    response = client.get(
+        '/todos/export',
+        params={'format': 'csv'},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'].startswith('text/csv')
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [{**row, 'id': int(row['id'])} for row in rows] == todos
+
+
+def test_export_todos_deve_aceitar_os_filtros_da_listagem(
+    client: TestClient, token: str, todos
+):
+    response = client.get(
+        '/todos/export',
+        params={'state': 'done'},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        todo for todo in todos if todo['state'] == 'done'
+    ]
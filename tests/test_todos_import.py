@@ -0,0 +1,230 @@
+import json
+from http import HTTPStatus
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from fast_zero import importing
+from fast_zero.models import Todo, TodoState, User
+from fast_zero.routers import todo as todo_router
+
+
+def imported_todos(session: Session, user: User):
+    return [
+        (todo.title, todo.description, todo.state)
+        for todo in session.scalars(
+            select(Todo).where(Todo.user_id == user.id).order_by(Todo.id)
+        )
+    ]
+
+
+def test_import_todos_ndjson_em_lotes(
+    client: TestClient, session: Session, user: User, token: str, monkeypatch
+):
+    monkeypatch.setattr(todo_router.settings, 'IMPORT_CHUNK_SIZE', 2)
+    body = ''.join(
+        json.dumps({'title': f't{n}', 'description': f'd{n}', 'state': 'todo'})
+        + '\n'
+        for n in range(5)
+    )
+
+    response = client.post(
+        '/todos/import',
+        content=body,
+        headers={
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'application/x-ndjson',
+        },
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {
+        'imported': 5,
+        'failed': 0,
+        'chunks': [
+            {'chunk': 1, 'rows': 2},
+            {'chunk': 2, 'rows': 2},
+            {'chunk': 3, 'rows': 1},
+        ],
+        'errors': [],
+    }
+    assert imported_todos(session, user) == [
+        (f't{n}', f'd{n}', TodoState.todo) for n in range(5)
+    ]
+
+
+def test_import_todos_deve_reportar_linhas_invalidas(
+    client: TestClient, session: Session, user: User, token: str
+):
+    body = '\n'.join([
+        '{"title": "ok", "description": "d", "state": "done"}',
+        '{"title": "sem estado", "description": "d"}',
+        '',
+        'não é json',
+        '{"title": "t", "description": "d", "state": "invalido"}',
+    ])
+
+    response = client.post(
+        '/todos/import',
+        content=body.encode(),
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    data = response.json()
+    assert response.status_code == HTTPStatus.OK
+    assert data['imported'] == 1
+    assert data['failed'] == 3  # noqa: PLR2004
+    assert [error['line'] for error in data['errors']] == [2, 4, 5]
+    assert data['errors'][0]['detail'].startswith('state: Field required')
+    assert imported_todos(session, user) == [('ok', 'd', TodoState.done)]
+
+
+def test_import_todos_csv_com_campos_em_varias_linhas(
+    client: TestClient, session: Session, user: User, token: str
+):
+    body = (
+        'id,title,description,state\r\n'
+        '1,simples,"com, vírgula",todo\r\n'
+        '2,multi,"linha 1\nlinha ""2""",doing\r\n'
+        '3,curta,done\r\n'
+    )
+
+    response = client.post(
+        '/todos/import',
+        params={'format': 'csv'},
+        content=body.encode(),
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    data = response.json()
+    assert data['imported'] == 2  # noqa: PLR2004
+    assert data['errors'] == [
+        {'line': 5, 'detail': 'Expected 4 fields, got 3'}
+    ]
+    assert imported_todos(session, user) == [
+        ('simples', 'com, vírgula', TodoState.todo),
+        ('multi', 'linha 1\nlinha "2"', TodoState.doing),
+    ]
+
+
+def test_import_todos_csv_sem_colunas_obrigatorias(
+    client: TestClient, token: str
+):
+    response = client.post(
+        '/todos/import',
+        params={'format': 'csv'},
+        content=b'title,state\nt,todo\n',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'detail': 'Missing CSV columns: description'}
+
+
+def test_import_todos_deve_limitar_os_erros_reportados(
+    client: TestClient, token: str, monkeypatch
+):
+    monkeypatch.setattr(todo_router.settings, 'IMPORT_MAX_ERRORS', 2)
+
+    response = client.post(
+        '/todos/import',
+        content=b'{}\n' * 5,
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    data = response.json()
+    assert data['failed'] == 5  # noqa: PLR2004
+    assert len(data['errors']) == 2  # noqa: PLR2004
+
+
+def test_import_todos_de_usuario_removido_por_outro_worker(
+    client: TestClient, session: Session, user: User, auth_header
+):
+    session.execute(delete(User).where(User.id == user.id))
+    session.commit()
+
+    response = client.post(
+        '/todos/import',
+        content='{"title": "t", "description": "d", "state": "todo"}\n',
+        headers={**auth_header, 'Content-Type': 'application/x-ndjson'},
+    )
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert response.json() == {'detail': 'User not found'}
+
+
+def test_import_todos_deve_recusar_linhas_longas_demais(
+    client: TestClient, session: Session, user: User, token: str, monkeypatch
+):
+    monkeypatch.setattr(todo_router.settings, 'IMPORT_MAX_LINE_LENGTH', 60)
+    body = (
+        '{"title": "a", "description": "d", "state": "todo"}\n'
+        + json.dumps({'title': 'b', 'description': 'x' * 200, 'state': 'todo'})
+        + '\n{"title": "c", "description": "d", "state": "todo"}\n'
+    ).encode()
+
+    response = client.post(
+        '/todos/import',
+        # em pedaços: a linha longa é descartada antes de terminar
+        content=(body[i : i + 16] for i in range(0, len(body), 16)),
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.json()['errors'] == [
+        {'line': 2, 'detail': 'Line exceeds 60 characters'}
+    ]
+    assert imported_todos(session, user) == [
+        ('a', 'd', TodoState.todo),
+        ('c', 'd', TodoState.todo),
+    ]
+
+
+def test_import_todos_deve_recusar_registros_csv_longos_demais(
+    client: TestClient, session: Session, user: User, token: str, monkeypatch
+):
+    monkeypatch.setattr(todo_router.settings, 'IMPORT_MAX_LINE_LENGTH', 40)
+    lines = '\n'.join(f'linha {n}' for n in range(10))
+    body = (
+        'title,description,state\n' f'longo,"{lines}",todo\n' 'curto,d,done\n'
+    )
+
+    response = client.post(
+        '/todos/import',
+        params={'format': 'csv'},
+        content=body.encode(),
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.json()['errors'] == [
+        {'line': 2, 'detail': 'Record exceeds 40 characters'}
+    ]
+    assert imported_todos(session, user) == [('curto', 'd', TodoState.done)]
+
+
+def test_import_todos_deve_gravar_todos_os_lotes_ou_nenhum(
+    client: TestClient, session: Session, user: User, token: str, monkeypatch
+):
+    monkeypatch.setattr(todo_router.settings, 'IMPORT_CHUNK_SIZE', 1)
+    calls = []
+
+    def copy_todos(sync_session, rows):
+        calls.append(rows)
+        if len(calls) > 1:
+            raise RuntimeError('conexão perdida')
+        importing.copy_todos(sync_session, rows)
+
+    monkeypatch.setattr(todo_router, 'copy_todos', copy_todos)
+    body = '{"title": "t", "description": "d", "state": "todo"}\n' * 2
+
+    with pytest.raises(RuntimeError):
+        client.post(
+            '/todos/import',
+            content=body.encode(),
+            headers={'Authorization': f'Bearer {token}'},
+        )
+    # o que a sessão da requisição faz ao ser fechada
+    session.rollback()
+
+    assert imported_todos(session, user) == []
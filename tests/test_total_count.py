@@ -0,0 +1,159 @@
+from http import HTTPStatus
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from fast_zero.models import TodoState, User
+from fast_zero.pagination import bound_estimate
+from tests.conftest import TodoFactory, capture_statements
+
+DONE = 40
+PAGE = 15
+
+
+@pytest.fixture
+def todos(session: Session, user: User, other_user: User):
+    session.add_all(
+        TodoFactory.create_batch(DONE, user_id=user.id, state=TodoState.done)
+        + TodoFactory.create_batch(20, user_id=user.id, state=TodoState.todo)
+        + TodoFactory.create_batch(5, user_id=other_user.id)
+    )
+    session.commit()
+    # estatísticas atualizadas para o planejador (também vale no SQLite)
+    session.execute(text('ANALYZE todos'))
+    session.commit()
+    return DONE
+
+
+def test_list_todos_sem_include_total_nao_envia_o_header(
+    client: TestClient, auth_header, todos
+):
+    response = client.get('/todos/', headers=auth_header)
+
+    assert response.status_code == HTTPStatus.OK
+    assert 'x-total-count' not in response.headers
+
+
+def test_list_todos_exact_deve_contar_o_conjunto_filtrado(
+    client: TestClient, auth_header, todos
+):
+    params = {'state': 'done', 'limit': PAGE, 'include_total': 'exact'}
+    response = client.get('/todos/', headers=auth_header, params=params)
+
+    assert response.headers['x-total-count'] == str(todos)
+    assert len(response.json()['todos']) == PAGE
+
+    # o total ignora o cursor: continua o mesmo nas páginas seguintes
+    response = client.get(
+        '/todos/',
+        headers=auth_header,
+        params={**params, 'after': response.json()['next_cursor']},
+    )
+
+    assert response.headers['x-total-count'] == str(todos)
+
+
+def test_list_todos_exact_nao_adiciona_comandos(
+    client: TestClient, auth_header, todos, db_engines
+):
+    with capture_statements(*db_engines) as plain:
+        client.get('/todos/', headers=auth_header)
+    with capture_statements(*db_engines) as counted:
+        client.get(
+            '/todos/', headers=auth_header, params={'include_total': 'exact'}
+        )
+
+    assert len(counted) == len(plain)
+
+
+def test_list_todos_estimate_deve_ficar_dentro_do_limite_de_erro(
+    client: TestClient, auth_header, todos
+):
+    response = client.get(
+        '/todos/',
+        headers=auth_header,
+        params={'state': 'done', 'limit': 5, 'include_total': 'estimate'},
+    )
+
+    # estatísticas recém-coletadas: dentro de 10% do total exato
+    estimate = int(response.headers['x-total-count'])
+    assert abs(estimate - todos) <= todos / 10
+
+
+def test_list_todos_estimate_na_ultima_pagina_deve_ser_exato(
+    client: TestClient, auth_header, todos
+):
+    response = client.get(
+        '/todos/',
+        headers=auth_header,
+        params={'q': 'zzzzzz', 'include_total': 'estimate'},
+    )
+
+    assert response.json() == {'todos': []}
+    assert response.headers['x-total-count'] == '0'
+
+
+def test_list_todos_include_total_invalido_deve_retornar_422(
+    client: TestClient, auth_header
+):
+    response = client.get(
+        '/todos/', headers=auth_header, params={'include_total': 'all'}
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_read_users_exact_deve_contar_em_todas_as_paginas(
+    client: TestClient, user: User, other_user: User, db_engines
+):
+    params = {'limit': 1, 'include_total': 'exact'}
+    with capture_statements(*db_engines) as statements:
+        response = client.get('/users/', params=params)
+
+    assert len(statements) == 1
+    assert response.headers['x-total-count'] == '2'
+    # a coluna do total não aparece nos itens
+    assert response.json()['users'] == [
+        {'id': user.id, 'username': user.username, 'email': user.email}
+    ]
+
+    response = client.get(
+        '/users/', params={**params, 'after': response.json()['next_cursor']}
+    )
+
+    assert response.headers['x-total-count'] == '2'
+
+    response = client.get('/users/', params={**params, 'skip': 5})
+
+    assert response.json() == {'users': []}
+    assert response.headers['x-total-count'] == '2'
+
+
+def test_read_users_estimate_deve_enviar_o_total(
+    client: TestClient, user: User, other_user: User
+):
+    response = client.get('/users/', params={'include_total': 'estimate'})
+
+    assert response.headers['x-total-count'] == '2'
+
+
+@pytest.mark.parametrize(
+    ('estimate', 'page', 'complete', 'offset', 'after', 'expected'),
+    [
+        # última página sem cursor: total exato
+        (1, [1, 2], True, 10, None, 12),
+        (500, [], True, 0, None, 0),
+        # nunca menos que as linhas já vistas
+        (3, [1, 2], False, 10, None, 12),
+        (3, [1, 2, 3, 4], True, 0, 'cursor', 4),
+        # sem evidência contrária a estimativa é mantida
+        (500, [1, 2], False, 0, None, 500),
+        (500, [], True, 20, None, 500),
+    ],
+)
+def test_bound_estimate(  # noqa: PLR0913, PLR0917
+    estimate, page, complete, offset, after, expected
+):
+    assert bound_estimate(estimate, page, complete, offset, after) == expected
@@ -4,9 +4,12 @@ import pytest
 from fastapi import HTTPException
 from fastapi.testclient import TestClient
 
+from fast_zero.database import ThreadedSession
 from fast_zero.models import User
+from fast_zero.pagination import encode_cursor
 from fast_zero.routers.users import create_user
 from fast_zero.schemas import UserPublic, UserSchema
+from fast_zero.security import user_cache
 
 
 def test_create_user(client: TestClient):
@@ -96,20 +99,22 @@ def test_delete_wrong_user(client: TestClient, other_user: User, token: str):
     assert response.json() == {'detail': 'Not enough permission'}
 
 
-def test_create_user_deve_levantar_HTTPException_para_email_existente(
+@pytest.mark.anyio
+async def test_create_user_deve_levantar_HTTPException_para_email_existente(
     session, user
 ):
     user_schema = UserSchema.model_validate(user).model_dump()
 
     user_schema['username'] = f'1_{user_schema['username'][::-1]}_$'
     with pytest.raises(HTTPException) as exc_info:
-        create_user(UserSchema(**user_schema), session)
+        await create_user(UserSchema(**user_schema), ThreadedSession(session))
 
     assert exc_info.value.status_code == HTTPStatus.BAD_REQUEST
     assert exc_info.value.detail == 'Email already exists'
 
 
-def test_create_user_deve_levantar_HTTPException_para_username_existente(
+@pytest.mark.anyio
+async def test_create_user_deve_levantar_HTTPException_para_username_existente(
     session, user
 ):
     user_schema = UserSchema.model_validate(user).model_dump()
@@ -118,7 +123,7 @@ def test_create_user_deve_levantar_HTTPException_para_username_existente(
         f'1_{user_schema['email'].split('@')[0][::-1]}@{user_schema['email'].split('@')[1]}'
     )
     with pytest.raises(HTTPException) as exc_info:
-        create_user(UserSchema(**user_schema), session)
+        await create_user(UserSchema(**user_schema), ThreadedSession(session))
 
     assert exc_info.value.status_code == HTTPStatus.BAD_REQUEST
     assert exc_info.value.detail == 'Username already exists'
@@ -164,3 +169,65 @@ def test_get_user_by_id_deve_retornar_user_not_found(
     assert response.status_code == HTTPStatus.NOT_FOUND
 
     assert response.json()['detail'] == 'User not found'
+
+
+def test_update_user_deve_invalidar_cache_do_usuario(
+    client: TestClient, user: User, token: str
+):
+    auth_header = {'Authorization': f'Bearer {token}'}
+    client.get(url='/auth/refresh_token', headers=auth_header)
+    assert user_cache.get(user.email)
+
+    client.put(
+        url=f'/users/{user.id}',
+        headers=auth_header,
+        json={
+            'email': 'novo@test.com',
+            'username': user.username,
+            'password': user.clean_password,  # type: ignore
+        },
+    )
+    response = client.get(url='/auth/refresh_token', headers=auth_header)
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+    assert user_cache.get(user.email) is None
+
+
+def test_delete_user_deve_invalidar_cache_do_usuario(
+    client: TestClient, user: User, token: str
+):
+    auth_header = {'Authorization': f'Bearer {token}'}
+    client.get(url='/auth/refresh_token', headers=auth_header)
+
+    client.delete(url=f'/users/{user.id}', headers=auth_header)
+    response = client.get(url='/auth/refresh_token', headers=auth_header)
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_read_users_com_cursor(client: TestClient, user: User, other_user):
+    response = client.get('/users/', params={'limit': 1})
+    next_cursor = response.json()['next_cursor']
+
+    assert response.json()['users'][0]['id'] == user.id
+
+    response = client.get('/users/', params={'limit': 1, 'after': next_cursor})
+
+    assert response.json() == {
+        'users': [UserPublic.model_validate(other_user).model_dump()]
+    }
+
+
+def test_read_users_cursor_com_valor_invalido_deve_retornar_400(
+    client: TestClient,
+):
+    response = client.get(
+        '/users/',
+        params={
+            'sort': 'username',
+            'after': encode_cursor('username', {'a': 1}, 1),
+        },
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'detail': 'Invalid cursor'}
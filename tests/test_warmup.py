@@ -0,0 +1,80 @@
+import asyncio
+import logging
+from contextlib import contextmanager
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine.interfaces import CacheStats
+
+from fast_zero.factory import create_app
+from fast_zero.warmup import warm_up_async_engine, warm_up_engine
+
+WARM_CONNECTIONS = 3
+
+
+@contextmanager
+def capture_cache_hits(*engines):
+    hits = []
+
+    def capture(  # noqa: PLR0913, PLR0917
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        hits.append((statement, context.cache_hit))
+
+    for engine in engines:
+        event.listen(engine, 'after_cursor_execute', capture)
+    try:
+        yield hits
+    finally:
+        for engine in engines:
+            event.remove(engine, 'after_cursor_execute', capture)
+
+
+def test_aquecimento_deve_preencher_o_cache_de_sql(
+    client: TestClient, user, token, engine, async_engine
+):
+    header = {'Authorization': f'Bearer {token}'}
+    engines = (engine, async_engine.sync_engine)
+    for sync_engine in engines:
+        sync_engine._compiled_cache.clear()
+    warm_up_engine(engine, 1)
+    asyncio.run(warm_up_async_engine(async_engine, 1))
+
+    with capture_cache_hits(*engines) as hits:
+        client.post(
+            '/auth/token',
+            data={'username': user.email, 'password': user.clean_password},
+        )
+        client.get('/todos/', headers=header)
+        client.get('/users/')
+        client.get(f'/users/{user.id}')
+
+    misses = [
+        statement
+        for statement, cache_hit in hits
+        if cache_hit is not CacheStats.CACHE_HIT
+    ]
+    assert hits
+    assert misses == []
+
+
+def test_aquecimento_deve_abrir_as_conexoes_do_pool(session, database_url):
+    engine = create_engine(database_url)
+
+    warm_up_engine(engine, WARM_CONNECTIONS)
+
+    assert engine.pool.checkedin() == WARM_CONNECTIONS
+    assert engine.pool.checkedout() == 0
+    engine.dispose()
+
+
+def test_lifespan_deve_aquecer_antes_da_primeira_requisicao(caplog):
+    app = create_app()
+
+    with caplog.at_level(logging.INFO, logger='fast_zero'):
+        with TestClient(app):
+            assert app.openapi_schema is not None
+
+    assert any(
+        message.startswith('startup warm-up') for message in caplog.messages
+    )